@@ -0,0 +1,80 @@
+"""
+Benchmark: the 3D Render path, from expression to the drawn idle surface.
+
+Each row times what three_dimension_Render does for a new expression:
+MathEngine.build_surface (compile, evaluate the mesh, build the level of
+detail pyramid) and drawing the idle level with the Agg backend, so no
+display is needed. The surface cache is cleared before every run.
+
+"display" is the default path, which evaluates the mesh at
+SURFACE_RESOLUTION, the finest level ever shown. "1000 serial" and
+"1000 pool" evaluate a 1000x1000 mesh in this process and on the
+MeshEvaluationPool, as 3D Render used to, and then draw the same idle
+level. "pool start" is the one-off cost of spawning the pool processes,
+which the first large render of a session pays on top of "1000 pool".
+
+Usage:
+    python benchmarks/bench_mesh.py [resolution] [workers]
+"""
+import os
+import sys
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from calculatorApp import (SURFACE_RESOLUTION, MathEngine, MeshEvaluationPool,  # noqa: E402
+                           SurfaceDetailController, draw_surface_scene)
+
+EXPRESSIONS = ["sin(x)*cos(y)", "exp(-(x^2 + y^2)/4)*sin(3*x)", "tan(x*y)/(1 + x^2)"]
+
+
+def best_of(func, repeats=3):
+    """Returns the fastest of several runs in milliseconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def render(engine, canvas, expression, resolution):
+    """Builds a surface from scratch and draws its idle level."""
+    engine.clear_cache()
+    surface = engine.build_surface(expression, resolution=resolution)
+    fine = surface.lod.level_for(SurfaceDetailController.IDLE_MAX_GRID,
+                                 SurfaceDetailController.IDLE_MIN_GRID)
+    draw_surface_scene(canvas.figure, *surface.lod.levels[fine], surface.zlim, expression)
+    canvas.draw()
+
+
+def main():
+    resolution = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    canvas = FigureCanvasAgg(Figure(figsize=(8, 6), dpi=100))
+    serial = MathEngine(disk_cache=False)
+    serial.mesh_pool = None
+    pooled = MathEngine(disk_cache=False)
+    pooled.mesh_pool = MeshEvaluationPool(max_workers=workers)
+
+    start = time.perf_counter()
+    pooled.mesh_pool.evaluate(pooled.compile_expression("x*y", ("x", "y")), 64, 5.0)
+    pool_start = (time.perf_counter() - start) * 1000
+
+    print(f"display {SURFACE_RESOLUTION}x{SURFACE_RESOLUTION}, large {resolution}x{resolution}, "
+          f"{workers} pool workers, {os.cpu_count()} cores; pool start {pool_start:.0f} ms")
+    print(f"{'expression':<32}{'display ms':>12}{f'{resolution} serial':>14}{f'{resolution} pool':>12}")
+    for expression in EXPRESSIONS:
+        shown = best_of(lambda: render(serial, canvas, expression, SURFACE_RESOLUTION))
+        large = best_of(lambda: render(serial, canvas, expression, resolution))
+        parallel = best_of(lambda: render(pooled, canvas, expression, resolution))
+        print(f"{expression:<32}{shown:>12.1f}{large:>14.1f}{parallel:>12.1f}")
+    pooled.mesh_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
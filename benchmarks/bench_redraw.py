@@ -0,0 +1,78 @@
+"""
+Benchmark: 2D redraw latency, full rebuild vs. persistent artists.
+
+"rebuild" repeats what graphing used to do for every new expression: clear
+the figure, recreate the subplot, plot the line and rebuild the title,
+labels, legend and grid before drawing. "incremental" goes through
+PlotManager, which keeps its Line2D and decoration artists and only calls
+set_data and relim/autoscale_view.
+
+Both render with the Agg backend, so no display is needed. Curve data is
+computed up front so only redraw time is measured.
+
+Usage:
+    python benchmarks/bench_redraw.py [repeats]
+"""
+import os
+import sys
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from calculatorApp import MathEngine, PlotManager  # noqa: E402
+
+EXPRESSIONS = ["sin(x)", "x^2", "tan(x)", "x*cos(3*x)", "sqrt(x)"]
+
+
+def rebuild_redraw(figure, canvas, x_vals, y_vals, expression):
+    """Clears and rebuilds the whole 2D plot, as graphing did before."""
+    figure.clf()
+    plot_area = figure.add_subplot(111, facecolor="#000000")
+    plot_area.clear()
+    plot_area.plot(x_vals, y_vals, color="#8FD4FA", label=f"f(x) = {expression}")
+    plot_area.set_title("Graphing Calculator", color="#8FD4FA")
+    plot_area.set_xlabel("x", color="#8FD4FA")
+    plot_area.set_ylabel("f(x)", color="#8FD4FA")
+    plot_area.legend()
+    plot_area.grid(True)
+    canvas.draw()
+
+
+def time_redraws(redraw, samples, repeats):
+    """Returns per-redraw latencies in milliseconds."""
+    latencies = []
+    for _ in range(repeats):
+        for expression, x_vals, y_vals in samples:
+            start = time.perf_counter()
+            redraw(x_vals, y_vals, expression)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    engine = MathEngine(disk_cache=False)
+    samples = [(expr, *engine._evaluate_expression_for_graph(expr)) for expr in EXPRESSIONS]
+
+    figure = Figure(figsize=(6, 4), dpi=100, facecolor="#1C1C1C")
+    canvas = FigureCanvasAgg(figure)
+    rebuild = time_redraws(lambda x, y, e: rebuild_redraw(figure, canvas, x, y, e), samples, repeats)
+
+    figure = Figure(figsize=(6, 4), dpi=100, facecolor="#1C1C1C")
+    canvas = FigureCanvasAgg(figure)
+    manager = PlotManager(figure.add_subplot(111, facecolor="#000000"), canvas)
+    incremental = time_redraws(manager.draw_graph, samples, repeats)
+
+    print(f"{'path':<14}{'median ms':>12}{'p90 ms':>10}")
+    for name, latencies in (("rebuild", rebuild), ("incremental", incremental)):
+        print(f"{name:<14}{np.median(latencies):>12.2f}{np.percentile(latencies, 90):>10.2f}")
+    print(f"speedup (median): {np.median(rebuild) / np.median(incremental):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
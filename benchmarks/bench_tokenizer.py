@@ -0,0 +1,101 @@
+"""
+Benchmark: expression preprocessing and parsing, regex passes vs. the tokenizer.
+
+"regex" repeats what _preprocess_expression used to do: replace '^' and run
+three uncompiled re.sub passes (it also turned sin into s*i*n, so its output
+is wrong; only its speed is compared). "tokenize" runs tokenize_expression
+once per input. "memoized" goes through MathEngine.tokenize a second time,
+as the 3D path does when it re-preprocesses both sides of an equation.
+
+The parse rows are the cold path a new expression takes into SymPy.
+"sympify" parses the normalized text, tokenizing it again with Python's
+tokenizer, as the engine did before. "token stream" hands the tokenizer's
+output straight to SymPy's parser, which is what to_sympy_expr now does
+for text that came out of MathEngine.tokenize. The cold rows time a new
+expression end to end: tokenize then sympify, as the engine did before,
+against tokenize then the token stream. The tokenizer costs a few more
+milliseconds than the regex passes, and reading its tokens saves more
+than that in the parse. (The regex output cannot be parsed at all here:
+'4pi x' becomes '4*pi x'.)
+
+The inputs are long pasted expressions: sums of many terms that mix
+numbers, implicit multiplication, powers and function calls.
+
+Usage:
+    python benchmarks/bench_tokenizer.py [terms] [repeats]
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from calculatorApp import (MathEngine, parse_token_pairs, sym, sympy_token_pairs,  # noqa: E402
+                           tokenize_expression)
+
+TERMS = ["3x^2y", "2sin(x)cos(y)", "0.5(x+1)(y-1)", "exp(-x^2/4)", "4pi x", "sqrt(x^2+y^2)", "tanh(2x)y"]
+
+
+def regex_preprocess(expr):
+    """The previous three-pass preprocessor."""
+    expr = expr.strip().replace("^", "**")
+    expr = re.sub(r"(?<=\d|\))(?=[a-zA-Z\(])", "*", expr)
+    expr = re.sub(r"(?<=[a-zA-Z\)])(?=\d)", "*", expr)
+    expr = re.sub(r"(?<=[a-zA-Z0-9\)])(?=[a-zA-Z\(])", "*", expr)
+    return expr
+
+
+def best_of(func, repeats):
+    """Returns the fastest of several runs in milliseconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def main():
+    terms = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    expressions = [" + ".join(TERMS[(i + k) % len(TERMS)] for i in range(terms))
+                   for k in range(len(TERMS))]
+    engine = MathEngine(disk_cache=False)
+    functions, constants = engine.function_names, engine.constant_names
+    for expression in expressions:
+        engine.tokenize(expression)
+
+    print(f"{len(expressions)} expressions of {terms} terms (~{len(expressions[0])} characters)")
+    regex = best_of(lambda: [regex_preprocess(e) for e in expressions], repeats)
+    single = best_of(lambda: [tokenize_expression(e, functions, constants) for e in expressions], repeats)
+    memoized = best_of(lambda: [engine.tokenize(e) for e in expressions], repeats)
+    print(f"{'regex passes':<28}{regex:>10.3f} ms")
+    print(f"{'tokenize':<28}{single:>10.3f} ms")
+    print(f"{'memoized':<28}{memoized:>10.3f} ms")
+
+    # SymPy parses take far longer, so fewer runs are enough
+    parse_repeats = max(1, repeats // 5)
+    streams = [engine.tokenize(e) for e in expressions]
+    texts = ["".join(tokens) for tokens in streams]
+
+    def sympify(text):
+        return sym.sympify(text, locals=dict(engine.sympy_locals))
+
+    def parse_stream(tokens):
+        return parse_token_pairs(sympy_token_pairs(tokens), dict(engine.sympy_locals))
+
+    sympify(texts[0])   # imports SymPy outside the timings
+    parsed = best_of(lambda: [sympify(text) for text in texts], parse_repeats)
+    streamed = best_of(lambda: [parse_stream(tokens) for tokens in streams], parse_repeats)
+    before = best_of(lambda: [sympify("".join(tokenize_expression(e, functions, constants)))
+                              for e in expressions], parse_repeats)
+    after = best_of(lambda: [parse_stream(tokenize_expression(e, functions, constants))
+                             for e in expressions], parse_repeats)
+    print(f"{'parse: sympify':<28}{parsed:>10.3f} ms")
+    print(f"{'parse: token stream':<28}{streamed:>10.3f} ms")
+    print(f"{'cold: tokenize + sympify':<28}{before:>10.3f} ms")
+    print(f"{'cold: tokenize + stream':<28}{after:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,135 +1,3378 @@
-import matplotlib
-matplotlib.use("TkAgg")
+import time
+_MODULE_START = time.perf_counter()
 import tkinter as tk
 from tkinter import messagebox
-import numpy as np
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import sympy as sym
 import re
 import math 
-from mpl_toolkits.mplot3d import Axes3D 
+import os
+import sys
+import json
+import hashlib
+import hmac
+import inspect
+import ast
+import argparse
+import importlib
+import threading
+import tokenize
+import types
+import builtins
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from importlib import metadata
+
+
+# --------------------------- STARTUP PROFILING ---------------------------
+class StartupProfiler:
+    """
+    Records how long imports and widget construction take during startup.
+
+    Times are measured from the moment this module started importing, so the
+    report also shows when each step finished relative to launch.
+    """
+    def __init__(self, origin):
+        self.origin = origin
+        self.sections = []   # (label, thread name, duration, finished at)
+        self.marks = []      # (label, time since origin)
+
+    @contextmanager
+    def section(self, label):
+        """Times the enclosed block and records it under the given label."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.sections.append((label, threading.current_thread().name,
+                                  end - start, end - self.origin))
+
+    def mark(self, label):
+        """Records a point in time, such as the first paint of the window."""
+        self.marks.append((label, time.perf_counter() - self.origin))
+
+    def report(self):
+        """
+        Formats the recorded sections and marks as a plain-text table.
+
+        Returns:
+            str: Multi-line startup report, times in milliseconds.
+        """
+        lines = ["Startup profile (ms)",
+                 f"  {'step':<34}{'thread':<14}{'duration':>10}{'done at':>10}"]
+        for label, thread, duration, finished in self.sections:
+            lines.append(f"  {label:<34}{thread:<14}{duration * 1000:>10.1f}{finished * 1000:>10.1f}")
+        for label, at in self.marks:
+            lines.append(f"  {label:<48}{'':>10}{at * 1000:>10.1f}")
+        return "\n".join(lines)
+
+
+STARTUP_PROFILE = StartupProfiler(_MODULE_START)
+STARTUP_PROFILE.sections.append(("import tkinter + stdlib", "MainThread",
+                                 time.perf_counter() - _MODULE_START,
+                                 time.perf_counter() - _MODULE_START))
+
+_IMPORT_LOCK = threading.RLock()
+
+
+class _LazyModule:
+    """
+    Stand-in for a heavy module that is imported on first attribute access.
+
+    Keeps the usual 'np.' and 'sym.' call sites unchanged while moving the
+    import cost out of application startup.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        """Imports the module if needed and returns it."""
+        if self._module is None:
+            with _IMPORT_LOCK:
+                if self._module is None:
+                    with STARTUP_PROFILE.section(f"import {self._name}"):
+                        self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self):
+        """Whether the real module has been imported yet."""
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+
+np = _LazyModule("numpy")
+sym = _LazyModule("sympy")
+sympy_parser = _LazyModule("sympy.parsing.sympy_parser")
+
+_MATPLOTLIB = None
+
+
+def _load_matplotlib():
+    """
+    Imports matplotlib with the TkAgg backend on first use.
+
+    Returns:
+        tuple: The Figure, FigureCanvasTkAgg and NavigationToolbar2Tk classes.
+    """
+    global _MATPLOTLIB
+    if _MATPLOTLIB is None:
+        with _IMPORT_LOCK:
+            if _MATPLOTLIB is None:
+                with STARTUP_PROFILE.section("import matplotlib (TkAgg)"):
+                    import matplotlib
+                    matplotlib.use("TkAgg")
+                    from matplotlib.figure import Figure
+                    from matplotlib.backends.backend_tkagg import (
+                        FigureCanvasTkAgg, NavigationToolbar2Tk)
+                _MATPLOTLIB = (Figure, FigureCanvasTkAgg, NavigationToolbar2Tk)
+    return _MATPLOTLIB
+
+
+def _ensure_mplot3d():
+    """Imports mplot3d so the '3d' projection is registered before a 3D render."""
+    with _IMPORT_LOCK:
+        if "mpl_toolkits.mplot3d" not in sys.modules:
+            with STARTUP_PROFILE.section("import mpl_toolkits.mplot3d"):
+                importlib.import_module("mpl_toolkits.mplot3d")
+
+
+def _warm_up_imports():
+    """Loads the heavy modules in the order the UI needs them. Runs off the Tk thread."""
+    np.load()
+    _load_matplotlib()
+    sym.load()
+
+
+# --------------------------- COMPILED EXPRESSION ---------------------------
+class CompiledExpression:
+    """
+    A parsed SymPy expression paired with its compiled NumPy callable.
+
+    Instances are produced by MathEngine.compile_expression and shared through
+    its cache, so the same object is handed to every caller that asks for an
+    equivalent expression.
+    """
+    def __init__(self, expr, func, variables, defaults, source=None, srepr=None,
+                 expr_loader=None):
+        self._expr = expr
+        self._srepr = srepr
+        self._expr_loader = expr_loader
+        self.func = func
+        self.variables = tuple(variables)
+        self.defaults = tuple(defaults)
+        self.source = source
+
+    @property
+    def expr(self):
+        """The SymPy expression, built on first access when it was compiled without SymPy."""
+        if self._expr is None:
+            if self._srepr is not None:
+                self._expr = sym.sympify(self._srepr)
+            elif self._expr_loader is not None:
+                self._expr = self._expr_loader()
+        return self._expr
+
+    @property
+    def srepr(self):
+        """The canonical srepr string of the expression."""
+        if self._srepr is None:
+            self._srepr = sym.srepr(self._expr)
+        return self._srepr
+
+    def __call__(self, *args):
+        """
+        Evaluates the compiled function and broadcasts the result to the input shape.
+
+        Args:
+            *args (np.ndarray | float): One value or array per variable.
+
+        Returns:
+            np.ndarray: Result with the broadcast shape of the inputs.
+        """
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            result = np.asarray(self.func(*args))
+        shape = np.broadcast(*args).shape
+        if result.shape != shape:
+            result = np.broadcast_to(result, shape).copy()
+        return result
+
+
+class BoundExpression:
+    """
+    A CompiledExpression whose trailing arguments are fixed parameter values.
+
+    MathEngine.bind_parameters compiles an expression once with its free
+    symbols as extra arguments; binding new values only builds one of these,
+    so changing a constant never recompiles. Calls take the remaining
+    variables positionally, like a CompiledExpression.
+    """
+    def __init__(self, compiled, parameters, values):
+        self.compiled = compiled
+        self.parameters = tuple(parameters)
+        self.values = tuple(float(values.get(name, 1.0)) for name in self.parameters)
+        self.variables = compiled.variables[:len(compiled.variables) - len(self.parameters)]
+        # Parameters without a value, which are bound to 1.0
+        self.defaults = tuple(name for name in self.parameters if name not in values)
+
+    def __call__(self, *args):
+        """Evaluates the expression at the given variables and the bound parameter values."""
+        return self.compiled(*args, *self.values)
+
+
+# --------------------------- DISK CACHE ---------------------------
+CACHE_FORMAT_VERSION = 3
+LAMBDIFY_MODULES = ("numpy",)
+
+
+def default_cache_dir():
+    """
+    Returns the base directory for the persistent expression cache.
+
+    The GRAPHING_CALC_CACHE_DIR environment variable overrides the default
+    of ~/.cache/graphing_calculator.
+    """
+    override = os.environ.get("GRAPHING_CALC_CACHE_DIR")
+    if override:
+        return override
+    return os.path.join(os.path.expanduser("~"), ".cache", "graphing_calculator")
+
+
+_NUMPY_NAMESPACE = None
+
+
+def _function_from_source(source, name):
+    """
+    Rebuilds a lambdified function from its generated source code.
+
+    Args:
+        source (str): Python source of the generated function.
+        name (str): Name of the function defined by the source.
+
+    Returns:
+        callable: The compiled function, bound to a NumPy namespace.
+    """
+    global _NUMPY_NAMESPACE
+    if _NUMPY_NAMESPACE is None:
+        namespace = {"numpy": np.load()}
+        exec("from numpy import *\nI = 1j", namespace)
+        _NUMPY_NAMESPACE = namespace
+    namespace = dict(_NUMPY_NAMESPACE)
+    exec(compile(source, f"<{name}>", "exec"), namespace)
+    return namespace[name]
+
+
+class ExpressionDiskCache:
+    """
+    Stores compiled expressions on disk so they survive application restarts.
+
+    Entries live in a directory versioned by cache format and SymPy version
+    and are named by a hash of the normalized expression, its variables and
+    the lambdify module set. Each entry keeps the generated source of the
+    NumPy callable, so loading one needs neither sympify nor lambdify.
+    Entries are read lazily, one at a time, the first time an expression is
+    requested. Unreadable or stale entries are deleted and reported as misses.
+
+    The source is executed on load, so every entry carries an HMAC-SHA256
+    of its contents under a random key kept in the base directory, readable
+    only by its owner. An entry whose signature does not match, or that
+    was written without the key, is never executed.
+    """
+    KEY_FILE = "entry.key"
+
+    def __init__(self, base_dir=None, modules=LAMBDIFY_MODULES):
+        self.modules = tuple(modules)
+        try:
+            self.sympy_version = metadata.version("sympy")
+        except metadata.PackageNotFoundError:
+            self.sympy_version = "unknown"
+        self.base_dir = base_dir or default_cache_dir()
+        self.directory = os.path.join(
+            self.base_dir,
+            f"v{CACHE_FORMAT_VERSION}",
+            f"sympy-{self.sympy_version}",
+        )
+        self._key = None
+        self.hits = 0
+        self.misses = 0
+
+    def _signing_key(self):
+        """
+        Returns the key entries are signed with, creating it on first use.
+
+        Returns:
+            bytes | None: The key, or None if it can neither be read nor created.
+        """
+        if self._key is not None:
+            return self._key
+        path = os.path.join(self.base_dir, self.KEY_FILE)
+        try:
+            os.makedirs(self.base_dir, exist_ok=True)
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                pass
+            else:
+                with os.fdopen(fd, "wb") as handle:
+                    handle.write(os.urandom(32))
+            with open(path, "rb") as handle:
+                info = os.fstat(handle.fileno())
+                key = handle.read()
+        except OSError:
+            return None
+        # A key that others could have planted or read cannot vouch for anything
+        if hasattr(os, "getuid") and (info.st_uid != os.getuid() or info.st_mode & 0o077):
+            return None
+        if len(key) != 32:
+            return None
+        self._key = key
+        return key
+
+    def _signature(self, entry):
+        """Returns the hex HMAC of an entry's fields, excluding the signature itself."""
+        key = self._signing_key()
+        if key is None:
+            return None
+        fields = {name: value for name, value in entry.items() if name != "hmac"}
+        message = json.dumps(fields, sort_keys=True).encode("utf-8")
+        return hmac.new(key, message, hashlib.sha256).hexdigest()
+
+    def _path_for(self, text, variables):
+        """Returns the entry path for a normalized expression and its variables."""
+        key = json.dumps([text, list(variables), list(self.modules)])
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def load(self, text, variables):
+        """
+        Loads a compiled expression from disk.
+
+        Args:
+            text (str): Normalized expression string.
+            variables (tuple[str]): Names of the callable's positional arguments.
+
+        Returns:
+            CompiledExpression | None: The cached expression, or None on a miss.
+        """
+        path = self._path_for(text, variables)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                entry = json.load(handle)
+            if (entry["format"] != CACHE_FORMAT_VERSION
+                    or entry["sympy"] != self.sympy_version
+                    or entry["modules"] != list(self.modules)
+                    or entry["expression"] != text
+                    or entry["variables"] != list(variables)):
+                raise ValueError("stale cache entry")
+            signature = self._signature(entry)
+            if signature is None or not hmac.compare_digest(signature, entry["hmac"]):
+                raise ValueError("cache entry signature mismatch")
+
+            func = _function_from_source(entry["source"], entry["name"])
+            compiled = CompiledExpression(None, func, variables, entry["defaults"],
+                                          source=entry["source"], srepr=entry["srepr"])
+            # Probe the callable once so a broken entry falls back to a fresh compile
+            compiled(*[np.linspace(0.5, 1.5, 3) for _ in variables])
+        except Exception:
+            self._discard(path)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return compiled
+
+    def store(self, text, compiled):
+        """
+        Writes a compiled expression to disk, ignoring any filesystem errors.
+
+        Args:
+            text (str): Normalized expression string.
+            compiled (CompiledExpression): Expression to persist.
+        """
+        if compiled.source is None:
+            return
+        entry = {
+            "format": CACHE_FORMAT_VERSION,
+            "sympy": self.sympy_version,
+            "modules": list(self.modules),
+            "expression": text,
+            "variables": list(compiled.variables),
+            "defaults": list(compiled.defaults),
+            "srepr": compiled.srepr,
+            "name": compiled.func.__name__,
+            "source": compiled.source,
+        }
+        entry["hmac"] = self._signature(entry)
+        path = self._path_for(text, compiled.variables)
+        if entry["hmac"] is None or os.path.exists(path):
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                json.dump(entry, handle)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _discard(path):
+        """Removes an unusable cache entry."""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# --------------------------- FAST PATH COMPILER ---------------------------
+_FAST_PATH_BINOPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow)
+_FAST_PATH_UNARYOPS = (ast.UAdd, ast.USub)
+
+
+class _FastPathTransformer(ast.NodeTransformer):
+    """
+    Validates an expression tree against the fast-path whitelist.
+
+    Numeric literals are rewritten as float64 calls so arithmetic follows
+    NumPy semantics (for example 1/0 gives inf instead of raising). Any node
+    outside the whitelist raises ValueError.
+    """
+    def __init__(self, functions, constants, variables):
+        self.functions = functions
+        self.constants = constants
+        self.variables = variables
+
+    def generic_visit(self, node):
+        raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+
+    def visit_Expression(self, node):
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, _FAST_PATH_BINOPS):
+            raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        return node
+
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, _FAST_PATH_UNARYOPS):
+            raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
+        node.operand = self.visit(node.operand)
+        return node
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ValueError(f"Unsupported literal: {node.value!r}")
+        return ast.Call(func=ast.Name(id="float64", ctx=ast.Load()),
+                        args=[ast.Constant(value=float(node.value))], keywords=[])
+
+    def visit_Name(self, node):
+        if node.id not in self.variables and node.id not in self.constants:
+            raise ValueError(f"Unknown name: {node.id}")
+        return node
+
+    def visit_Call(self, node):
+        if (not isinstance(node.func, ast.Name) or node.func.id not in self.functions
+                or len(node.args) != 1 or node.keywords):
+            raise ValueError("Unsupported function call")
+        node.args = [self.visit(node.args[0])]
+        return node
+
+
+def _fast_path_number(node):
+    """Returns the value of a float64(...) literal made by the transformer, else None."""
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "float64"
+            and len(node.args) == 1 and isinstance(node.args[0], ast.Constant)):
+        return node.args[0].value
+    return None
+
+
+def _fast_path_sum(node):
+    """Expands a node into {factors: coefficient}, a sum of monomials."""
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub)):
+        terms = dict(_fast_path_sum(node.left))
+        sign = 1.0 if isinstance(node.op, ast.Add) else -1.0
+        for factors, coeff in _fast_path_sum(node.right).items():
+            terms[factors] = terms.get(factors, 0.0) + sign * coeff
+        return terms
+    if isinstance(node, ast.UnaryOp):
+        terms = _fast_path_sum(node.operand)
+        sign = -1.0 if isinstance(node.op, ast.USub) else 1.0
+        return {factors: sign * coeff for factors, coeff in terms.items()}
+    coeff, factors = _fast_path_product(node)
+    return {factors: coeff}
+
+
+def _fast_path_product(node):
+    """Splits a node into a numeric coefficient and sorted (atom, exponent) factors."""
+    value = _fast_path_number(node)
+    if value is not None:
+        return value, ()
+    if isinstance(node, ast.UnaryOp):
+        coeff, factors = _fast_path_product(node.operand)
+        return (-coeff if isinstance(node.op, ast.USub) else coeff), factors
+
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Mult, ast.Div, ast.Pow)):
+        left_coeff, left = _fast_path_product(node.left)
+        if isinstance(node.op, ast.Pow):
+            power = _fast_path_number(node.right)
+            integral = (power is not None and float(power).is_integer()
+                        and all(float(exp).is_integer() for _, exp in left))
+            if integral and not (left_coeff == 0 and power < 0):
+                return left_coeff ** power, tuple((atom, exp * power) for atom, exp in left)
+            if power is not None and left_coeff == 1 and len(left) == 1 and left[0][1] == 1:
+                return 1.0, ((left[0][0], power),)
+        else:
+            right_coeff, right = _fast_path_product(node.right)
+            sign = 1 if isinstance(node.op, ast.Mult) else -1
+            if sign == 1 or right_coeff != 0:
+                factors = _fast_path_merge(left, ((atom, sign * exp) for atom, exp in right))
+                coeff = left_coeff * right_coeff if sign == 1 else left_coeff / right_coeff
+                return coeff, factors
+
+    return 1.0, ((_fast_path_atom(node), 1.0),)
+
+
+def _fast_path_merge(left, right):
+    """
+    Multiplies two lists of factors, merging equal atoms only where that keeps the domain.
+
+    Exponents are added only when both are integers of the same sign, so
+    x * x becomes x**2, but x**0.5 * x**0.5 and x / x stay as they are:
+    folding them to x or 1 would drop the NaN for x < 0 or the hole at 0.
+    """
+    factors = list(left)
+    for atom, exp in right:
+        for index, (other, other_exp) in enumerate(factors):
+            if (other == atom and float(exp).is_integer() and float(other_exp).is_integer()
+                    and exp * other_exp > 0):
+                factors[index] = (atom, exp + other_exp)
+                break
+        else:
+            factors.append((atom, exp))
+    return tuple(sorted(factors, key=repr))
+
+
+def _fast_path_atom(node):
+    """Returns the key of a node that is not a product of simpler factors."""
+    if isinstance(node, ast.Name):
+        return ("name", node.id)
+    if isinstance(node, ast.Call):
+        return ("call", node.func.id, fast_path_key(node.args[0]))
+    if isinstance(node, ast.BinOp) and not isinstance(node.op, (ast.Add, ast.Sub)):
+        # Powers with a variable exponent, and division by zero
+        return (type(node.op).__name__, fast_path_key(node.left), fast_path_key(node.right))
+    return ("sum", fast_path_key(node))
+
+
+def fast_path_key(node):
+    """
+    Returns a canonical, hashable form of a validated fast-path expression tree.
+
+    The tree is expanded into a sum of monomials: products and quotients
+    merge integer exponents of equal factors, integer powers distribute over
+    products, and like terms are collected, with terms and factors sorted.
+    So 'x^2', 'x**2' and 'x * x' share a key, as do 'x + 1' and '1 + x'.
+    Rewrites that would change where the expression is defined are not
+    made: 'x / x', 'x - x', 'x**0.5 * x**0.5' and '(x**0.5)**2' keep keys
+    of their own. Sums inside products are not expanded.
+
+    Args:
+        node (ast.AST): Body of a tree accepted by _FastPathTransformer.
+
+    Returns:
+        tuple: The canonical form.
+    """
+    # Only constant terms may vanish; x - x is NaN where x is infinite
+    terms = ((factors, coeff) for factors, coeff in _fast_path_sum(node).items() if coeff != 0 or factors)
+    return tuple(sorted(terms, key=repr))
+
+
+def fast_path_tree(text, variables, functions, constants):
+    """
+    Parses and validates an expression for the fast path.
+
+    Args:
+        text (str): Normalized expression string.
+        variables (tuple[str]): Names of the function's positional arguments.
+        functions (Iterable[str]): Allowed single-argument NumPy function names.
+        constants (Iterable[str]): Allowed NumPy constant names.
+
+    Returns:
+        ast.Expression | None: The tree with literals as float64 calls, or None if
+        the expression is outside the supported subset.
+    """
+    try:
+        tree = ast.parse(text, mode="eval")
+        return _FastPathTransformer(set(functions), set(constants), set(variables)).visit(tree)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+
+
+def _fast_path_function(tree, variables):
+    """Builds the NumPy function and its source from a validated tree."""
+    source = f"def _fastpath({', '.join(variables)}):\n    return {ast.unparse(tree.body)}\n"
+    return _function_from_source(source, "_fastpath"), source
+
+
+def compile_fast_path(text, variables, functions, constants):
+    """
+    Compiles a plain arithmetic expression straight to a NumPy function.
+
+    The expression is parsed with Python's ast module and accepted only if
+    it uses +, -, *, /, **, numeric literals, the given variables, and the
+    whitelisted functions and constants. No SymPy is involved.
+
+    Args:
+        text (str): Normalized expression string.
+        variables (tuple[str]): Names of the function's positional arguments.
+        functions (Iterable[str]): Allowed single-argument NumPy function names.
+        constants (Iterable[str]): Allowed NumPy constant names.
+
+    Returns:
+        tuple[callable, str] | None: The function and its source, or None if
+        the expression is outside the supported subset.
+    """
+    tree = fast_path_tree(text, variables, functions, constants)
+    if tree is None:
+        return None
+    return _fast_path_function(tree, variables)
+
+
+# --------------------------- TOKENIZER ---------------------------
+_TOKEN_PATTERNS = {}
+
+# Token kinds, numbered by regular-expression group
+_NUMBER, _FUNCTION, _OPERAND, _POWER, _OPEN, _CLOSE, _OTHER = range(1, 8)
+
+
+def _token_pattern(functions, constants):
+    """Returns the compiled tokenizer pattern for a name table, building it on first use."""
+    key = (frozenset(functions), frozenset(constants))
+    pattern = _TOKEN_PATTERNS.get(key)
+    if pattern is None:
+        def alternation(names):
+            return "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+        pattern = _TOKEN_PATTERNS[key] = re.compile(
+            r"\s*(?:(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)"
+            rf"|({alternation(key[0])})|({alternation(key[1])}|[A-Za-z])"
+            r"|(\*\*|\^)|(\()|(\))|(\S))")
+    return pattern
+
+
+def tokenize_expression(expression, functions, constants):
+    """
+    Splits a typed expression into tokens, inserting implicit multiplication.
+
+    One scan of a compiled regular expression yields numbers, names and
+    operators. Letters are matched against the known function and constant
+    names, longest first, and any other letter is a one-letter symbol, so
+    'xsin(y)' reads as x*sin(y) and '2pix' as 2*pi*x. A '*' is inserted
+    wherever a number, symbol, constant or ')' is followed by a number,
+    name or '(', and after a function name that is not followed by '(',
+    which SymPy then rejects rather than reading 'sqrt 2' as a new name.
+    '^' becomes '**' and whitespace is dropped.
+
+    Args:
+        expression (str): Expression as typed by the user.
+        functions (Iterable[str]): Names that are called with parentheses.
+        constants (Iterable[str]): Names of constants.
+
+    Returns:
+        tuple[str]: The tokens; joined, they form the normalized expression.
+    """
+    tokens = []
+    append = tokens.append
+    after_operand = after_function = False
+    for match in _token_pattern(functions, constants).finditer(expression):
+        kind = match.lastindex
+        token = match.group(kind)
+        if after_function and kind != _OPEN:
+            append("*")
+        elif after_operand and kind <= _OPEN and kind != _POWER:
+            append("*")
+        append("**" if kind == _POWER else token)
+        after_operand = kind in (_NUMBER, _OPERAND, _CLOSE)
+        after_function = kind == _FUNCTION
+    return tuple(tokens)
+
+
+# Operator tokens that Python's tokenizer reads back exactly as tokenize_expression split them
+_PARSER_OPERATORS = ("(", ")", "+", "-", ",")
+# Operators that Python's tokenizer would merge when adjacent, e.g. '*' then '**'
+_PARSER_PRODUCTS = ("*", "/", "**")
+
+_SYMPY_GLOBALS = None
+
+
+def sympy_token_pairs(tokens):
+    """
+    Converts tokenize_expression output into the token pairs SymPy's parser reads.
+
+    Numbers become NUMBER tokens, names NAME tokens and the arithmetic
+    operators OP tokens, which is what Python's tokenizer makes of the joined
+    text. Any other token, such as '=', a non-ASCII character or a product
+    operator right after another one, returns None so that the caller
+    parses the text instead.
+
+    Args:
+        tokens (tuple[str]): Tokens from tokenize_expression.
+
+    Returns:
+        list[tuple[int, str]] | None: (type, string) pairs ending in NEWLINE
+        and ENDMARKER, or None if the tokens cannot be passed on as they are.
+    """
+    pairs = []
+    previous = ""
+    for token in tokens:
+        if not token.isascii():
+            return None
+        if token[0].isdigit() or token[-1].isdigit():
+            pairs.append((tokenize.NUMBER, token))
+        elif token.isalpha():
+            pairs.append((tokenize.NAME, token))
+        elif token in _PARSER_OPERATORS or (token in _PARSER_PRODUCTS and previous not in _PARSER_PRODUCTS):
+            pairs.append((tokenize.OP, token))
+        else:
+            return None
+        previous = token
+    pairs.append((tokenize.NEWLINE, ""))
+    pairs.append((tokenize.ENDMARKER, ""))
+    return pairs
+
+
+def _sympy_globals():
+    """Returns the global names sympify evaluates against, built once rather than on every parse."""
+    global _SYMPY_GLOBALS
+    if _SYMPY_GLOBALS is None:
+        with _IMPORT_LOCK:
+            if _SYMPY_GLOBALS is None:
+                names = {}
+                exec("from sympy import *", names)
+                names.update((name, obj) for name, obj in vars(builtins).items()
+                             if isinstance(obj, types.BuiltinFunctionType))
+                names.update(max=sym.Max, min=sym.Min)
+                _SYMPY_GLOBALS = names
+    return _SYMPY_GLOBALS
+
+
+def parse_token_pairs(pairs, namespace):
+    """
+    Parses token pairs into a SymPy expression the way sympify parses a string.
+
+    Applies the same transformations as sympify (the standard ones and
+    convert_xor) and evaluates the result against the same globals, but
+    skips Python's tokenizer, which is the slow part of parsing a long
+    expression.
+
+    Args:
+        pairs (list[tuple[int, str]]): Token pairs from sympy_token_pairs.
+        namespace (dict): Local names, as passed to sympify as locals.
+
+    Returns:
+        sympy.Basic: The parsed expression.
+    """
+    global_names = _sympy_globals()
+    for transform in sympy_parser.standard_transformations + (sympy_parser.convert_xor,):
+        pairs = transform(pairs, namespace, global_names)
+    return sympy_parser.eval_expr(tokenize.untokenize(pairs), namespace, global_names)
+
+
+# --------------------------- ADAPTIVE SAMPLING ---------------------------
+GRAPH_X_RANGE = (-10.0, 10.0)
+GRAPH_POINT_BUDGET = 2000
+
+
+def _robust_range(y_vals):
+    """
+    Returns the 2nd and 98th percentile of the finite values in an array.
+
+    Used as the vertical scale of a curve so that a few huge values near a
+    pole do not dominate it. Falls back to (-1, 1) when nothing is finite.
+    """
+    finite = y_vals[np.isfinite(y_vals)]
+    if finite.size == 0:
+        return -1.0, 1.0
+    low, high = np.percentile(finite, [2.0, 98.0])
+    if high - low <= 0:
+        pad = max(abs(high), 1.0)
+        low, high = low - pad, high + pad
+    return float(low), float(high)
+
+
+def adaptive_sample(func, x_min, x_max, max_points=GRAPH_POINT_BUDGET, initial_points=129,
+                    tolerance=2e-3, min_width_ratio=2.5e-4):
+    """
+    Samples a vectorized function with curvature-adaptive refinement.
+
+    Starts from a coarse uniform grid and repeatedly bisects only the
+    intervals next to points where the curve bends, i.e. where a sample
+    lies further than `tolerance` (as a fraction of the curve's vertical
+    scale) from the chord through its neighbours, or where the curve
+    enters or leaves its domain. Each round evaluates every new midpoint
+    in a single vectorized call, and refinement stops when no interval
+    needs it or the point budget is spent.
+
+    Args:
+        func (callable): Vectorized function of one array argument.
+        x_min (float): Left edge of the sampled range.
+        x_max (float): Right edge of the sampled range.
+        max_points (int): Total number of samples allowed.
+        initial_points (int): Size of the coarse starting grid.
+        tolerance (float): Allowed chord deviation relative to the curve's height.
+        min_width_ratio (float): Smallest interval, as a fraction of the range.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Sorted x-values and the matching y-values.
+    """
+    def evaluate(points):
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            return np.asarray(func(points), dtype=float)
+
+    initial_points = max(3, min(initial_points, max_points))
+    x_vals = np.linspace(x_min, x_max, initial_points)
+    y_vals = evaluate(x_vals)
+    min_width = (x_max - x_min) * min_width_ratio
+
+    while x_vals.size < max_points:
+        low, high = _robust_range(y_vals)
+        scale = high - low
+        # Clip far outside the visible band so steep poles do not soak up the budget
+        clipped = np.clip(y_vals, low - scale, high + scale)
+
+        x0, x1, x2 = x_vals[:-2], x_vals[1:-1], x_vals[2:]
+        y0, y1, y2 = clipped[:-2], clipped[1:-1], clipped[2:]
+        chord = y0 + (y2 - y0) * (x1 - x0) / (x2 - x0)
+        bend = np.nan_to_num(np.abs(y1 - chord) / scale, nan=0.0)
+
+        score = np.zeros(x_vals.size - 1)
+        score[:-1] = bend
+        score[1:] = np.maximum(score[1:], bend)
+        finite = np.isfinite(y_vals)
+        score[finite[:-1] != finite[1:]] = np.inf
+        score[np.diff(x_vals) <= min_width] = 0.0
+
+        candidates = np.flatnonzero(score > tolerance)
+        if candidates.size == 0:
+            break
+        remaining = max_points - x_vals.size
+        if candidates.size > remaining:
+            keep = np.argpartition(score[candidates], -remaining)[-remaining:]
+            candidates = np.sort(candidates[keep])
+
+        x_mid = 0.5 * (x_vals[candidates] + x_vals[candidates + 1])
+        y_mid = evaluate(x_mid)
+        x_vals = np.insert(x_vals, candidates + 1, x_mid)
+        y_vals = np.insert(y_vals, candidates + 1, y_mid)
+
+    return x_vals, y_vals
+
+
+def insert_discontinuity_breaks(func, x_vals, y_vals, refine_points=8, jump_fraction=0.25):
+    """
+    Finds poles and jump discontinuities in sampled data and breaks the line there.
+
+    Every interval whose rise exceeds `jump_fraction` of the curve's robust
+    height, or is ten times larger than both neighbouring rises, is
+    re-sampled at `refine_points` interior points in one vectorized call.
+    If the largest step inside the refined interval is still at least
+    three quarters of the original jump, the jump did not shrink under
+    refinement, so it is a pole or a discontinuity and a NaN is inserted
+    at that step. Steep but continuous intervals simply keep the extra
+    samples. Everything is done with whole-array NumPy operations, with no
+    per-point Python loop.
+
+    Args:
+        func (callable): Vectorized function that produced y_vals.
+        x_vals (np.ndarray): Sorted sample positions.
+        y_vals (np.ndarray): Sampled values.
+        refine_points (int): Extra samples taken inside each suspicious interval.
+        jump_fraction (float): Jump size, relative to the robust height, worth checking.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Samples with refinement and NaN breaks inserted.
+    """
+    low, high = _robust_range(y_vals)
+    scale = high - low
+    jumps = np.nan_to_num(np.abs(np.diff(y_vals)), nan=0.0)
+    neighbours = np.zeros_like(jumps)
+    neighbours[1:] = jumps[:-1]
+    neighbours[:-1] = np.maximum(neighbours[:-1], jumps[1:])
+    suspicious = np.flatnonzero((jumps > jump_fraction * scale)
+                                | ((jumps > 10 * neighbours) & (jumps > 1e-3 * scale)))
+    if suspicious.size == 0:
+        return x_vals, y_vals
+
+    # (k, m) grid of refinement points inside each suspicious interval
+    steps = np.linspace(0.0, 1.0, refine_points + 2)[1:-1]
+    left, right = x_vals[suspicious], x_vals[suspicious + 1]
+    x_inner = left[:, None] + (right - left)[:, None] * steps
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        y_inner = np.asarray(func(x_inner.ravel()), dtype=float).reshape(x_inner.shape)
+
+    x_full = np.column_stack([left, x_inner, right])
+    y_full = np.column_stack([y_vals[suspicious], y_inner, y_vals[suspicious + 1]])
+    inner_steps = np.nan_to_num(np.abs(np.diff(y_full, axis=1)), nan=0.0)
+    worst = np.argmax(inner_steps, axis=1)
+    rows = np.arange(suspicious.size)
+    is_break = inner_steps[rows, worst] >= 0.75 * jumps[suspicious]
+
+    # Place one extra sample at the worst step of each interval: NaN for a
+    # confirmed break, the midpoint value for a steep but continuous one
+    x_break = 0.5 * (x_full[rows, worst] + x_full[rows, worst + 1])
+    y_break = np.where(is_break, np.nan, 0.5 * (y_full[rows, worst] + y_full[rows, worst + 1]))
+
+    columns = np.arange(refine_points + 1)[None, :]
+    source = np.clip(columns - (columns > worst[:, None]), 0, refine_points - 1)
+    x_insert = np.where(columns == worst[:, None], x_break[:, None], x_inner[rows[:, None], source])
+    y_insert = np.where(columns == worst[:, None], y_break[:, None], y_inner[rows[:, None], source])
+
+    positions = np.repeat(suspicious + 1, refine_points + 1)
+    return (np.insert(x_vals, positions, x_insert.ravel()),
+            np.insert(y_vals, positions, y_insert.ravel()))
+
+
+def mask_pole_crossings(y_rows, jump_fraction=0.25):
+    """
+    Breaks curves that share one x grid at poles, without changing the grid.
+
+    A step between neighbouring samples that flips sign and exceeds
+    `jump_fraction` of its row's robust height is treated as a pole, and the
+    endpoint with the larger magnitude is replaced by NaN. Works on every row
+    of the (N, len(x)) array at once.
+
+    Args:
+        y_rows (np.ndarray): Sampled values, one row per curve. Modified in place.
+        jump_fraction (float): Jump size, relative to the robust height, treated as a pole.
+
+    Returns:
+        np.ndarray: The same array, with NaN breaks applied.
+    """
+    y_rows[~np.isfinite(y_rows)] = np.nan
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        low, high = np.nanpercentile(y_rows, [2.0, 98.0], axis=1)
+    scale = np.nan_to_num(high - low, nan=0.0)
+
+    left, right = y_rows[:, :-1], y_rows[:, 1:]
+    with np.errstate(invalid='ignore'):
+        poles = (np.abs(right - left) > jump_fraction * scale[:, None]) & (np.sign(left) != np.sign(right))
+    rows, cols = np.nonzero(poles)
+    cols = cols + (np.abs(left[rows, cols]) < np.abs(right[rows, cols]))
+    y_rows[rows, cols] = np.nan
+    return y_rows
+
+
+# --------------------------- PARALLEL MESH EVALUATION ---------------------------
+# Samples per axis of a rendered surface: the fine level shown once the view is idle
+SURFACE_RESOLUTION = 200
+PARALLEL_MESH_MIN_POINTS = 250_000
+
+_WORKER_FUNCTIONS = {}
+
+
+def _evaluate_mesh_block(task):
+    """
+    Evaluates rows [row_start, row_stop) of a square mesh into shared memory.
+
+    Runs inside a pool process. The mesh coordinates are rebuilt locally from
+    the extent and resolution, and the function from its generated source, so
+    only a few small values cross the process boundary.
+
+    Args:
+        task (tuple): (shm_name, source, name, resolution, extent, row_start, row_stop).
+    """
+    from multiprocessing import shared_memory
+
+    shm_name, source, name, resolution, extent, row_start, row_stop = task
+    func = _WORKER_FUNCTIONS.get(source)
+    if func is None:
+        func = _WORKER_FUNCTIONS[source] = _function_from_source(source, name)
+
+    axis = np.linspace(-extent, extent, resolution)
+    X, Y = np.meshgrid(axis, axis[row_start:row_stop])
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        Z = np.broadcast_to(np.asarray(func(X, Y), dtype=float), X.shape)
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray((resolution, resolution), dtype=np.float64, buffer=shm.buf)
+        block = out[row_start:row_stop]
+        np.clip(np.nan_to_num(Z, nan=0.0, posinf=0.0, neginf=0.0), -50.0, 50.0, out=block)
+        del out, block
+    finally:
+        shm.close()
+
+
+class MeshEvaluationPool:
+    """
+    Evaluates large surface meshes in row blocks on a pool of processes.
+
+    Transcendental NumPy ufuncs run on one core, so a big mesh is split into
+    row blocks that pool processes evaluate in parallel. Each block is
+    written straight into one multiprocessing.shared_memory buffer, so no
+    array is pickled in either direction. The pool uses the spawn start
+    method, which is safe next to the Tk and worker threads. Its processes
+    are started on first use, which only happens for meshes of at least
+    PARALLEL_MESH_MIN_POINTS points, and reused for every later one.
+    """
+    BLOCKS_PER_WORKER = 4
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+
+    def _pool(self):
+        """Returns the process pool, starting it on first use."""
+        if self._executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def evaluate(self, compiled, resolution, extent):
+        """
+        Evaluates a compiled two-variable expression over a square mesh.
+
+        Args:
+            compiled (CompiledExpression): Expression compiled for ("x", "y"), with source.
+            resolution (int): Number of samples along each axis.
+            extent (float): The mesh spans [-extent, extent] in x and y.
+
+        Returns:
+            np.ndarray: The (resolution, resolution) surface, with non-finite values
+            replaced by 0 and clipped to [-50, 50].
+        """
+        from multiprocessing import shared_memory
+
+        shm = shared_memory.SharedMemory(create=True, size=resolution * resolution * 8)
+        try:
+            blocks = min(resolution, self.max_workers * self.BLOCKS_PER_WORKER)
+            bounds = np.linspace(0, resolution, blocks + 1).astype(int)
+            name = compiled.func.__name__
+            tasks = [(shm.name, compiled.source, name, resolution, extent, int(start), int(stop))
+                     for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+            list(self._pool().map(_evaluate_mesh_block, tasks))
+            return np.ndarray((resolution, resolution), dtype=np.float64, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def shutdown(self):
+        """Stops the pool processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# --------------------------- SURFACE CACHE ---------------------------
+SURFACE_CACHE_BYTES = 256 * 1024 * 1024
+
+
+class SurfaceData:
+    """
+    A surface evaluated for one expression, domain and resolution.
+
+    Holds everything both 3D views need: the compiled expression (for its
+    default constants), the mesh, the z-limits and the level-of-detail
+    pyramid. Instances are produced and cached by MathEngine.build_surface.
+    """
+    def __init__(self, compiled, X, Y, Z, zlim):
+        self.compiled = compiled
+        self.X = X
+        self.Y = Y
+        self.Z = Z
+        self.zlim = zlim
+        self.lod = SurfaceLOD(X, Y, Z)
+
+    @property
+    def nbytes(self):
+        """Memory owned by the surface's arrays; broadcast views count as free."""
+        return sum(array.nbytes for level in self.lod.levels for array in level
+                   if array.flags.owndata)
+
+
+# --------------------------- IMPLICIT SURFACES ---------------------------
+IMPLICIT_RESOLUTION = 40
+
+# Cube corner offsets (i, j, k) and the six tetrahedra sharing the diagonal 0-6
+_CUBE_CORNERS = ((0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0),
+                 (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1))
+_CUBE_TETRAHEDRA = ((0, 5, 1, 6), (0, 1, 2, 6), (0, 2, 3, 6),
+                    (0, 3, 7, 6), (0, 7, 4, 6), (0, 4, 5, 6))
+_TETRA_EDGES = ((0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3))
+
+
+def _tetra_case_table():
+    """
+    Builds the triangle table for the 16 inside/outside cases of a tetrahedron.
+
+    Returns:
+        list[list[tuple[int, int, int]]]: For each case bitmask (bit i set when
+        vertex i is inside), the triangles as triples of edge indices.
+    """
+    edge_index = {frozenset(edge): index for index, edge in enumerate(_TETRA_EDGES)}
+    edge = lambda a, b: edge_index[frozenset((a, b))]
+    table = []
+    for case in range(16):
+        inside = [v for v in range(4) if case >> v & 1]
+        outside = [v for v in range(4) if not case >> v & 1]
+        if len(inside) in (1, 3):
+            lone = inside[0] if len(inside) == 1 else outside[0]
+            others = [v for v in range(4) if v != lone]
+            table.append([tuple(edge(lone, v) for v in others)])
+        elif len(inside) == 2:
+            (a, b), (c, d) = inside, outside
+            table.append([(edge(a, c), edge(a, d), edge(b, d)),
+                          (edge(a, c), edge(b, d), edge(b, c))])
+        else:
+            table.append([])
+    return table
+
+
+_TETRA_CASES = _tetra_case_table()
+
+
+def marching_tetrahedra(F, axes):
+    """
+    Extracts the zero isosurface of a sampled scalar field as a triangle mesh.
+
+    This is the tetrahedral variant of marching cubes: every grid cube is
+    split into six tetrahedra along its main diagonal, so each cell has 16
+    unambiguous cases instead of the 256 cube cases with their ambiguous
+    faces. All cells are processed at once with NumPy, one
+    (tetrahedron, case) pair at a time. Vertices are placed on the crossing
+    edges by linear interpolation.
+
+    Args:
+        F (np.ndarray): Field values of shape (nx, ny, nz), indexed as F[i, j, k].
+        axes (tuple[np.ndarray, np.ndarray, np.ndarray]): Grid coordinates along x, y and z.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Vertices of shape (V, 3) and triangles of
+        shape (T, 3) indexing into them. Both are empty if F has no sign change.
+    """
+    nx, ny, nz = F.shape
+    coords = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1)
+    corner_values = [F[i:nx - 1 + i, j:ny - 1 + j, k:nz - 1 + k].ravel() for i, j, k in _CUBE_CORNERS]
+    corner_points = [coords[i:nx - 1 + i, j:ny - 1 + j, k:nz - 1 + k].reshape(-1, 3)
+                     for i, j, k in _CUBE_CORNERS]
+
+    triangles = []
+    for tetra in _CUBE_TETRAHEDRA:
+        values = np.stack([corner_values[c] for c in tetra], axis=1)
+        case = ((values < 0) * (1 << np.arange(4))).sum(axis=1)
+        crossing = (case != 0) & (case != 15) & np.isfinite(values).all(axis=1)
+        for case_id in np.unique(case[crossing]):
+            cells = np.nonzero(crossing & (case == case_id))[0]
+            v = values[cells]
+            points = np.stack([corner_points[c][cells] for c in tetra], axis=1)
+            edge_points = []
+            for a, b in _TETRA_EDGES:
+                va, vb = v[:, a], v[:, b]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    t = np.where(va != vb, va / (va - vb), 0.5)
+                edge_points.append(points[:, a] + t[:, np.newaxis] * (points[:, b] - points[:, a]))
+            for e0, e1, e2 in _TETRA_CASES[case_id]:
+                triangles.append(np.stack([edge_points[e0], edge_points[e1], edge_points[e2]], axis=1))
+
+    if not triangles:
+        return np.empty((0, 3)), np.empty((0, 3), dtype=int)
+    corners = np.concatenate(triangles).reshape(-1, 3)
+    return corners, np.arange(len(corners)).reshape(-1, 3)
+
+
+class ImplicitSurface:
+    """The zero set of F(x, y, z) = lhs - rhs as a triangle mesh."""
+    def __init__(self, compiled, vertices, triangles):
+        self.compiled = compiled
+        self.vertices = vertices
+        self.triangles = triangles
+
+
+BRANCH_RESOLUTION = 200
+
+
+class BranchSurfaces:
+    """
+    Every real branch z = f_i(x, y) of a solved equation, sampled on one mesh.
+
+    Zs holds one surface per branch; points where a branch is not real or
+    leaves [-50, 50] are NaN, so they are left out of the plot.
+    """
+    def __init__(self, compiled, X, Y, Zs, zlim):
+        self.compiled = compiled
+        self.X = X
+        self.Y = Y
+        self.Zs = Zs
+        self.zlim = zlim
+
+
+# --------------------------- SYMBOLIC SOLVER ---------------------------
+SOLVE_TIMEOUT = 5.0
+
+
+def _symbolic_solve_loop(conn):
+    """
+    Serves solve requests from the parent process until told to stop.
+
+    Runs inside the solver process. SymPy is imported before "ready" is sent,
+    so start-up does not count against a solve's time budget. Each request is
+    (equation_srepr, target) and is answered with ("ok", [solution strings])
+    or ("error", message).
+
+    Args:
+        conn (multiprocessing.connection.Connection): Child end of the request pipe.
+    """
+    sym.load()
+    conn.send("ready")
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        equation_srepr, target = request
+        try:
+            solutions = sym.solve(sym.sympify(equation_srepr), sym.Symbol(target))
+            conn.send(("ok", [str(solution) for solution in solutions]))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class SymbolicSolver:
+    """
+    Runs sym.solve in a separate process that can be killed when it overruns.
+
+    SymPy offers no way to interrupt a solve, so each one is sent to a
+    long-lived spawn process over a pipe. When a solve is not answered
+    within its time budget the process is killed, and a fresh one is started
+    for the next request. Solves are serialized by a lock.
+    """
+    def __init__(self):
+        self._process = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        """Returns the pipe to the solver process, starting the process on first use."""
+        if self._process is None or not self._process.is_alive():
+            import multiprocessing
+            if self._conn is not None:
+                self._conn.close()
+            context = multiprocessing.get_context("spawn")
+            self._conn, child_conn = context.Pipe()
+            self._process = context.Process(target=_symbolic_solve_loop, args=(child_conn,),
+                                            daemon=True)
+            self._process.start()
+            child_conn.close()
+            try:
+                self._conn.recv()
+            except EOFError:
+                self._process = None
+                raise ValueError("The symbolic solver process failed to start.")
+        return self._conn
+
+    def solve(self, equation_srepr, target, timeout):
+        """
+        Solves equation = 0 for target within a time budget.
+
+        Args:
+            equation_srepr (str): srepr of the SymPy expression equal to zero.
+            target (str): Name of the symbol to solve for.
+            timeout (float): Seconds to wait for the answer.
+
+        Returns:
+            list[str] | None: The solutions, or None if the budget ran out.
+
+        Raises:
+            ValueError: If SymPy raised while solving.
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.send((equation_srepr, target))
+            if not conn.poll(timeout):
+                self._kill()
+                return None
+            status, payload = conn.recv()
+        if status == "error":
+            raise ValueError(f"SymPy Solve Error: {payload}")
+        return payload
+
+    def _kill(self):
+        """Terminates the solver process, abandoning any solve in progress."""
+        self._process.kill()
+        self._process.join()
+        self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def shutdown(self):
+        """
+        Stops the solver process, abandoning any solve in progress.
+
+        Does not wait for the solve lock, so it returns at once even while a
+        solve is waiting on its time budget; that solve then fails.
+        """
+        process = self._process
+        if process is not None:
+            process.kill()
+            process.join()
 
 
 # --------------------------- MATH ENGINE ---------------------------
 # --------------------------- MATH ENGINE (FIXED) ---------------------------
 class MathEngine:
     """
-    Handles symbolic parsing and numerical evaluation of mathematical expressions.
+    Handles symbolic parsing and numerical evaluation of mathematical expressions.
+
+    This class centralizes all SymPy-related logic to ensure consistent handling
+    of functions, constants, and variable substitution across 2D and 3D plotting.
+    Compiled expressions are kept in a size-bounded LRU cache keyed on the
+    canonical form of the parsed expression, backed by an optional on-disk
+    cache for warm starts.
+    Amrie's section
+    """
+    def __init__(self, cache_size=128, disk_cache=True, cache_dir=None):
+        self._sympy_locals = None
+        # Names the user may type, mapped to the SymPy attributes they stand for
+        self.function_names = {
+            "sin": "sin", "cos": "cos", "tan": "tan", "sqrt": "sqrt",
+            "asin": "asin", "acos": "acos", "atan": "atan",
+            "sinh": "sinh", "cosh": "cosh", "tanh": "tanh",
+            "exp": "exp", "log": "log", "abs": "Abs",
+        }
+        self.constant_names = {"pi": "pi", "e": "E"}
+        # Names from sympy_locals that the SymPy-free fast path may emit directly
+        self.fast_path_functions = ("sin", "cos", "tan", "sqrt")
+        self.fast_path_constants = ("pi", "e")
+        self._token_cache = OrderedDict()      # raw expression -> tokens
+        self._token_streams = OrderedDict()    # joined tokens -> tokens, read by to_sympy_expr
+        self._token_lock = threading.Lock()    # guards both token maps apart from the engine lock
+        self._parameter_names = OrderedDict()  # normalized text key -> parameter names
+
+        # ---------- COMPILED EXPRESSION CACHE ----------
+        self.cache_size = cache_size
+        self._compiled_cache = OrderedDict()   # canonical key -> CompiledExpression
+        self._canonical_keys = OrderedDict()   # normalized text key -> canonical key
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.disk_cache = ExpressionDiskCache(cache_dir) if disk_cache else None
+        # Guards the caches only; compiles run outside it on the worker and the Tk thread
+        self._lock = threading.RLock()
+        self.mesh_pool = MeshEvaluationPool()
+
+        # ---------- SURFACE CACHE ----------
+        self.surface_cache_bytes = SURFACE_CACHE_BYTES
+        self._surface_cache = OrderedDict()    # (text, extent, resolution) -> SurfaceData
+        self._surface_bytes = 0
+        self.surface_hits = 0
+
+        # ---------- SYMBOLIC SOLVE CACHE ----------
+        self.solver = SymbolicSolver()
+        self.solve_timeout = SOLVE_TIMEOUT
+        self._solve_cache = OrderedDict()      # (canonical equation, target) -> [solutions]
+        self._solve_timeouts = {}              # (canonical equation, target) -> budget that ran out
+        self.solve_hits = 0
+
+    @property
+    def sympy_locals(self):
+        """Standard functions and constants for SymPy to recognize, built on first parse."""
+        if self._sympy_locals is None:
+            names = {**self.function_names, **self.constant_names}
+            self._sympy_locals = {name: getattr(sym, attr) for name, attr in names.items()}
+        return self._sympy_locals
+
+    @staticmethod
+    def _normalize_expression(expression: str) -> str:
+        """
+        Normalizes the spelling of an expression so trivially different inputs share a key.
+
+        Args:
+            expression (str): Raw expression string.
+
+        Returns:
+            str: Expression with '^' replaced by '**' and all whitespace removed.
+        """
+        return "".join(expression.strip().replace("^", "**").split())
+
+    def tokenize(self, expression: str):
+        """
+        Tokenizes a typed expression, reusing the result for a repeated input.
+
+        Args:
+            expression (str): Expression as typed by the user.
+
+        Returns:
+            tuple[str]: Tokens from tokenize_expression over function_names
+            and constant_names. Joined, they are already in the normalized
+            form that compile_expression keys its cache on, and the engine
+            keeps the tokens under that text so that to_sympy_expr parses
+            them directly instead of tokenizing the text again.
+        """
+        with self._token_lock:
+            tokens = self._token_cache.get(expression)
+            if tokens is not None:
+                self._token_cache.move_to_end(expression)
+                return tokens
+        tokens = tokenize_expression(expression, self.function_names, self.constant_names)
+        with self._token_lock:
+            self._remember(self._token_cache, expression, tokens, self.cache_size * 4)
+            self._remember(self._token_streams, "".join(tokens), tokens, self.cache_size * 4)
+        return tokens
+
+    def parameter_names(self, expression: str, variables=("x",)):
+        """
+        Lists the names in an expression that are neither variables nor known names.
+
+        Names are read from Python's ast of the normalized text, leaving out
+        called functions and the engine's constants; SymPy is only used when
+        the text is not valid Python.
+
+        Args:
+            expression (str): Mathematical expression as string.
+            variables (tuple[str]): Names that are not parameters.
+
+        Returns:
+            tuple[str]: The parameter names, sorted.
+
+        Raises:
+            ValueError: If the expression cannot be parsed.
+        """
+        key = (self._normalize_expression(expression), tuple(variables))
+        with self._lock:
+            names = self._parameter_names.get(key)
+            if names is not None:
+                self._parameter_names.move_to_end(key)
+                return names
+
+        try:
+            nodes = list(ast.walk(ast.parse(key[0], mode="eval")))
+            called = {node.func.id for node in nodes
+                      if isinstance(node, ast.Call) and isinstance(node.func, ast.Name)}
+            found = {node.id for node in nodes if isinstance(node, ast.Name)} - called
+        except (SyntaxError, RecursionError):
+            try:
+                found = {str(s) for s in self.to_sympy_expr(key[0]).free_symbols}
+            except Exception as e:
+                raise ValueError(f"SymPy Parsing Error: {e}")
+        names = tuple(sorted(found - set(variables) - set(self.constant_names)))
+
+        with self._lock:
+            self._remember(self._parameter_names, key, names, self.cache_size * 4)
+        return names
+
+    def bind_parameters(self, expression: str, variables=("x",), values=None):
+        """
+        Compiles an expression with its parameters as arguments and binds their values.
+
+        The expression is compiled once, through compile_expression, for the
+        variables followed by its parameter names; the result is cached like
+        any other compile. Binding different values reuses that callable, so
+        changing an assignment costs no sympify or lambdify. Parameters
+        without a value are bound to 1.0.
+
+        Args:
+            expression (str): Mathematical expression as string.
+            variables (tuple[str]): Names of the bound callable's positional arguments.
+            values (dict[str, float] | None): Parameter values by name; extra names are ignored.
+
+        Returns:
+            BoundExpression: Callable of the variables alone.
+
+        Raises:
+            ValueError: If the expression cannot be parsed by SymPy.
+        """
+        parameters = self.parameter_names(expression, variables)
+        compiled = self.compile_expression(expression, tuple(variables) + parameters)
+        return BoundExpression(compiled, parameters, values or {})
+
+    def compile_expression(self, expression: str, variables=("x",)):
+        """
+        Parses and compiles an expression, reusing a cached result when possible.
+
+        The cache is keyed on the canonical SymPy form of the expression, so
+        'x^2', 'x**2' and 'x * x' all resolve to the same entry. Symbols other
+        than the requested variables are substituted with a default of 1.0.
+        On a memory miss, plain arithmetic over the sympy_locals names is
+        compiled directly by the fast path; anything else is looked up in the
+        on-disk cache before falling back to sympify and lambdify. The engine
+        lock is held only to look up and insert cache entries, never while
+        compiling, so the Tk thread does not wait behind a worker compile.
+
+        Args:
+            expression (str): Mathematical expression as string.
+            variables (tuple[str]): Names of the callable's positional arguments.
+
+        Returns:
+            CompiledExpression: Parsed expression and its NumPy callable.
+
+        Raises:
+            ValueError: If the expression cannot be parsed by SymPy.
+        """
+        variables = tuple(variables)
+        text_key = (self._normalize_expression(expression), variables)
+        with self._lock:
+            canonical_key = self._canonical_keys.get(text_key)
+            if canonical_key is not None and canonical_key in self._compiled_cache:
+                self._canonical_keys.move_to_end(text_key)
+                return self._cache_hit(canonical_key)
+
+        tree = fast_path_tree(text_key[0], variables,
+                              self.fast_path_functions, self.fast_path_constants)
+        if tree is not None:
+            canonical_key = ("fast", fast_path_key(tree.body), variables)
+            with self._lock:
+                self._remember(self._canonical_keys, text_key, canonical_key, self.cache_size * 4)
+                if canonical_key in self._compiled_cache:
+                    return self._cache_hit(canonical_key)
+            func, source = _fast_path_function(tree, variables)
+            compiled = CompiledExpression(None, func, variables, (), source=source,
+                                          expr_loader=lambda: self.to_sympy_expr(*text_key))
+            return self._insert_compiled(canonical_key, compiled)
+
+        if self.disk_cache is not None:
+            compiled = self.disk_cache.load(*text_key)
+            if compiled is not None:
+                canonical_key = (compiled.srepr, variables)
+                with self._lock:
+                    self._remember(self._canonical_keys, text_key, canonical_key, self.cache_size * 4)
+                return self._insert_compiled(canonical_key, compiled)
+
+        try:
+            expr = self.to_sympy_expr(*text_key)
+        except Exception as e:
+            raise ValueError(f"SymPy Parsing Error: {e}")
+        if not isinstance(expr, sym.Expr):
+            raise ValueError(f"SymPy Parsing Error: '{expression}' is not an expression")
+
+        canonical_key = (sym.srepr(expr), variables)
+        with self._lock:
+            self._remember(self._canonical_keys, text_key, canonical_key, self.cache_size * 4)
+            compiled = self._cache_hit(canonical_key) if canonical_key in self._compiled_cache else None
+        if compiled is None:
+            symbols = [sym.Symbol(name) for name in variables]
+            defaults = sorted((s for s in expr.free_symbols if s not in symbols), key=str)
+            expr_with_defaults = expr.subs({s: 1.0 for s in defaults}) if defaults else expr
+            func = sym.lambdify(symbols, expr_with_defaults, modules=list(LAMBDIFY_MODULES))
+            try:
+                source = inspect.getsource(func)
+            except (OSError, TypeError):
+                source = None
+            compiled = self._insert_compiled(canonical_key, CompiledExpression(
+                expr, func, variables, [str(s) for s in defaults], source=source, srepr=canonical_key[0]))
+        if self.disk_cache is not None:
+            self.disk_cache.store(text_key[0], compiled)
+        return compiled
+
+    def _insert_compiled(self, canonical_key, compiled):
+        """
+        Adds a newly built expression to the cache and counts the miss.
+
+        Compiles run without the engine lock, so two threads may build the
+        same expression at once; the entry that reached the cache first wins
+        and is returned to both.
+        """
+        with self._lock:
+            self.cache_misses += 1
+            existing = self._compiled_cache.get(canonical_key)
+            if existing is not None:
+                self._compiled_cache.move_to_end(canonical_key)
+                return existing
+            self._remember(self._compiled_cache, canonical_key, compiled, self.cache_size)
+            return compiled
+
+    def _cache_hit(self, canonical_key):
+        """Marks a cache entry as most recently used and returns it."""
+        self.cache_hits += 1
+        self._compiled_cache.move_to_end(canonical_key)
+        return self._compiled_cache[canonical_key]
+
+    @staticmethod
+    def _remember(cache, key, value, max_size):
+        """Inserts a value into an OrderedDict, evicting the least recently used entries."""
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+
+    def cache_info(self):
+        """
+        Reports statistics for the compiled expression, surface and solve caches.
+
+        Returns:
+            dict: Hit count, miss count, current size and maximum size, plus the
+            number of cached surfaces, their hits and their memory in bytes, and
+            the number of cached solves and their hits.
+        """
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": len(self._compiled_cache),
+            "maxsize": self.cache_size,
+            "disk_hits": self.disk_cache.hits if self.disk_cache is not None else 0,
+            "surfaces": len(self._surface_cache),
+            "surface_hits": self.surface_hits,
+            "surface_bytes": self._surface_bytes,
+            "solves": len(self._solve_cache),
+            "solve_hits": self.solve_hits,
+        }
+
+    def clear_cache(self):
+        """Empties the in-memory compiled expression, surface and solve caches and resets their statistics."""
+        with self._lock:
+            self._compiled_cache.clear()
+            self._canonical_keys.clear()
+            self.cache_hits = 0
+            self.cache_misses = 0
+            self._surface_cache.clear()
+            self._surface_bytes = 0
+            self.surface_hits = 0
+            self._solve_cache.clear()
+            self._solve_timeouts.clear()
+            self.solve_hits = 0
+
+    # *** THIS IS THE MISSING METHOD THAT FIXES THE ERROR ***
+    def _evaluate_expression_for_graph(self, expression: str, x_range=GRAPH_X_RANGE,
+                                       max_points=GRAPH_POINT_BUDGET, parameters=None):
+        """
+        Evaluates a single-variable mathematical expression for 2D plotting.
+
+        The expression is compiled through the engine's cache with its other
+        symbols as parameters (see bind_parameters), which take the given
+        values or a default of 1.0, and generates numerical x and y arrays
+        suitable for matplotlib plotting. Samples are placed adaptively,
+        densest where the curve bends, and the line is broken with NaN at
+        poles and jump discontinuities.
+
+        Args:
+            expression (str): Mathematical expression containing variable x.
+            x_range (tuple[float, float]): Interval to sample.
+            max_points (int): Upper bound on the number of samples.
+            parameters (dict[str, float] | None): Values for symbols other than x.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Arrays of x-values and corresponding y-values.
+
+        Raises:
+            ValueError: If the expression cannot be parsed by SymPy. 
+            Amrie's section
+        """
+        
+        compiled = self.bind_parameters(expression, ("x",), parameters)
+        x_vals, y_vals = adaptive_sample(compiled, x_range[0], x_range[1], max_points=max_points)
+        x_vals, y_vals = insert_discontinuity_breaks(compiled, x_vals, y_vals)
+        y_vals = np.nan_to_num(y_vals, nan=np.nan, posinf=np.nan, neginf=np.nan)
+        return x_vals, y_vals
+
+    def build_surface(self, expression, resolution=SURFACE_RESOLUTION, extent=5.0):
+        """
+        Returns the surface of a two-variable expression, reusing a cached one when possible.
+
+        This is the single surface pipeline behind 3D Render and 3D Animate.
+        It compiles the expression, evaluates the mesh, picks the z-limits and
+        builds the level-of-detail pyramid. Results are kept in an LRU cache
+        keyed on the normalized expression, domain and resolution. The cache
+        evicts the least recently used surfaces once their arrays exceed
+        surface_cache_bytes. By default the mesh has SURFACE_RESOLUTION
+        samples per axis, the finest level ever displayed, so no samples are
+        evaluated only to be decimated away.
+
+        Args:
+            expression (str): Expression in terms of x and y.
+            resolution (int): Number of samples along each axis.
+            extent (float): The mesh spans [-extent, extent] in x and y.
+
+        Returns:
+            SurfaceData: The evaluated surface.
+
+        Raises:
+            ValueError: If the expression cannot be parsed by SymPy.
+        """
+        key = (self._normalize_expression(expression), float(extent), int(resolution))
+        with self._lock:
+            surface = self._surface_cache.get(key)
+            if surface is not None:
+                self._surface_cache.move_to_end(key)
+                self.surface_hits += 1
+                return surface
+
+        compiled = self.compile_expression(expression, ("x", "y"))
+        X, Y, Z = self.evaluate_surface(compiled, resolution, extent)
+        surface = SurfaceData(compiled, X, Y, Z, surface_limits(Z))
+
+        with self._lock:
+            previous = self._surface_cache.pop(key, None)
+            if previous is not None:
+                self._surface_bytes -= previous.nbytes
+            self._surface_cache[key] = surface
+            self._surface_bytes += surface.nbytes
+            while self._surface_bytes > self.surface_cache_bytes and len(self._surface_cache) > 1:
+                _, evicted = self._surface_cache.popitem(last=False)
+                self._surface_bytes -= evicted.nbytes
+        return surface
+
+    def solve_equation(self, equation, target="z", timeout=None):
+        """
+        Solves lhs = rhs symbolically for one variable, within a time budget.
+
+        Results are cached on the canonical form of lhs - rhs (up to sign), so
+        'z^2 = x' and 'x = z**2' share an entry and repeated renders skip the
+        solve entirely. The solve itself runs in the engine's SymbolicSolver
+        process; a solve that overruns is killed and reported as None, and the
+        equation is not retried unless a larger budget is given.
+
+        Args:
+            equation (str): Equation containing a single '='.
+            target (str): Variable to solve for.
+            timeout (float | None): Seconds allowed; defaults to solve_timeout.
+
+        Returns:
+            list[str] | None: The solutions, possibly empty, or None on timeout.
+
+        Raises:
+            ValueError: If the equation cannot be parsed or SymPy fails to solve it.
+        """
+        timeout = self.solve_timeout if timeout is None else timeout
+        lhs_str, rhs_str = equation.split("=", 1)
+        try:
+            lhs = self.to_sympy_expr(self._normalize_expression(lhs_str))
+            rhs = self.to_sympy_expr(self._normalize_expression(rhs_str))
+            expr = lhs - rhs
+        except Exception as e:
+            raise ValueError(f"Could not parse equation terms: {e}")
+        key = (min(sym.srepr(expr), sym.srepr(-expr)), target)
+
+        with self._lock:
+            if key in self._solve_cache:
+                self.solve_hits += 1
+                self._solve_cache.move_to_end(key)
+                return self._solve_cache[key]
+            if self._solve_timeouts.get(key, -1.0) >= timeout:
+                return None
+
+        solutions = self.solver.solve(key[0], target, timeout)
+        with self._lock:
+            if solutions is None:
+                self._solve_timeouts[key] = timeout
+            else:
+                self._remember(self._solve_cache, key, solutions, self.cache_size)
+        return solutions
+
+    def compile_branches(self, branches, variables=("x", "y")):
+        """
+        Compiles several expressions into one callable that returns all of them.
+
+        The branches are lambdified together with common subexpression
+        elimination, so a term shared by every branch (such as the square
+        root in both halves of a sphere) is evaluated once per call.
+
+        Args:
+            branches (list[str]): Expression strings, e.g. the solutions of an equation.
+            variables (tuple[str]): Names of the callable's positional arguments.
+
+        Returns:
+            CompiledExpression: Expression whose func returns a list, one array per branch.
+
+        Raises:
+            ValueError: If a branch cannot be parsed by SymPy.
+        """
+        variables = tuple(variables)
+        key = ("branches", tuple(self._normalize_expression(b) for b in branches), variables)
+        with self._lock:
+            if key in self._compiled_cache:
+                return self._cache_hit(key)
+
+        try:
+            exprs = [self.to_sympy_expr(text, variables) for text in key[1]]
+        except Exception as e:
+            raise ValueError(f"SymPy Parsing Error: {e}")
+        symbols = [sym.Symbol(name) for name in variables]
+        defaults = sorted(set().union(*(expr.free_symbols for expr in exprs)) - set(symbols), key=str)
+        exprs = [expr.subs({s: 1.0 for s in defaults}) for expr in exprs] if defaults else exprs
+        func = sym.lambdify(symbols, exprs, modules=list(LAMBDIFY_MODULES), cse=True)
+        compiled = CompiledExpression(sym.Tuple(*exprs), func, variables, [str(s) for s in defaults])
+        return self._insert_compiled(key, compiled)
+
+    def build_branch_surfaces(self, branches, resolution=BRANCH_RESOLUTION, extent=5.0):
+        """
+        Samples every branch z = f_i(x, y) of a solved equation over one mesh.
+
+        All branches come from a single compile_branches call evaluated once
+        on complex inputs, so a branch whose formula passes through complex
+        intermediates (as cubic roots do) still yields its real values. Points
+        where a branch has a non-zero imaginary part, is not finite, or
+        leaves [-50, 50] are set to NaN rather than 0, so no false flat sheets
+        are drawn. Branches that are nowhere real are dropped.
+
+        Args:
+            branches (list[str]): Solutions for z in terms of x and y.
+            resolution (int): Number of samples along each axis.
+            extent (float): The mesh spans [-extent, extent] in x and y.
+
+        Returns:
+            BranchSurfaces: The real parts of the branches and their shared z-limits.
+
+        Raises:
+            ValueError: If a branch cannot be parsed or none is real inside the mesh.
+        """
+        compiled = self.compile_branches(branches, ("x", "y"))
+        X, Y = np.meshgrid(np.linspace(-extent, extent, resolution),
+                           np.linspace(-extent, extent, resolution), copy=False)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            values = compiled.func(X.astype(complex), Y.astype(complex))
+            Zs = np.stack([np.broadcast_to(np.asarray(value, dtype=complex), X.shape)
+                           for value in values])
+            real = np.abs(Zs.imag) <= 1e-9 * np.maximum(1.0, np.abs(Zs.real))
+            Zs = np.where(real, Zs.real, np.nan)
+            Zs[~np.isfinite(Zs) | (np.abs(Zs) > 50.0)] = np.nan
+        Zs = Zs[~np.isnan(Zs).all(axis=(1, 2))]
+        if len(Zs) == 0:
+            raise ValueError(f"No solution for z is real within [-{extent:g}, {extent:g}]^2.")
+        return BranchSurfaces(compiled, X, Y, Zs, surface_limits(Zs))
+
+    def build_implicit_surface(self, equation, resolution=IMPLICIT_RESOLUTION, extent=5.0):
+        """
+        Meshes the surface lhs = rhs numerically, without solving for any variable.
+
+        F(x, y, z) = lhs - rhs is compiled once and sampled on a broadcast 3D
+        grid; marching_tetrahedra then extracts its zero isosurface, so every
+        branch of the surface is drawn (a whole sphere rather than one half).
+        Unassigned constants default to 1.0 as elsewhere.
+
+        Args:
+            equation (str): Equation containing a single '='.
+            resolution (int): Number of samples along each axis.
+            extent (float): The grid spans [-extent, extent] on every axis.
+
+        Returns:
+            ImplicitSurface: The compiled F and its triangle mesh.
+
+        Raises:
+            ValueError: If the equation cannot be parsed or has no surface inside the grid.
+        """
+        lhs, rhs = equation.split("=", 1)
+        compiled = self.compile_expression(f"({lhs})-({rhs})", ("x", "y", "z"))
+        axis = np.linspace(-extent, extent, resolution)
+        F = compiled(*np.meshgrid(axis, axis, axis, indexing="ij", sparse=True))
+        vertices, triangles = marching_tetrahedra(F, (axis, axis, axis))
+        if len(triangles) == 0:
+            raise ValueError(f"The surface {equation} does not cross the region [-{extent:g}, {extent:g}]^3.")
+        return ImplicitSurface(compiled, vertices, triangles)
+
+    def evaluate_surface(self, compiled, resolution, extent=5.0):
+        """
+        Evaluates a two-variable expression over a square mesh for 3D plotting.
+
+        Non-finite values are replaced with 0 and the surface is clipped to
+        [-50, 50] so a single pole cannot flatten the rest of the plot. Large
+        meshes are split into row blocks and evaluated on the engine's
+        MeshEvaluationPool when more than one core is available.
+
+        Args:
+            compiled (CompiledExpression): Expression compiled for ("x", "y").
+            resolution (int): Number of samples along each axis.
+            extent (float): The mesh spans [-extent, extent] in x and y.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: The X, Y and Z arrays.
+        """
+        X, Y = np.meshgrid(np.linspace(-extent, extent, resolution),
+                           np.linspace(-extent, extent, resolution), copy=False)
+        if self._use_mesh_pool(compiled, resolution):
+            try:
+                return X, Y, self.mesh_pool.evaluate(compiled, resolution, extent)
+            except Exception:
+                pass
+        Z = compiled(X, Y)
+        Z = np.nan_to_num(Z, nan=0.0, posinf=0.0, neginf=0.0)
+        return X, Y, np.clip(Z, -50.0, 50.0)
+
+    def _use_mesh_pool(self, compiled, resolution):
+        """Decides whether a mesh is large enough, and the machine wide enough, for the process pool."""
+        return (self.mesh_pool is not None and compiled.source is not None
+                and self.mesh_pool.max_workers > 1
+                and resolution * resolution >= PARALLEL_MESH_MIN_POINTS)
+
+    def evaluate_grid(self, expression, grid):
+        """
+        Evaluates an expression over the Cartesian product of variable values.
+
+        The expression is compiled once with the grid's variables as its
+        arguments. Each variable is passed as an open (sparse) axis, so NumPy
+        broadcasting fills the whole grid in one call without building the
+        full coordinate arrays. Other symbols default to 1.0.
+
+        Args:
+            expression (str): Mathematical expression as string.
+            grid (dict[str, np.ndarray]): Variable names and their 1-D values, in order.
+
+        Returns:
+            tuple[CompiledExpression, np.ndarray]: The compiled expression and its
+            values, shaped by the lengths of the grid's value arrays.
+
+        Raises:
+            ValueError: If the expression cannot be parsed or the grid has more than
+                GRID_POINTS_MAX points.
+        """
+        shape = tuple(len(values) for values in grid.values())
+        size = math.prod(shape)
+        if size > GRID_POINTS_MAX:
+            raise ValueError(f"The grid has {size:,} points; the limit is {GRID_POINTS_MAX:,}.")
+        compiled = self.compile_expression(expression, tuple(grid))
+        axes = np.meshgrid(*grid.values(), indexing="ij", sparse=True) if grid else ()
+        return compiled, np.asarray(compiled(*axes), dtype=float)
+
+    def evaluate_curves(self, expressions, x_vals, parameters=None):
+        """
+        Evaluates several single-variable expressions over one shared grid.
+
+        Each expression is compiled through the cache, with its other symbols
+        as parameters, and evaluated once over the whole grid, filling one row
+        of a preallocated (N, len(x)) array.
+
+        Args:
+            expressions (list[str]): Expressions in terms of x.
+            x_vals (np.ndarray): Shared x-values.
+            parameters (dict[str, float] | None): Values for symbols other than x.
+
+        Returns:
+            np.ndarray: Array of shape (len(expressions), len(x_vals)).
+
+        Raises:
+            ValueError: If any expression cannot be parsed by SymPy.
+        """
+        compiled = [self.bind_parameters(expression, ("x",), parameters) for expression in expressions]
+        y_rows = np.empty((len(compiled), x_vals.size))
+        for row, f in zip(y_rows, compiled):
+            row[:] = f(x_vals)
+        return mask_pole_crossings(y_rows)
+
+    def to_sympy_expr(self, expression: str, symbols=()):
+        """
+        Converts a string expression into a SymPy expression.
+
+        Text that came out of tokenize is parsed from its token stream, which
+        skips the Python tokenizer inside sympify; any other text, or tokens
+        that sympy_token_pairs cannot pass on, goes through sympify.
+
+        Args:
+            expression (str): Mathematical expression as string.
+            symbols (tuple[str]): Names read as plain Symbols even where SymPy
+                defines them, such as the variables and parameters E, I, N or S.
+
+        Returns:
+            sympy.Expr: Parsed SymPy expression. 
+            Amrie's section
+        """
+        expr_str = expression.strip().replace("^", "**")
+        namespace = {**self.sympy_locals, **{name: sym.Symbol(name) for name in symbols}}
+        with self._token_lock:
+            tokens = self._token_streams.get(expr_str)
+        pairs = None if tokens is None else sympy_token_pairs(tokens)
+        if pairs is None:
+            return sym.sympify(expr_str, locals=namespace)
+        return parse_token_pairs(pairs, namespace)
+
+# -------------------------------------------------------------------------
+
+# --------------------------- BACKGROUND WORKER ---------------------------
+class EvaluationWorker:
+    """
+    Runs MathEngine work on a background thread and hands results back to Tk.
+
+    Jobs run one at a time on a single worker thread. Callbacks only ever run
+    on the Tk thread: completion is picked up by polling with root.after
+    rather than by touching Tk from the worker. Each channel holds at most
+    one request. A newer request on the same channel supersedes the older
+    one: the older job is cancelled if it has not started yet, and its
+    result is discarded if it has. A running job cannot be interrupted, so
+    a superseded job still finishes before the next one starts.
+    """
+    POLL_MS = 15
+
+    def __init__(self, root, on_busy=None):
+        self.root = root
+        self.on_busy = on_busy
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="math-worker")
+        self._pending = {}   # channel -> (future, on_result, on_error)
+        self._quiet = set()  # channels whose requests do not count as busy
+        self._poll_job = None
+
+    @property
+    def busy(self):
+        """True while any request that is not quiet is still in flight."""
+        return any(channel not in self._quiet for channel in self._pending)
+
+    def submit(self, job, on_result, on_error=None, channel="default", quiet=False):
+        """
+        Runs job() in the background and passes its return value to on_result on the Tk thread.
+
+        Args:
+            job (callable): Work to run; must not touch Tk or matplotlib artists.
+            on_result (callable): Called with the job's return value.
+            on_error (callable | None): Called with the exception if the job or
+                on_result raises.
+            channel (str): Requests on the same channel supersede each other.
+            quiet (bool): Leaves the busy state alone, for routine background work
+                such as prefetching animation frames.
+
+        Returns:
+            concurrent.futures.Future: The job's future.
+        """
+        previous = self._pending.pop(channel, None)
+        if previous is not None:
+            previous[0].cancel()
+        future = self._executor.submit(job)
+        self._pending[channel] = (future, on_result, on_error)
+        if quiet:
+            self._quiet.add(channel)
+        else:
+            self._quiet.discard(channel)
+            self._set_busy(True)
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.POLL_MS, self._poll)
+        return future
+
+    def cancel(self, channel="default"):
+        """Drops the request on a channel so its result is never delivered."""
+        entry = self._pending.pop(channel, None)
+        if entry is None:
+            return
+        entry[0].cancel()
+        if not self.busy:
+            self._set_busy(False)
+
+    def flush(self, timeout=None):
+        """
+        Waits for every pending request and delivers its result immediately.
+
+        Lets callers without a running Tk event loop, such as tests and
+        shutdown code, consume results synchronously.
+
+        Args:
+            timeout (float | None): Seconds to wait in total; None waits indefinitely.
+
+        Raises:
+            TimeoutError: If a request is still running when the timeout expires.
+                Requests that finished in time have been delivered.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._pending:
+            for channel, (future, _, _) in list(self._pending.items()):
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    future.exception(remaining)
+                except TimeoutError:
+                    raise TimeoutError(f"A request on channel '{channel}' is still running "
+                                       f"after {timeout:g} s.") from None
+                except Exception:
+                    pass
+                self._deliver(channel)
+
+    def shutdown(self):
+        """Cancels pending requests and stops the worker thread."""
+        for channel in list(self._pending):
+            self.cancel(channel)
+        if self._poll_job is not None:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _set_busy(self, busy):
+        """Reports busy state changes to the UI."""
+        if self.on_busy is not None:
+            self.on_busy(busy)
+
+    def _poll(self):
+        """Delivers finished requests and keeps polling while any are in flight."""
+        self._poll_job = None
+        for channel, (future, _, _) in list(self._pending.items()):
+            if future.done():
+                self._deliver(channel)
+        if self._pending:
+            self._poll_job = self.root.after(self.POLL_MS, self._poll)
+
+    def _deliver(self, channel):
+        """Runs the callback of a finished request on the calling (Tk) thread."""
+        entry = self._pending.get(channel)
+        if entry is None or not entry[0].done():
+            return
+        future, on_result, on_error = entry
+        del self._pending[channel]
+        if not self.busy:
+            self._set_busy(False)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            try:
+                on_result(future.result())
+                return
+            except Exception as e:
+                error = e
+        if on_error is not None:
+            on_error(error)
+
+
+# --------------------------- PLOT MANAGER ---------------------------
+class PlotManager:
+    """
+    Manages all matplotlib plotting operations.
+
+    Responsible for clearing, styling, and rendering 2D graphs within
+    the embedded Tkinter canvas. Line and decoration artists are kept between
+    graphs and updated in place. Several curves can be overlaid, each with its
+    own legend entry that toggles it on click. When a graph is drawn with a
+    sampler, zooming and panning re-evaluate it over the visible x-range
+    only, at a resolution tied to the canvas width, on the background
+    worker when one is given.
+    Daniels section
+    """
+    VIEWPORT_DEBOUNCE_MS = 60
+    SCROLL_ZOOM_FACTOR = 1.2
+    CURVE_COLORS = ("#8FD4FA", "#FFC107", "#F44336", "#69F0AE", "#E040FB", "#FF8A65")
+
+    def __init__(self, plot_area, canvas, worker=None):
+        self.plot_area = plot_area
+        self.canvas = canvas
+        self.worker = worker
+        self.sampler = None
+        self._lines = []
+        self._legend_lines = {}
+        self._legend_labels = None
+        self._decorated_axes = None
+        self._nav_axes = None
+        self._refresh_job = None
+        self._scroll_cid = None
+        self._pick_cid = None
+
+        # Rows already evaluated on the default grid, keyed by (expression, sorted parameter items)
+        self.curve_grid = None
+        self.curve_rows = {}
+        self.hidden_curves = set()
+
+    def draw_graph(self, x_vals, y_vals, expression, sampler=None):
+        """
+        Renders a 2D line graph on the matplotlib plot area.
+
+        Args:
+            x_vals (np.ndarray): X-axis values.
+            y_vals (np.ndarray): Corresponding Y-axis values.
+            expression (str): Original expression entered by the user. 
+            sampler (callable | None): Function (x_min, x_max, max_points) -> (x_vals, y_vals)
+                used to re-evaluate the curve when the view is zoomed or panned.
+            Daniels section
+        """
+        self.draw_curves(x_vals, np.atleast_2d(y_vals), [expression], sampler=sampler)
+
+    def draw_curves(self, x_vals, y_rows, expressions, keys=None, grid_key=None, sampler=None):
+        """
+        Renders one or more curves that share an x grid.
+
+        Args:
+            x_vals (np.ndarray): Shared x-axis values.
+            y_rows (np.ndarray): Array of shape (N, len(x_vals)), one row per curve.
+            expressions (list[str]): Expressions as entered, used for the legend.
+            keys (list[Hashable] | None): Cache keys for the rows; rows are kept for
+                reuse when grid_key is given.
+            grid_key (tuple | None): Identifies the grid the rows were evaluated on.
+            sampler (callable | None): Function (x_min, x_max, max_points) -> (x_vals, y_rows)
+                used to re-evaluate every curve when the view is zoomed or panned.
+        """
+        self.sampler = None
+        if self._decorated_axes is not self.plot_area:
+            self._decorate()
+
+        keys = list(keys) if keys is not None else list(expressions)
+        if grid_key is not None:
+            self.remember_rows(grid_key, keys, y_rows)
+
+        labels = []
+        for index, (row, expression) in enumerate(zip(y_rows, expressions)):
+            label = f"f(x) = {expression}" if len(expressions) == 1 else f"f{index + 1}(x) = {expression}"
+            color = self.CURVE_COLORS[index % len(self.CURVE_COLORS)]
+            if index < len(self._lines):
+                line = self._lines[index]
+                line.set_data(x_vals, row)
+                line.set_label(label)
+                line.set_color(color)
+            else:
+                # Plot line color to a vibrant cyan for visibility on dark plot
+                line, = self.plot_area.plot(x_vals, row, label=label, color=color)
+                self._lines.append(line)
+            line.set_gid(expression)
+            line.set_visible(expression not in self.hidden_curves)
+            labels.append(label)
+
+        for line in self._lines[len(labels):]:
+            line.remove()
+        del self._lines[len(labels):]
+
+        if labels != self._legend_labels:
+            self._build_legend()
+            self._legend_labels = labels
+
+        self.plot_area.set_autoscale_on(True)
+        self.plot_area.relim()
+        self.plot_area.autoscale_view()
+        self._fit_y_limits(np.asarray(y_rows))
+
+        # Autoscaling above may have queued a refresh for the previous curves
+        self._cancel_refresh()
+        self.sampler = sampler
+        if sampler is not None:
+            self._enable_navigation()
+        self.canvas.draw_idle()
+
+    def remember_rows(self, grid_key, keys, y_rows):
+        """
+        Keeps curve rows evaluated on the default grid so a later graph can reuse them.
+
+        Args:
+            grid_key (tuple): Identifies the grid the rows were evaluated on.
+            keys (list[Hashable]): Cache key of each row.
+            y_rows (np.ndarray): Array of shape (N, len(x)), one row per key.
+        """
+        self.curve_grid = grid_key
+        self.curve_rows = dict(zip(keys, y_rows))
+
+    def reset(self, plot_area):
+        """
+        Points the manager at a freshly created axes and forgets the old artists.
+
+        Called after the figure has been rebuilt, e.g. when switching between
+        2D and 3D views.
+
+        Args:
+            plot_area (matplotlib.axes.Axes): The new 2D axes.
+        """
+        self._cancel_refresh()
+        self.plot_area = plot_area
+        self.sampler = None
+        self._lines = []
+        self._legend_lines = {}
+        self._legend_labels = None
+        self._decorated_axes = None
+        self._nav_axes = None
+
+    def _decorate(self):
+        """Clears the axes once and adds the title, axis labels and grid."""
+        self.plot_area.clear() 
+        self._lines = []
+        self._legend_lines = {}
+        self._legend_labels = None
+        self._nav_axes = None
+        self.plot_area.set_title("Graphing Calculator", color = "#8FD4FA")
+        self.plot_area.set_xlabel("x", color = "#8FD4FA")
+        self.plot_area.set_ylabel("f(x)", color = "#8FD4FA")
+        self.plot_area.grid(True)
+        self._decorated_axes = self.plot_area
+
+    def _build_legend(self):
+        """Creates the legend and makes each entry clickable to toggle its curve."""
+        legend = self.plot_area.legend()
+        self._legend_lines = {}
+        for legend_line, line in zip(legend.get_lines(), self._lines):
+            legend_line.set_picker(True)
+            legend_line.set_pickradius(6)
+            legend_line.set_alpha(1.0 if line.get_visible() else 0.25)
+            self._legend_lines[legend_line] = line
+        if self._pick_cid is None:
+            self._pick_cid = self.canvas.mpl_connect("pick_event", self._on_legend_pick)
+
+    def _on_legend_pick(self, event):
+        """
+        Shows or hides a curve when its legend entry is clicked.
+
+        Only visibility changes, so no curve is re-evaluated.
+        """
+        line = self._legend_lines.get(event.artist)
+        if line is None:
+            return
+        visible = not line.get_visible()
+        line.set_visible(visible)
+        event.artist.set_alpha(1.0 if visible else 0.25)
+        if visible:
+            self.hidden_curves.discard(line.get_gid())
+        else:
+            self.hidden_curves.add(line.get_gid())
+        self.canvas.draw_idle()
+
+    def _fit_y_limits(self, y_vals):
+        """
+        Keeps the tips of near-pole spikes from flattening the rest of the curve.
+
+        Autoscaling is kept unless the data's full height is more than three
+        times its robust (2nd to 98th percentile) height.
+        """
+        finite = y_vals[np.isfinite(y_vals)]
+        if finite.size == 0:
+            return
+        low, high = _robust_range(finite)
+        if finite.max() - finite.min() > 3 * (high - low):
+            pad = 0.1 * (high - low)
+            self.plot_area.set_ylim(low - pad, high + pad)
+
+    # ------------------- VIEWPORT NAVIGATION -------------------
+    def _enable_navigation(self):
+        """Hooks the current axes and canvas up to viewport-driven re-evaluation."""
+        if self._nav_axes is not self.plot_area:
+            self.plot_area.callbacks.connect("xlim_changed", self._on_xlim_changed)
+            self._nav_axes = self.plot_area
+        if self._scroll_cid is None:
+            self._scroll_cid = self.canvas.mpl_connect("scroll_event", self._on_scroll)
+
+    def _on_scroll(self, event):
+        """
+        Zooms the 2D view about the mouse pointer on wheel scroll.
+
+        Args:
+            event (matplotlib.backend_bases.MouseEvent): Scroll event from the canvas.
+        """
+        if event.inaxes is not self.plot_area or self.sampler is None or event.xdata is None:
+            return
+        factor = 1 / self.SCROLL_ZOOM_FACTOR if event.button == "up" else self.SCROLL_ZOOM_FACTOR
+        x_min, x_max = self.plot_area.get_xlim()
+        y_min, y_max = self.plot_area.get_ylim()
+        self.plot_area.set_xlim(event.xdata - (event.xdata - x_min) * factor,
+                                event.xdata + (x_max - event.xdata) * factor)
+        self.plot_area.set_ylim(event.ydata - (event.ydata - y_min) * factor,
+                                event.ydata + (y_max - event.ydata) * factor)
+        self.canvas.draw_idle()
+
+    def _on_xlim_changed(self, axes):
+        """Schedules a debounced re-evaluation whenever the visible x-range changes."""
+        if axes is not self.plot_area or self.sampler is None:
+            return
+        self._cancel_refresh()
+        self._refresh_job = self.canvas.get_tk_widget().after(self.VIEWPORT_DEBOUNCE_MS,
+                                                              self._refresh_viewport)
+
+    def _cancel_refresh(self):
+        """Cancels a pending viewport re-evaluation, if any."""
+        if self._refresh_job is not None:
+            self.canvas.get_tk_widget().after_cancel(self._refresh_job)
+            self._refresh_job = None
+
+    def _refresh_viewport(self):
+        """
+        Re-samples the current curves over the visible x-range.
+
+        The point budget is twice the canvas width in pixels, so zooming in
+        reveals detail instead of stretching the original samples.
+        """
+        self._refresh_job = None
+        if self.sampler is None or not self._lines:
+            return
+        x_min, x_max = self.plot_area.get_xlim()
+        width_px = max(self.canvas.get_tk_widget().winfo_width(), 100)
+        sampler = self.sampler
+        if self.worker is not None:
+            self.worker.submit(lambda: sampler(x_min, x_max, 2 * width_px),
+                               lambda result: self._apply_samples(sampler, *result),
+                               channel="viewport")
+            return
+        try:
+            x_vals, y_rows = sampler(x_min, x_max, 2 * width_px)
+        except Exception:
+            return
+        self._apply_samples(sampler, x_vals, y_rows)
+
+    def _apply_samples(self, sampler, x_vals, y_rows):
+        """Puts re-sampled data on the lines, unless a new graph replaced the sampler meanwhile."""
+        if sampler is not self.sampler:
+            return
+        for line, row in zip(self._lines, np.atleast_2d(y_rows)):
+            line.set_data(x_vals, row)
+        self.canvas.draw_idle()
+
+
+# --------------------------- 3D ANIMATION ---------------------------
+FRAME_CACHE_BYTES = 128 * 1024 * 1024
+TIME_STEP = 0.05
+TIME_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+def draw_surface_scene(figure, X, Y, Z, zlim, title):
+    """
+    Draws the styled 3D surface scene used by the render and animation views.
 
-    This class centralizes all SymPy-related logic to ensure consistent handling
-    of functions, constants, and variable substitution across 2D and 3D plotting.
-    Amrie's section
+    Every row and column of the mesh is drawn; pass a decimated level from
+    SurfaceLOD to control the polygon count. Colours are normalized to zlim
+    so that every level of a surface is coloured alike.
+
+    Args:
+        figure (Figure): Figure to draw into; it is cleared first.
+        X, Y, Z (np.ndarray): Surface mesh.
+        zlim (tuple[float, float]): z-axis limits.
+        title (str): Axes title.
+
+    Returns:
+        Axes3D: The new 3D axes.
     """
-    def __init__(self):
-        # Define all standard functions and constants for SymPy to recognize 
-        self.sympy_locals = {
-            "sin": sym.sin,
-            "cos": sym.cos,
-            "tan": sym.tan,
-            "sqrt": sym.sqrt,
-            "pi": sym.pi,
-            "e": sym.E
-        }
+    ax3d = _new_3d_axes(figure, title)
+    _plot_surface_level(ax3d, X, Y, Z, zlim)
+    ax3d.set_zlim(*zlim)
+    return ax3d
 
-    # *** THIS IS THE MISSING METHOD THAT FIXES THE ERROR ***
-    def _evaluate_expression_for_graph(self, expression: str):
+
+def draw_branch_scene(figure, surface, title):
+    """
+    Draws every branch of a solved equation in the styled 3D scene.
+
+    Each branch is its own surface artist; all share one colour scale.
+
+    Args:
+        figure (Figure): Figure to draw into; it is cleared first.
+        surface (BranchSurfaces): Branches from MathEngine.build_branch_surfaces.
+        title (str): Axes title.
+
+    Returns:
+        Axes3D: The new 3D axes.
+    """
+    ax3d = _new_3d_axes(figure, title)
+    for Z in surface.Zs:
+        _plot_surface_level(ax3d, surface.X, surface.Y, Z, surface.zlim)
+    ax3d.set_zlim(*surface.zlim)
+    return ax3d
+
+
+def draw_implicit_scene(figure, surface, title):
+    """
+    Draws the triangle mesh of an implicit surface in the styled 3D scene.
+
+    Args:
+        figure (Figure): Figure to draw into; it is cleared first.
+        surface (ImplicitSurface): Mesh from MathEngine.build_implicit_surface.
+        title (str): Axes title.
+
+    Returns:
+        Axes3D: The new 3D axes.
+    """
+    ax3d = _new_3d_axes(figure, title)
+    vertices = surface.vertices
+    ax3d.plot_trisurf(vertices[:, 0], vertices[:, 1], vertices[:, 2], triangles=surface.triangles,
+                      cmap="cool", edgecolor="none")
+    return ax3d
+
+
+def _new_3d_axes(figure, title):
+    """Clears the figure and adds a 3D axes with the app's dark styling."""
+    _ensure_mplot3d()
+    figure.clf()
+    ax3d = figure.add_subplot(111, projection="3d", facecolor="#000000")
+    ax3d.set_xlabel("x", color="#8FD4FA")
+    ax3d.set_ylabel("y", color="#8FD4FA")
+    ax3d.set_zlabel("z", color="#8FD4FA")
+    ax3d.tick_params(axis='x', colors="#8FD4FA")
+    ax3d.tick_params(axis='y', colors="#8FD4FA")
+    ax3d.tick_params(axis='z', colors="#B0BEC5")
+    ax3d.set_title(title, color="#8FD4FA")
+    return ax3d
+
+
+def _plot_surface_level(axes, X, Y, Z, zlim):
+    """Adds a surface that draws every row and column of the given mesh."""
+    rows, cols = Z.shape
+    return axes.plot_surface(X, Y, Z, rcount=rows, ccount=cols, cmap="cool", edgecolor="none",
+                             vmin=zlim[0], vmax=zlim[1])
+
+
+class SurfaceLOD:
+    """
+    A pyramid of decimated copies of one surface mesh.
+
+    Level 0 is the full-resolution mesh. Each following level keeps every
+    other row and column of the full mesh (strides 2, 4, 8, ...), plus its
+    last row and column so that the surface keeps its extent. All levels
+    are derived once, from the full-resolution arrays.
+    """
+    MIN_ROWS = 8
+
+    def __init__(self, X, Y, Z):
+        self.levels = [(X, Y, Z)]
+        stride = 2
+        while min(Z.shape) // stride >= self.MIN_ROWS:
+            rows = np.unique(np.r_[0:Z.shape[0]:stride, Z.shape[0] - 1])
+            cols = np.unique(np.r_[0:Z.shape[1]:stride, Z.shape[1] - 1])
+            index = np.ix_(rows, cols)
+            self.levels.append((X[index], Y[index], Z[index]))
+            stride *= 2
+
+    def level_for(self, max_grid, min_grid=0):
         """
-        Evaluates a single-variable mathematical expression for 2D plotting.
+        Returns the finest level whose grid fits within max_grid rows and columns.
+
+        Args:
+            max_grid (int): Largest acceptable number of rows or columns.
+            min_grid (int): Smallest acceptable number of rows or columns. When
+                the level that fits is smaller, the next finer level is used.
+
+        Returns:
+            int: Index into levels; the coarsest level if none fits.
+        """
+        for index, (_, _, Z) in enumerate(self.levels):
+            if max(Z.shape) <= max_grid:
+                return index - 1 if index > 0 and max(Z.shape) < min_grid else index
+        return len(self.levels) - 1
+
+
+class SurfaceDetailController:
+    """
+    Switches a 3D axes between a coarse and a fine level of a SurfaceLOD.
+
+    The coarse level is shown while the user drags to rotate the view, and
+    stays while locked, which animations use. The fine level returns once
+    the pointer has been released for IDLE_DELAY_MS. The fine level is
+    capped at IDLE_MAX_GRID rows and columns, since mplot3d sorts and
+    rasterizes every polygon on each draw, but is never coarser than
+    IDLE_MIN_GRID, the fixed mesh 3D Render drew before levels of detail
+    existed. Each level's surface is built on first use and then only
+    hidden or shown, so switching back and forth does not rebuild polygons.
+    """
+    INTERACTIVE_MAX_GRID = 64
+    IDLE_MIN_GRID = 150
+    IDLE_MAX_GRID = 200
+    IDLE_DELAY_MS = 250
+
+    def __init__(self, canvas, axes, lod, zlim, shown_level=None):
+        self.canvas = canvas
+        self.axes = axes
+        self.lod = lod
+        self.zlim = zlim
+        self.coarse = lod.level_for(self.INTERACTIVE_MAX_GRID)
+        self.fine = lod.level_for(self.IDLE_MAX_GRID, self.IDLE_MIN_GRID)
+        self.on_idle = None
+        self.locked = False
+        self._surfaces = {}
+        self.current = None
+        if shown_level is not None and axes.collections:
+            self._surfaces[shown_level] = axes.collections[-1]
+            self.current = shown_level
+        self._idle_job = None
+        self._cids = [canvas.mpl_connect("button_press_event", self._on_press),
+                      canvas.mpl_connect("button_release_event", self._on_release)]
+
+    @property
+    def surface(self):
+        """The surface collection currently shown."""
+        return self._surfaces.get(self.current)
+
+    def show(self, level):
+        """
+        Shows one level of the pyramid, building its surface if needed.
+
+        Args:
+            level (int): Index into the SurfaceLOD levels.
+
+        Returns:
+            bool: True if the visible surface changed.
+        """
+        if level == self.current:
+            return False
+        if level not in self._surfaces:
+            self._surfaces[level] = _plot_surface_level(self.axes, *self.lod.levels[level], self.zlim)
+        for index, surface in self._surfaces.items():
+            surface.set_visible(index == level)
+        self.current = level
+        return True
+
+    def interactive(self):
+        """Switches to the coarse level and cancels any pending switch back."""
+        self._cancel_idle()
+        self.show(self.coarse)
+
+    def schedule_idle(self):
+        """Switches to the fine level once the view has been still for IDLE_DELAY_MS."""
+        self._cancel_idle()
+        if self.locked:
+            return
+        self._idle_job = self.canvas.get_tk_widget().after(self.IDLE_DELAY_MS, self._go_idle)
+
+    def disconnect(self):
+        """Stops reacting to the mouse and cancels any pending switch."""
+        self._cancel_idle()
+        for cid in self._cids:
+            self.canvas.mpl_disconnect(cid)
+        self._cids = []
+
+    def _cancel_idle(self):
+        """Cancels the pending switch to the fine level."""
+        if self._idle_job is not None:
+            self.canvas.get_tk_widget().after_cancel(self._idle_job)
+            self._idle_job = None
+
+    def _go_idle(self):
+        """Shows the fine level and redraws."""
+        self._idle_job = None
+        if self.show(self.fine):
+            if self.on_idle is not None:
+                self.on_idle()
+            else:
+                self.canvas.draw_idle()
+
+    def _on_press(self, event):
+        """Drops to the coarse level when a drag starts inside the 3D axes."""
+        if event.inaxes is self.axes:
+            self.interactive()
+
+    def _on_release(self, event):
+        """Schedules the return to full detail when the drag ends."""
+        if self._cids and self.current != self.fine:
+            self.schedule_idle()
+
+
+def surface_limits(Z):
+    """
+    Chooses z-axis limits for a surface.
+
+    Args:
+        Z (array_like): Surface values.
+
+    Returns:
+        tuple[float, float]: The value range, or (-5, 5) if it is empty or degenerate.
+    """
+    try:
+        zmin, zmax = np.nanmin(Z), np.nanmax(Z)
+        if not np.isfinite(zmin) or not np.isfinite(zmax) or zmin == zmax:
+            zmin, zmax = -5, 5
+    except ValueError:
+        zmin, zmax = -5, 5
+    return zmin, zmax
+
+
+class RotationFrameCache:
+    """
+    Renders every view of a rotation offscreen and keeps them in a ring buffer.
+
+    A background thread rebuilds the scene on its own Agg figure, which has
+    the same size, dpi and face colour as the on-screen figure. It renders
+    one frame per camera angle, starting at the angle playback is about to
+    reach. Frames are stored as binary PPM data. Tk images can only be
+    created on the Tk thread, so photo() converts each frame on first use
+    and keeps the PhotoImage instead of the raw data.
+
+    The buffer holds one slot per view. If a full lap at the requested step
+    does not fit in max_bytes, the step grows until it does, so playback
+    never needs to render again once the lap is complete. An exception in
+    the render thread ends it and is kept in error for the Tk thread to
+    report.
+    """
+    def __init__(self, scene, size_px, dpi, facecolor, elev=30, step=3, start_angle=0,
+                 max_bytes=FRAME_CACHE_BYTES):
+        self.scene = scene
+        self.size_px = size_px
+        self.dpi = dpi
+        self.facecolor = facecolor
+        self.elev = elev
+        width, height = size_px
+        frame_bytes = max(1, width * height * 4)
+        capacity = max(1, max_bytes // frame_bytes)
+        views = 360 // step
+        while views > capacity:
+            step += 1
+            views = 360 // step
+        self.step = step
+        self.views = views
+        self._frames = [None] * views
+        self._photos = [None] * views
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._render_all, args=(self.index_for(start_angle),),
+                                        name="frame-cache", daemon=True)
+
+    def start(self):
+        """Starts the background render thread."""
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Stops the render thread and releases every frame."""
+        self._stop.set()
+        self._frames = [None] * self.views
+        self._photos = [None] * self.views
+
+    def join(self, timeout=None):
+        """Waits for the render thread to finish."""
+        self._thread.join(timeout)
+
+    def index_for(self, angle):
+        """Returns the slot holding the view at the given azimuth."""
+        return int(angle % 360) // self.step % self.views
+
+    def ready(self):
+        """Returns the number of views rendered so far."""
+        return sum(frame is not None or photo is not None
+                   for frame, photo in zip(self._frames, self._photos))
+
+    def frame_data(self, index):
+        """Returns the PPM data for a view, or None while it is not rendered yet."""
+        return self._frames[index]
+
+    def photo(self, index):
+        """
+        Returns the view as a tk.PhotoImage, converting it on first use.
+
+        Must be called from the Tk thread.
+
+        Args:
+            index (int): Slot of the view.
+
+        Returns:
+            tk.PhotoImage | None: The frame, or None if it is not rendered yet.
+        """
+        photo = self._photos[index]
+        if photo is None:
+            data = self._frames[index]
+            if data is None:
+                return None
+            photo = tk.PhotoImage(data=data, format="PPM")
+            self._photos[index] = photo
+            self._frames[index] = None
+        return photo
+
+    def _render_all(self, first):
+        """Runs the render loop, keeping any exception it raises in error."""
+        try:
+            self._render_views(first)
+        except Exception as e:
+            self.error = e
+
+    def _render_views(self, first):
+        """Worker loop: renders each view once, in playback order."""
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        width, height = self.size_px
+        figure = Figure(figsize=(width / self.dpi, height / self.dpi), dpi=self.dpi,
+                        facecolor=self.facecolor)
+        canvas = FigureCanvasAgg(figure)
+        axes = self.scene(figure)
+        for offset in range(self.views):
+            if self._stop.is_set():
+                return
+            index = (first + offset) % self.views
+            axes.view_init(elev=self.elev, azim=index * self.step)
+            canvas.draw()
+            rgb = np.asarray(canvas.buffer_rgba())[:, :, :3]
+            header = b"P6 %d %d 255\n" % (rgb.shape[1], rgb.shape[0])
+            if self._stop.is_set():
+                return
+            self._frames[index] = header + rgb.tobytes()
+
+
+class TimeFrameStream:
+    """
+    Streams surface frames of z(x, y, t) for successive time steps.
+
+    Frames are produced in chunks: one call of the compiled function over a
+    broadcast (T, Ny, Nx) grid evaluates T frames at once. Only the current
+    chunk is held in memory, so the stream can run indefinitely with a
+    footprint bounded by max_bytes. Once prefetch_with is called, the chunk
+    after the current one is evaluated in the background while the current
+    one plays, so playback does not stall at chunk boundaries; the footprint
+    is then two chunks.
+    """
+    def __init__(self, func, X, Y, dt=TIME_STEP, chunk_frames=32, max_bytes=TIME_CHUNK_BYTES):
+        self.func = func
+        self.X = X[np.newaxis]
+        self.Y = Y[np.newaxis]
+        self.dt = dt
+        self.chunk_frames = max(1, min(chunk_frames, max_bytes // max(1, X.nbytes)))
+        self._chunk = None
+        self._times = None
+        self._position = 0
+        self._next_frame = 0
+        self.chunks = 0
+        self._submit = None
+        self._prefetched = None   # future of the chunk after the current one
+
+    def _compute_chunk(self, first):
+        """Evaluates the chunk starting at frame number first; safe to run on any thread."""
+        times = np.arange(first, first + self.chunk_frames) * self.dt
+        Z = self.func(self.X, self.Y, times[:, np.newaxis, np.newaxis])
+        Z = np.nan_to_num(Z, nan=0.0, posinf=0.0, neginf=0.0)
+        return times, np.clip(Z, -50.0, 50.0)
+
+    def _evaluate_chunk(self):
+        """Moves on to the next chunk, taking it from the prefetch when there is one."""
+        future, self._prefetched = self._prefetched, None
+        if future is None or future.cancel():
+            self._times, self._chunk = self._compute_chunk(self._next_frame)
+        else:
+            self._times, self._chunk = future.result()
+        self._position = 0
+        self._next_frame += self.chunk_frames
+        self.chunks += 1
+        self._request_next()
+
+    def _request_next(self):
+        """Submits the chunk after the current one, if prefetching is on."""
+        if self._submit is not None and self._chunk is not None and self._prefetched is None:
+            first = self._next_frame
+            self._prefetched = self._submit(lambda: self._compute_chunk(first))
+
+    def prefetch_with(self, submit):
+        """
+        Evaluates each following chunk in the background while the current one plays.
+
+        Args:
+            submit (callable): Takes a job and returns a concurrent.futures.Future
+                for it. It is called from the thread that plays the frames.
+        """
+        self._submit = submit
+        self._request_next()
+
+    def close(self):
+        """Stops prefetching and cancels a chunk that has not started yet."""
+        self._submit = None
+        if self._prefetched is not None:
+            self._prefetched.cancel()
+            self._prefetched = None
+
+    def next_frame(self):
+        """
+        Returns the next frame of the animation.
+
+        Returns:
+            tuple[float, np.ndarray]: The time value and the (Ny, Nx) surface.
+        """
+        if self._chunk is None or self._position == len(self._chunk):
+            self._evaluate_chunk()
+        index = self._position
+        self._position += 1
+        return float(self._times[index]), self._chunk[index]
+
+    def chunk_range(self):
+        """Returns the (min, max) of the chunk currently being played."""
+        return float(self._chunk.min()), float(self._chunk.max())
+
+
+class RotationAnimator:
+    """
+    Rotates the camera around a 3D axes, redrawing only that axes each frame.
+
+    When a scene builder is given, every view of the lap is rendered
+    offscreen by a RotationFrameCache, and playback shows those frames as an
+    image item on top of the Tk canvas. Once the lap is cached, a frame
+    costs one image swap and no rendering.
+
+    Views that are not cached yet are drawn live. The figure is drawn once
+    with the 3D axes marked as animated, and the result is cached as the
+    static background. Every live frame restores that background, draws the
+    axes with its surface, and blits the result to the Tk canvas. Changing
+    the view makes mplot3d reproject the panes, grid and ticks along with
+    the surface, so those are redrawn too. If the canvas cannot blit, or a
+    blit fails, the animator falls back to a full draw_idle per frame. The
+    achieved frame rate is reported through a callback. If the offscreen
+    renderer fails, the next frame stops the animation and hands the error
+    to on_error on the Tk thread.
+    """
+    FRAME_INTERVAL_MS = 33
+    REPORT_EVERY = 15
+
+    def __init__(self, root, canvas, axes, elev=30, step=3, on_fps=None, scene=None, on_error=None):
+        self.root = root
+        self.canvas = canvas
+        self.figure = canvas.figure
+        self.axes = axes
+        self.elev = elev
+        self.step = step
+        self.on_fps = on_fps
+        self.on_error = on_error
+        self.scene = scene
+        self.frames = None
+        self.angle = 0
+        self.speed = 1.0
+        self.running = False
+        self.paused = False
+        self.fps = 0.0
+        self.blitting = False
+        self.mode = "full redraw"
+        self._background = None
+        self._draw_cid = None
+        self._image_item = None
+        self._job = None
+        self._last_frame = None
+        self._mean_interval = None
+        self._frames = 0
+
+    def start(self):
+        """Starts rotating, using cached frames and blitting when available."""
+        self.running = True
+        self.paused = False
+        self.blitting = self._setup_blit()
+        self._reset_frame_cache()
+        self._last_frame = None
+        self._mean_interval = None
+        self._tick()
+
+    def stop(self):
+        """Stops rotating, drops the frame cache and restores normal drawing of the axes."""
+        self.running = False
+        self.paused = False
+        self._cancel_job()
+        self._close_frame_cache()
+        self._teardown_blit()
+
+    def pause(self):
+        """Freezes the rotation on the current view, keeping the frame cache."""
+        if not self.running or self.paused:
+            return
+        self.paused = True
+        self._cancel_job()
+
+    def resume(self):
+        """Continues a paused rotation from the view it stopped on."""
+        if not self.running or not self.paused:
+            return
+        self.paused = False
+        self._last_frame = None
+        self._mean_interval = None
+        self._tick()
+
+    def set_speed(self, speed):
+        """
+        Sets the playback speed as a multiple of the normal frame rate.
+
+        Args:
+            speed (float): Speed multiplier; values are clamped to 0.1 - 4.
+        """
+        self.speed = min(4.0, max(0.1, float(speed)))
+
+    def _cancel_job(self):
+        """Cancels the pending frame, if any."""
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    def _figure_size_px(self):
+        """Returns the figure size in pixels, which is also the Tk image size."""
+        return int(round(self.figure.bbox.width)), int(round(self.figure.bbox.height))
+
+    def _reset_frame_cache(self):
+        """Starts rendering the lap offscreen for the current figure size."""
+        self._close_frame_cache()
+        if self.scene is None:
+            return
+        self.frames = RotationFrameCache(self.scene, self._figure_size_px(), self.figure.dpi,
+                                         self.figure.get_facecolor(), elev=self.elev,
+                                         step=self.step, start_angle=self.angle).start()
+        self.step = self.frames.step
+
+    def _close_frame_cache(self):
+        """Stops the offscreen renderer and removes the frame image from the canvas."""
+        if self.frames is not None:
+            self.frames.close()
+            self.frames = None
+        if self._image_item is not None:
+            self.canvas.get_tk_widget().delete(self._image_item)
+            self._image_item = None
+
+    def _show_cached(self):
+        """Shows the cached frame for the current view; returns False if it is not ready."""
+        if self.frames is None:
+            return False
+        if self.frames.size_px != self._figure_size_px():
+            self._reset_frame_cache()
+            return False
+        photo = self.frames.photo(self.frames.index_for(self.angle))
+        if photo is None:
+            return False
+        widget = self.canvas.get_tk_widget()
+        if self._image_item is None:
+            self._image_item = widget.create_image(0, 0, anchor="nw", image=photo)
+        else:
+            widget.itemconfigure(self._image_item, image=photo, state="normal")
+        return True
+
+    def _setup_blit(self):
+        """Caches the figure without the 3D axes as the blit background."""
+        if not getattr(self.canvas, "supports_blit", False):
+            return False
+        try:
+            self.axes.set_animated(True)
+            self._draw_cid = self.canvas.mpl_connect("draw_event", self._on_draw)
+            self.canvas.draw()
+        except Exception:
+            self._teardown_blit()
+            return False
+        return self._background is not None
+
+    def _teardown_blit(self):
+        """Disconnects blitting so the axes draws normally again."""
+        if self._draw_cid is not None:
+            self.canvas.mpl_disconnect(self._draw_cid)
+            self._draw_cid = None
+        self.axes.set_animated(False)
+        self._background = None
+        self.blitting = False
+
+    def _on_draw(self, event):
+        """Re-captures the background after any full redraw, such as a resize."""
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.figure.draw_artist(self.axes)
+
+    def redraw(self):
+        """Draws the current view live, bypassing the frame cache, e.g. after the surface changed."""
+        self._render_live()
+
+    def _render(self):
+        """Draws the current view from the frame cache, by blitting, or with a full redraw."""
+        if self._show_cached():
+            self.mode = "cached"
+            return
+        self._render_live()
+
+    def _render_live(self):
+        """Renders the current view by blitting the 3D axes, or with a full redraw."""
+        if self._image_item is not None:
+            self.canvas.get_tk_widget().itemconfigure(self._image_item, state="hidden")
+        self.axes.view_init(elev=self.elev, azim=self.angle)
+        if self.blitting and self._background is not None:
+            try:
+                self.canvas.restore_region(self._background)
+                self.figure.draw_artist(self.axes)
+                self.canvas.blit(self.figure.bbox)
+                self.mode = "blit"
+                return
+            except Exception:
+                self._teardown_blit()
+        self.mode = "full redraw"
+        self.canvas.draw_idle()
+
+    def _tick(self):
+        """Renders one frame and schedules the next one on the Tk event loop."""
+        if not self.running or self.paused:
+            return
+        if self.frames is not None and self.frames.error is not None:
+            error = self.frames.error
+            self.stop()
+            if self.on_error is not None:
+                self.on_error(error)
+            return
+        start = time.perf_counter()
+        self._render()
+        self.angle = (self.angle + self.step) % 360
+
+        if self._last_frame is not None:
+            interval = start - self._last_frame
+            self._mean_interval = (interval if self._mean_interval is None
+                                   else 0.9 * self._mean_interval + 0.1 * interval)
+            self.fps = 1.0 / self._mean_interval if self._mean_interval > 0 else 0.0
+        self._last_frame = start
+        self._frames += 1
+        if self.on_fps is not None and self._frames % self.REPORT_EVERY == 0:
+            self.on_fps(self.fps, self.mode)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        frame_ms = self.FRAME_INTERVAL_MS / self.speed
+        self._job = self.root.after(max(1, int(frame_ms - elapsed_ms)), self._tick)
+
+
+class SurfaceTimeAnimator(RotationAnimator):
+    """
+    Animates z(x, y, t) by replacing the surface every frame, without moving the camera.
+
+    Frames come from a TimeFrameStream. Playback, blitting, pause, resume,
+    speed and frame-rate reporting are inherited from RotationAnimator;
+    there is no frame cache because every frame shows a new time step.
+    Every frame is coloured on one shared scale, zlim, which widens to
+    cover each newly evaluated chunk so later time steps stay inside the
+    axes. Each frame is drawn from the axes' current view angles, so a
+    view the user rotates to is kept.
+    """
+    def __init__(self, root, canvas, axes, X, Y, stream, title, zlim, on_fps=None):
+        super().__init__(root, canvas, axes, elev=axes.elev, step=0, on_fps=on_fps)
+        self.angle = axes.azim
+        self.X = X
+        self.Y = Y
+        self.stream = stream
+        self.title = title
+        self.zlim = tuple(zlim)
+        self._chunks_seen = stream.chunks
+        self.surface = axes.collections[0] if axes.collections else None
+
+    def stop(self):
+        """Stops playback and the stream's background prefetch."""
+        super().stop()
+        self.stream.close()
+
+    def _render(self):
+        """Swaps in the surface for the next time step, then draws it."""
+        self.elev, self.angle = self.axes.elev, self.axes.azim
+        t, Z = self.stream.next_frame()
+        if self.stream.chunks != self._chunks_seen:
+            self._chunks_seen = self.stream.chunks
+            low, high = surface_limits(self.stream.chunk_range())
+            zlim = (min(self.zlim[0], low), max(self.zlim[1], high))
+            if zlim != self.zlim:
+                self.zlim = zlim
+                self.axes.set_zlim(*zlim)
+        if self.surface is not None:
+            self.surface.remove()
+        self.surface = _plot_surface_level(self.axes, self.X, self.Y, Z, self.zlim)
+        self.axes.set_title(f"{self.title}  (t = {t:.2f})", color="#8FD4FA")
+        super()._render()
+
+
+# --------------------------- BACKGROUND GRADIENT ---------------------------
+def gradient_ppm(width, height, top=(26, 35, 126), bottom=(0, 0, 0)):
+    """
+    Renders a vertical colour gradient as binary PPM image data.
+
+    Row i gets top + (bottom - top) * i / height, truncated to an integer,
+    which matches the one-line-per-row gradient this replaces.
+
+    Args:
+        width (int): Image width in pixels.
+        height (int): Image height in pixels.
+        top (tuple[int, int, int]): RGB colour of the first row.
+        bottom (tuple[int, int, int]): RGB colour approached by the last row.
+
+    Returns:
+        bytes: A P6 PPM image, ready for tk.PhotoImage(data=..., format="PPM").
+    """
+    top = np.asarray(top, dtype=float)
+    bottom = np.asarray(bottom, dtype=float)
+    factor = np.arange(height)[:, np.newaxis] / height
+    rows = np.clip(top + (bottom - top) * factor, 0, 255).astype(np.uint8)
+    pixels = np.broadcast_to(rows[:, np.newaxis, :], (height, width, 3))
+    return b"P6 %d %d 255\n" % (width, height) + pixels.tobytes()
+
+
+# --------------------------- RESIZE COORDINATION ---------------------------
+class ResizeCoordinator:
+    """
+    Collapses a window drag-resize into one batched redraw after it settles.
+
+    Tk delivers a root <Configure> binding for every child widget's Configure
+    event as well, so only events whose widget is the root and whose size
+    actually changed count. Watched widgets, such as the matplotlib canvas,
+    report their own size changes here instead of redrawing themselves. Any
+    number of events within a frame costs one check per FRAME_MS, and
+    on_settled runs once no size change has arrived for SETTLE_MS.
+    """
+    FRAME_MS = 16
+    SETTLE_MS = 120
+
+    def __init__(self, root, on_settled):
+        self.root = root
+        self.on_settled = on_settled
+        self.root_size = None
+        self._last_change = None
+        self._job = None
+        root.bind("<Configure>", self._on_root_configure)
+
+    def watch(self, widget):
+        """Routes a widget's Configure events through the coordinator, replacing its own handler."""
+        widget.bind("<Configure>", lambda event: self.request())
+
+    def request(self):
+        """Records a size change and makes sure a settle check is scheduled."""
+        self._last_change = time.perf_counter()
+        if self._job is None:
+            self._job = self.root.after(self.FRAME_MS, self._tick)
+
+    def flush(self):
+        """Runs a pending batched redraw immediately."""
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        if self._last_change is not None:
+            self._last_change = None
+            self.on_settled()
+
+    def _on_root_configure(self, event):
+        """Accepts only real size changes of the root window."""
+        if event.widget is not self.root:
+            return
+        size = (event.width, event.height)
+        if size == self.root_size:
+            return
+        self.root_size = size
+        self.request()
 
-        The expression is parsed using SymPy, automatically substitutes any
-        unassigned variables (except x) with a default value of 1.0, and
-        generates numerical x and y arrays suitable for matplotlib plotting.
+    def _tick(self):
+        """Once per frame: waits for the drag to settle, then redraws once."""
+        self._job = None
+        if self._last_change is None:
+            return
+        if (time.perf_counter() - self._last_change) * 1000 < self.SETTLE_MS:
+            self._job = self.root.after(self.FRAME_MS, self._tick)
+            return
+        self._last_change = None
+        self.on_settled()
 
-        Args:
-            expression (str): Mathematical expression containing variable x.
 
-        Returns:
-            tuple[np.ndarray, np.ndarray]: Arrays of x-values and corresponding y-values.
+# --------------------------- VALUE TABLES ---------------------------
+X_VALUES_MAX = 10_000_000
+# Points in a multi-variable grid; each one becomes a table row or heatmap cell
+GRID_POINTS_MAX = 1_000_000
 
-        Raises:
-            ValueError: If the expression cannot be parsed by SymPy. 
-            Amrie's section
-        """
-        
-        x = sym.Symbol("x")
-        expr_str = expression.strip().replace("^", "**")
 
-        try:
-            # Use locals to recognize sin, cos, pi, e as SymPy functions/constants
-            expr = sym.sympify(expr_str, locals=self.sympy_locals)
-        except Exception as e:
-            # Re-raise as a ValueError to be caught by the main app's error handler
-            raise ValueError(f"SymPy Parsing Error: {e}")
+def parse_x_values(text):
+    """
+    Reads the x values typed into the calculation box.
 
-        # Check for unassigned symbols (variables other than 'x')
-        unassigned_symbols = [s for s in expr.free_symbols if s != x]
-        if unassigned_symbols:
-            # Automatically substitute remaining unassigned symbols with 1.0 
-            default_substitutions = {s: 1.0 for s in unassigned_symbols}
-            expr = expr.subs(default_substitutions)
+    Accepts a single number, a list separated by commas or spaces
+    ('1, 2, 3'), an inclusive range 'start:stop' or 'start:stop:step'
+    ('0:10:0.01'), or the path of a text file holding numbers separated by
+    commas, semicolons or whitespace.
 
-        # Create a fast numerical function dependent only on 'x'
-        f = sym.lambdify(x, expr, modules=["numpy"])
-        x_vals = np.linspace(-10, 10, 400)
-        
-        with np.errstate(divide='ignore', invalid='ignore'):
-             y_vals = f(x_vals)
-            
-        y_vals = np.nan_to_num(y_vals, nan=np.nan, posinf=np.nan, neginf=np.nan)
-        return x_vals, y_vals
+    Args:
+        text (str): Contents of the x value box.
 
-    def to_sympy_expr(self, expression: str):
-        """
-        Converts a string expression into a SymPy expression.
+    Returns:
+        np.ndarray: The x values as a 1-D float array.
 
-        Args:
-            expression (str): Mathematical expression as string.
+    Raises:
+        ValueError: If the text is not a number, list, range or readable file
+            of numbers, or would produce more than X_VALUES_MAX values.
+    """
+    text = text.strip()
+    if os.path.isfile(text):
+        try:
+            with open(text, "r", encoding="utf-8") as handle:
+                content = handle.read()
+        except (OSError, UnicodeDecodeError) as e:
+            raise ValueError(f"Cannot read {text}: {e}")
+        values = np.array(content.replace(",", " ").replace(";", " ").split(), dtype=float)
+    elif ":" in text:
+        parts = text.split(":")
+        if len(parts) not in (2, 3):
+            raise ValueError(f"Invalid range '{text}'. Use start:stop or start:stop:step.")
+        start, stop = float(parts[0]), float(parts[1])
+        step = float(parts[2]) if len(parts) == 3 else 1.0
+        if step == 0 or (stop - start) / step < 0:
+            raise ValueError(f"The step of '{text}' does not lead from start to stop.")
+        count = int(np.floor((stop - start) / step + 1e-9)) + 1
+        if count > X_VALUES_MAX:
+            raise ValueError(f"'{text}' has {count:,} values; the limit is {X_VALUES_MAX:,}.")
+        values = start + step * np.arange(count)
+    else:
+        values = np.array(text.replace(",", " ").split(), dtype=float)
 
-        Returns:
-            sympy.Expr: Parsed SymPy expression. 
-            Amrie's section
-        """
-        expr_str = expression.strip().replace("^", "**")
-        return sym.sympify(expr_str, locals=self.sympy_locals)
+    if values.size == 0:
+        raise ValueError("No x values were given.")
+    if values.size > X_VALUES_MAX:
+        raise ValueError(f"{values.size:,} values were given; the limit is {X_VALUES_MAX:,}.")
+    return values
 
-# -------------------------------------------------------------------------
 
-# --------------------------- PLOT MANAGER ---------------------------
-class PlotManager:
+class ResultTable:
     """
-    Manages all matplotlib plotting operations.
+    A scrollable window of value columns that only draws the visible rows.
 
-    Responsible for clearing, styling, and rendering 2D graphs within
-    the embedded Tkinter canvas. 
-    Daniels section
+    The table may hold millions of rows, so no widget is created per row.
+    A canvas keeps one text item per column for each visible row, and
+    scrolling rewrites their text from the arrays, formatting only what is
+    on screen.
     """
+    ROW_HEIGHT = 20
+    COLUMN_WIDTH = 180
 
-    def __init__(self, plot_area, canvas):
-        self.plot_area = plot_area
-        self.canvas = canvas
+    def __init__(self, parent, title, headers, columns):
+        self.columns = columns
+        self.rows = len(columns[0])
+        self.first = 0
+        self.visible = 0
+        self._items = []
 
-    def draw_graph(self, x_vals, y_vals, expression):
-        """
-        Renders a 2D line graph on the matplotlib plot area.
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry(f"{len(headers) * self.COLUMN_WIDTH + 40}x420")
+        self.window.configure(bg="#333333")
 
-        Args:
-            x_vals (np.ndarray): X-axis values.
-            y_vals (np.ndarray): Corresponding Y-axis values.
-            expression (str): Original expression entered by the user. 
-            Daniels section
-        """
+        header = tk.Frame(self.window, bg="#424242")
+        header.pack(fill=tk.X)
+        for text in headers:
+            tk.Label(header, text=text, width=22, anchor="w", font=("Arial", 11, "bold"),
+                     fg="#00BCD4", bg="#424242").pack(side=tk.LEFT, padx=(10, 0))
 
-        self.plot_area.clear() 
-        
-        # Plot line color to a vibrant cyan for visibility on dark plot
-        self.plot_area.plot(x_vals, y_vals, color="#8FD4FA", label=f"f(x) = {expression}") 
-        self.plot_area.set_title("Graphing Calculator", color = "#8FD4FA")
-        self.plot_area.set_xlabel("x", color = "#8FD4FA")
-        self.plot_area.set_ylabel("f(x)", color = "#8FD4FA")
-        self.plot_area.legend()
-        self.plot_area.grid(True)
-        self.canvas.draw()
+        self.scrollbar = tk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(self.window, bg="#263238", highlightthickness=0)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.canvas.bind("<Configure>", self._on_resize)
+        self.canvas.bind("<MouseWheel>", lambda e: self.scroll_to(self.first - 3 * (e.delta // 120)))
+        self.canvas.bind("<Button-4>", lambda e: self.scroll_to(self.first - 3))
+        self.canvas.bind("<Button-5>", lambda e: self.scroll_to(self.first + 3))
+
+    def yview(self, *args):
+        """Handles the scrollbar's 'moveto' and 'scroll' commands."""
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * self.rows))
+        elif args[0] == "scroll":
+            amount = int(args[1]) * (self.visible if args[2] == "pages" else 1)
+            self.scroll_to(self.first + amount)
+
+    def scroll_to(self, first):
+        """Shows the rows starting at index first, clamped to the table."""
+        self.first = max(0, min(first, self.rows - self.visible))
+        self._draw()
+
+    def _on_resize(self, event):
+        """Keeps one row of text items for each row that fits in the canvas."""
+        visible = min(self.rows, event.height // self.ROW_HEIGHT + 1)
+        while len(self._items) < visible:
+            top = len(self._items) * self.ROW_HEIGHT + 2
+            self._items.append(tuple(
+                self.canvas.create_text(10 + column * self.COLUMN_WIDTH, top, anchor="nw",
+                                        fill="white", font=("Consolas", 10))
+                for column in range(len(self.columns))))
+        while len(self._items) > visible:
+            for item in self._items.pop():
+                self.canvas.delete(item)
+        self.visible = visible
+        self.scroll_to(self.first)
+
+    def _draw(self):
+        """Writes the visible rows into the text items and updates the scrollbar."""
+        for offset, items in enumerate(self._items):
+            row = self.first + offset
+            for item, column in zip(items, self.columns):
+                self.canvas.itemconfigure(item, text=f"{column[row]:.10g}")
+        if self.rows:
+            self.scrollbar.set(self.first / self.rows, (self.first + self.visible) / self.rows)
+
+
+def draw_heatmap(figure, names, axes, values, title):
+    """
+    Draws f over a two-variable grid as a heatmap with a colour bar.
+
+    Args:
+        figure (Figure): Figure to draw into; it is cleared first.
+        names (tuple[str, str]): Variable names for the rows and columns of values.
+        axes (tuple[np.ndarray, np.ndarray]): Grid values of the two variables.
+        values (np.ndarray): f evaluated on the grid, shaped (len(axes[0]), len(axes[1])).
+        title (str): Axes title.
+
+    Returns:
+        Axes: The heatmap axes.
+    """
+    figure.clf()
+    ax = figure.add_subplot(111)
+    mesh = ax.pcolormesh(axes[1], axes[0], np.ma.masked_invalid(values), cmap="cool",
+                         shading="nearest")
+    figure.colorbar(mesh, ax=ax, label="f")
+    ax.set_xlabel(names[1])
+    ax.set_ylabel(names[0])
+    ax.set_title(title)
+    return ax
 
 
 # --------------------------- MAIN APP ---------------------------
@@ -141,57 +3384,139 @@ class GraphingCalculatorApp:
     and communication between the math engine and plot manager.
     Alex's section
     """
-    def __init__(self, root):
+    def __init__(self, root, warm_up=True, profile_startup=False):
         self.root = root
         self.root.title("Graphing Calculator 2D & 3D")
+        self.profile_startup = profile_startup
 
         # ---------- BACKGROUND ----------
-        self._setup_background()
+        with STARTUP_PROFILE.section("widgets: background"):
+            self._setup_background()
         
         # --- STRUCTURED LAYOUT FOR WIDGETS ---
         self.control_frame = tk.Frame(root, bg="#1A237E") 
         self.control_frame.pack(side=tk.LEFT, fill=tk.Y, padx=10)
 
         # ---------- INPUTS ----------
-        self._create_expression_entry(self.control_frame)
-        self._create_variables_entry(self.control_frame) 
-        self._create_x_value_entry(self.control_frame)
+        with STARTUP_PROFILE.section("widgets: inputs"):
+            self._create_expression_entry(self.control_frame)
+            self._create_variables_entry(self.control_frame) 
+            self._create_x_value_entry(self.control_frame)
+            self._create_implicit_option(self.control_frame)
         
         # ---------- BUTTONS ----------
-        self._create_buttons(self.control_frame)
+        with STARTUP_PROFILE.section("widgets: buttons"):
+            self._create_buttons(self.control_frame)
+            self._create_status_label(self.control_frame)
 
         # ---------- PLOT AREA (Right Side) ----------
+        # The matplotlib figure is built once matplotlib has been imported,
+        # either by the warm-up thread or on the first graphing request.
         self.graph_frame = tk.Frame(root, bg="#000000")
         self.graph_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
-        self._create_graph_area(self.graph_frame)
+        self.plot_area = None
+        self.canvas = None
 
         # ---------- ENGINE & PLOT ----------
         self.math_engine = MathEngine()
-        self.plot_manager = PlotManager(self.plot_area, self.canvas)
+        self.worker = EvaluationWorker(root, on_busy=self._show_busy)
+        self.plot_manager = PlotManager(self.plot_area, self.canvas, worker=self.worker)
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
         # ---------- ANIMATION FLAG ----------
+        self._plot_mode = "2d"
         self.animating = False
+        self.animator = None
+        self.surface_detail = None
         self._surface = None 
         self.ax3d = None 
 
         # ---------- BIND RESIZE ----------
-        self.root.bind("<Configure>", self._redraw_gradient)
+        self.resize_coordinator = ResizeCoordinator(self.root, self._on_window_resized)
         self.root.after(200, self._lower_background)
 
+        # ---------- WARM-UP ----------
+        self.root.after_idle(self.root.after, 0, STARTUP_PROFILE.mark, "window painted")
+        self._warm_up_thread = None
+        if warm_up:
+            self._start_warm_up()
+        else:
+            self._draw_gradient(*self._gradient_size)
+
+    # ------------------- SHUTDOWN -------------------
+    def shutdown(self):
+        """
+        Stops animation and the background worker, mesh pool and solver process.
+
+        Pending jobs are cancelled and the helper processes are stopped, so
+        closing the window during a long render or solve does not leave them
+        running.
+        """
+        self._stop_all_animation()
+        self.worker.shutdown()
+        self.math_engine.mesh_pool.shutdown()
+        self.math_engine.solver.shutdown()
+
+    def _on_close(self):
+        """Shuts down background work when the window is closed, then destroys it."""
+        self.shutdown()
+        self.root.destroy()
+
+    # ------------------- STARTUP -------------------
+    def _start_warm_up(self):
+        """
+        Imports numpy, matplotlib and SymPy on a background thread.
+
+        The Tk thread polls for completion, draws the background gradient once
+        numpy is available, builds the graph area as soon as matplotlib is,
+        and prints the startup report when requested.
+        """
+        self._warm_up_thread = threading.Thread(target=_warm_up_imports, name="warm-up", daemon=True)
+        self._warm_up_thread.start()
+        self.root.after(20, self._poll_warm_up)
+
+    def _poll_warm_up(self):
+        """Checks on the warm-up thread from the Tk event loop."""
+        if self._gradient_item is None and np.loaded:
+            self._draw_gradient(*self._gradient_size)
+        if _MATPLOTLIB is not None:
+            self._ensure_graph_area()
+        if self._warm_up_thread.is_alive() or _MATPLOTLIB is None:
+            self.root.after(20, self._poll_warm_up)
+            return
+        STARTUP_PROFILE.mark("warm-up finished")
+        if self.profile_startup:
+            print(STARTUP_PROFILE.report())
+
+    def _ensure_graph_area(self):
+        """Builds the matplotlib figure and canvas if they do not exist yet."""
+        if self.canvas is not None:
+            return
+        with STARTUP_PROFILE.section("widgets: graph area"):
+            self._create_graph_area(self.graph_frame)
+        self.plot_manager.plot_area = self.plot_area
+        self.plot_manager.canvas = self.canvas
+        self._lower_background()
+
     # ------------------- BACKGROUND & GRADIENT -------------------
     def _setup_background(self):
         """
         Initializes the application window background and gradient canvas.
 
         Creates a full-window canvas used to render a smooth vertical gradient
-        that dynamically resizes with the window. 
+        that dynamically resizes with the window. Until the gradient is drawn
+        the canvas shows its top colour.
         Daniels section
         """
         width, height = 900, 700
         self.root.geometry(f"{width}x{height}")
-        self.gradient = tk.Canvas(self.root, width=width, height=height, highlightthickness=0, bd=0)
+        self.gradient = tk.Canvas(self.root, width=width, height=height, highlightthickness=0, bd=0,
+                                  bg="#1A237E")
         self.gradient.place(x=0, y=0, relwidth=1, relheight=1)
-        self._draw_gradient(width, height) 
+        self._gradient_images = OrderedDict()   # (width, height) -> PhotoImage
+        self._gradient_item = None
+        self._gradient_size = (width, height)
+        # The gradient needs NumPy; it is drawn once warm-up has imported it
 
     def app_Tutorial(self): 
         """
@@ -219,21 +3544,33 @@ class GraphingCalculatorApp:
                 1. 2D Graphing:  
                     - Enter an expression using 'x' 
                     - Click 'Graph'  
+                    - Scroll to zoom, or use the toolbar to pan and zoom; 
+                      the curve is recomputed for the visible range 
+                    - Separate expressions with ';' to overlay them 
+                      (e.g., sin(x); cos(x)); click a legend entry to hide it 
                     
                 2. 3D Rendering 
                     - Enter an expression using 'x' and 'y' (e.g., sin(x)*cos(y)) 
-                    - Or an implicit equation (e.g., x^2+y^2+z^2 = R^2) 
+                    - Or an implicit equation (e.g., x^2+y^2+z^2 = R^2); 
+                      it is meshed numerically unless the 'solve 
+                      symbolically' box is ticked 
                     - Unassigned constants (like R) will default to 1.0. 
                     - Click '3D Render'
                 
                 3. 3D Animation 
                     - Enter expression using 'x' and 'y' 
                     - Click 3D Animate to rotate viewpoint  
+                    - Use 't' (e.g., sin(x - t)*cos(y)) to animate over time 
+                    - Pause, Resume and the Speed slider control the animation 
                 
                 4 Calculation 
                     - Enter expression in top box 
-                    - Enter numerical value in the 'x value' box 
-                    - Click 'Calculate' 
+                    - Enter a value in the 'x values' box, or a list 
+                      (1, 2, 3), a range (0:10:0.01) or a file of numbers 
+                    - Click 'Calculate'; several values open a table 
+                    - For 'Calculate (Multi-Var)', assignments may be lists or 
+                      ranges (A=0:10:0.5, B=1,2,3); two varying variables 
+                      give a heatmap, other grids a table 
                 
                 Reminder: Use '**' or '^' when doing calculations regarding raising expression to a power 
             """ 
@@ -248,42 +3585,49 @@ class GraphingCalculatorApp:
                   bg = "#00BCD4", fg = "black", font = ("Arial", 10, "bold")).pack(pady = 5)
     
     # ------------------- GRADIENT -------------------
+    GRADIENT_CACHE_SIZE = 4
+
     def _draw_gradient(self, width, height):
         """
         Draws a vertical gradient from dark indigo blue to black
         across the full window height. 
+
+        The gradient is a single PhotoImage built by gradient_ppm and cached
+        per window size, so a redraw is one canvas image update.
         Daniles section
         """
-        self.gradient.delete("all")
-        
-        r1, g1, b1 = (26, 35, 126)   # #1A237E
-        r2, g2, b2 = (0, 0, 0)       # #000000
-        
-        if height <= 0:
-            height = 1 
-            
-        for i in range(height):
-            factor = i / height
-            r = int(r1 + (r2 - r1) * factor)
-            g = int(g1 + (g2 - g1) * factor)
-            b = int(b1 + (b2 - b1) * factor)
-            r = max(0, min(255, r))
-            g = max(0, min(255, g))
-            b = max(0, min(255, b))
-            color = f"#{r:02x}{g:02x}{b:02x}"
-            self.gradient.create_line(0, i, width, i, fill=color)
-
-    def _redraw_gradient(self, event):
-        """Re-draws the gradient when the window size changes.
+        width, height = max(1, width), max(1, height)
+        self._gradient_size = key = (width, height)
+        photo = self._gradient_images.get(key)
+        if photo is None:
+            photo = tk.PhotoImage(data=gradient_ppm(width, height), format="PPM")
+            self._gradient_images[key] = photo
+            while len(self._gradient_images) > self.GRADIENT_CACHE_SIZE:
+                self._gradient_images.popitem(last=False)
+        self._gradient_images.move_to_end(key)
+
+        if self._gradient_item is None:
+            self._gradient_item = self.gradient.create_image(0, 0, anchor="nw", image=photo)
+        else:
+            self.gradient.itemconfigure(self._gradient_item, image=photo)
+
+    def _on_window_resized(self):
+        """Redraws the gradient and refits the figure in one pass once a resize has settled.
          Daniels sections
         """ 
-        width = self.root.winfo_width()
-        height = self.root.winfo_height()
-        
-        if hasattr(self, "_resize_job"):
-            self.root.after_cancel(self._resize_job)
-        self._resize_job = self.root.after(150, lambda: self._draw_gradient(width, height))
+        size = (self.root.winfo_width(), self.root.winfo_height())
+        if np.loaded:
+            self._draw_gradient(*size)
+        else:
+            self._gradient_size = size
         self._lower_background() 
+        if self.canvas is not None:
+            widget = self.canvas.get_tk_widget()
+            width, height = widget.winfo_width(), widget.winfo_height()
+            if (width, height) != self.canvas.get_width_height(physical=True):
+                event = tk.Event()
+                event.width, event.height = width, height
+                self.canvas.resize(event)
     
     def _lower_background(self):
         """Ensures the gradient Canvas is below all other widgets. 
@@ -324,18 +3668,31 @@ class GraphingCalculatorApp:
 
     def _create_x_value_entry(self, root):
         """
-        Creates the entry box for single-variable calculation.
+        Creates the entry box for the x values of a single-variable calculation.
 
         Args:
             root (tk.Frame): Parent frame to attach the entry widget. 
             Amrie's section
         """
-        tk.Label(root, text="x value (for single-var calculation):", bg="#1A237E", fg="#B0BEC5",
+        tk.Label(root, text="x values (number, list, a:b:step or file):", bg="#1A237E", fg="#B0BEC5",
                  font=("Arial", 11, "bold")).pack(pady=(10, 2))
-        self.x_value_entry = tk.Entry(root, width=10, font=("Arial", 11),
+        self.x_value_entry = tk.Entry(root, width=24, font=("Arial", 11),
                                       bg="#263238", fg="white", insertbackground="white")
         self.x_value_entry.pack(pady=4)
 
+    def _create_implicit_option(self, root):
+        """
+        Creates the checkbox that opts into solving implicit equations symbolically.
+
+        Args:
+            root (tk.Frame): Parent frame to attach the checkbox.
+        """
+        self.symbolic_solve_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(root, text="Solve implicit 3D equations for z symbolically",
+                       variable=self.symbolic_solve_var, bg="#1A237E", fg="#B0BEC5",
+                       selectcolor="#263238", activebackground="#1A237E",
+                       font=("Arial", 10)).pack(pady=(6, 2))
+
     # ------------------- BUTTONS -------------------
     def _create_buttons(self, root):
         """
@@ -349,6 +3706,17 @@ class GraphingCalculatorApp:
         self._create_numeric_and_operator_buttons(button_frame)
         self._create_function_buttons(button_frame)
 
+    def _create_status_label(self, root):
+        """
+        Creates the status line used for frame-rate and progress messages.
+
+        Args:
+            root (tk.Frame): Parent frame to attach the label.
+        """
+        self.status_var = tk.StringVar(value="")
+        tk.Label(root, textvariable=self.status_var, bg="#1A237E", fg="#B0BEC5",
+                 font=("Arial", 10)).pack(pady=(0, 6))
+
     def _create_numeric_and_operator_buttons(self, button_frame):
         """
         Creates numeric and operator buttons with proper styling.
@@ -386,7 +3754,8 @@ class GraphingCalculatorApp:
 
     def _create_function_buttons(self, button_frame):
         """
-        Creates function and control buttons: Graph, Calculate, 3D Render, Animate, Tutorial.
+        Creates function and control buttons: Graph, Calculate, 3D Render, Animate,
+        Pause/Resume, Speed and Tutorial.
 
         Args:
             button_frame (tk.Frame): Frame to place buttons in. 
@@ -412,6 +3781,20 @@ class GraphingCalculatorApp:
               bg="#F44336", fg="black", font=("Arial", 10, "bold"),
               width=12, height=2).grid(row=9, column=1, pady=5, padx=4)
     
+        tk.Button(button_frame, text="Pause", command=self._pause_animation,
+              bg="#557088", fg="black", font=("Arial", 10, "bold"),
+              width=8, height=2).grid(row=9, column=2, pady=5, padx=4)
+
+        tk.Button(button_frame, text="Resume", command=self._resume_animation,
+              bg="#557088", fg="black", font=("Arial", 10, "bold"),
+              width=8, height=2).grid(row=9, column=3, pady=5, padx=4)
+
+        self.speed_var = tk.DoubleVar(value=1.0)
+        tk.Scale(button_frame, label="Speed", variable=self.speed_var, command=self._on_speed_change,
+              from_=0.25, to=4.0, resolution=0.25, orient=tk.HORIZONTAL,
+              bg="#0D113B", fg="#B0BEC5", highlightthickness=0,
+              length=120).grid(row=10, column=2, columnspan=2, pady=5, padx=4)
+
         tk.Button(button_frame, text="Tutorial", command=self.app_Tutorial, 
               bg="#557088", fg="black", font=("Arial", 10, "bold"),
               width=12, height=2).grid(row=10, column=0, columnspan=2, pady=5, padx=4)
@@ -425,6 +3808,7 @@ class GraphingCalculatorApp:
             root (tk.Frame): Parent frame to attach the figure canvas. 
             Daniels section
         """
+        Figure, FigureCanvasTkAgg, NavigationToolbar2Tk = _load_matplotlib()
         fig = Figure(figsize=(6, 4), dpi=100, facecolor="#1C1C1C") 
         self.plot_area = fig.add_subplot(111, facecolor="#000000") 
 
@@ -438,6 +3822,10 @@ class GraphingCalculatorApp:
         self.plot_area.title.set_color('#B0BEC5') 
         
         self.canvas = FigureCanvasTkAgg(fig, master=root)
+        self.resize_coordinator.watch(self.canvas.get_tk_widget())
+        self.toolbar = NavigationToolbar2Tk(self.canvas, root, pack_toolbar=False)
+        self.toolbar.update()
+        self.toolbar.pack(side=tk.BOTTOM, fill=tk.X)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=6, pady=6)
     # ------------------- UTILITY METHODS -------------------
     def _on_button_click(self, value):
@@ -461,6 +3849,55 @@ class GraphingCalculatorApp:
         """Stops any ongoing 3D animation. 
         Daniels section"""
         self.animating = False
+        if self.animator is not None:
+            self.animator.stop()
+            self.animator = None
+            self.status_var.set("")
+
+    def _on_animation_error(self, e):
+        """Stops the animation whose offscreen rendering failed and reports why."""
+        self._stop_all_animation()
+        messagebox.showerror("Error", f"Invalid expression: {e}")
+
+    def _show_fps(self, fps, mode):
+        """Reports the achieved animation frame rate and frame cache progress in the status line."""
+        status = f"3D animation: {fps:.1f} fps ({mode})"
+        frames = self.animator.frames if self.animator is not None else None
+        if frames is not None:
+            status += f", cached {frames.ready()}/{frames.views}"
+        self.status_var.set(status)
+
+    def _show_busy(self, busy):
+        """Shows a busy cursor and status message while the background worker is computing."""
+        if busy:
+            self.status_var.set("Working...")
+            self.root.config(cursor="watch")
+        else:
+            if self.status_var.get() == "Working...":
+                self.status_var.set("")
+            self.root.config(cursor="")
+
+    def _pause_animation(self):
+        """Pauses the 3D rotation on the current view and restores full surface detail."""
+        if self.animator is not None:
+            self.animator.pause()
+            self.status_var.set("3D animation paused")
+            if self.surface_detail is not None:
+                self.surface_detail.locked = False
+                self.surface_detail.schedule_idle()
+
+    def _resume_animation(self):
+        """Resumes a paused 3D rotation at the coarse level of detail."""
+        if self.animator is not None:
+            if self.surface_detail is not None:
+                self.surface_detail.locked = True
+                self.surface_detail.interactive()
+            self.animator.resume()
+
+    def _on_speed_change(self, value):
+        """Applies the speed slider to the running animation."""
+        if self.animator is not None:
+            self.animator.set_speed(value)
 
     def _clear_plot(self):
         """
@@ -470,20 +3907,33 @@ class GraphingCalculatorApp:
         Dnaiel's section
         """
         self._stop_all_animation() 
+        self._ensure_graph_area()
         self.plot_area.figure.clf()  
         self.plot_area = self.canvas.figure.add_subplot(111, facecolor="#000000") 
-        self.plot_manager.plot_area = self.plot_area 
+        self.plot_manager.reset(self.plot_area)
         self.canvas.draw_idle()
 
-    def _reset_before_new_graph(self):
+    def _reset_before_new_graph(self, mode="2d"):
         """
         Prepares the plot area for a new graph.
 
-        Stops ongoing animation and clears previous plots. 
+        Stops ongoing animation and detaches the previous surface's level of
+        detail switching. The figure is only rebuilt when switching between
+        2D and 3D; consecutive 2D graphs reuse the existing artists.
+
+        Args:
+            mode (str): '2d' or '3d', the kind of graph about to be drawn.
         Daniels section
         """
         self._stop_all_animation()
+        if self.surface_detail is not None:
+            self.surface_detail.disconnect()
+            self.surface_detail = None
+        self._ensure_graph_area()
+        if mode == "2d" and self._plot_mode == "2d":
+            return
         self._clear_plot()
+        self._plot_mode = mode
 
     def _parse_variable_assignments(self):
         """
@@ -521,74 +3971,183 @@ class GraphingCalculatorApp:
 
         return variable_vals
 
+    def _parse_variable_grid(self):
+        """
+        Parses variable assignments whose values may be lists or ranges.
+
+        Each variable takes a number, a list or a start:stop[:step] range, as
+        in 'A=0:10:0.5, B=1,2,3'. Items without '=' continue the list of the
+        assignment before them.
+
+        Returns:
+            dict[str, np.ndarray]: Variable names and their values, in input order.
+
+        Raises:
+            ValueError: If a variable name, assignment or value is invalid.
+        """
+        variable_input_str = self.variables_entry.get().strip()
+        if not variable_input_str:
+            return {}
+
+        items = {}
+        var = None
+        for item in (item.strip() for item in variable_input_str.split(',')):
+            if "=" in item:
+                var, val_str = (part.strip() for part in item.split("=", 1))
+                if not var.isalpha():
+                    raise ValueError(f"Invalid variable name: '{var}'. Name must be one or more letters.")
+                items[var] = [val_str]
+            elif var is not None:
+                items[var].append(item)
+            else:
+                raise ValueError(f"Invalid assignment format: '{item}'. Must contain '='.")
+
+        grid = {}
+        for var, parts in items.items():
+            try:
+                grid[var] = parse_x_values(",".join(parts))
+            except ValueError:
+                raise ValueError(f"Value for variable '{var}' is not a valid number, list or range: "
+                                 f"'{', '.join(parts)}'")
+        return grid
+
     def _solve_implicit_equation(self, expression, target_var_str='z'):
         """
         Solves implicit equations for the target variable.
 
+        The solve runs through MathEngine.solve_equation, so it is cached and
+        bounded by the engine's solve_timeout.
+
         Args:
             expression (str): Implicit equation as a string (e.g., x^2 + y^2 + z^2 = 1).
             target_var_str (str): Variable to solve for (default 'z').
 
         Returns:
-            str: Solved expression as a string.
+            list[str] | None: Every solution as a string, or None if the solve timed out.
 
         Raises:
             ValueError: If equation cannot be solved for the target variable. 
         Amrie's section
         """
         if '=' not in expression:
-            return expression 
+            return [expression]
 
         lhs_str, rhs_str = expression.split('=', 1)
-        target_var = sym.Symbol(target_var_str)
-        
-        try:
-            lhs = sym.sympify(self._preprocess_expression(lhs_str))
-            rhs = sym.sympify(self._preprocess_expression(rhs_str))
-            equation = lhs - rhs
-        except Exception as e:
-            raise ValueError(f"Could not parse equation terms: {e}")
-        
-        solutions = sym.solve(equation, target_var)
+        equation = f"{self._preprocess_expression(lhs_str)}={self._preprocess_expression(rhs_str)}"
+        solutions = self.math_engine.solve_equation(equation, target_var_str)
+        if solutions is None:
+            return None
         if not solutions:
             raise ValueError(f"Could not solve the equation for {target_var_str}. It might be too complex or not contain {target_var_str}.")
         
-        return str(solutions[0])
+        return solutions
 
     def graph_calculations(self):
         """
         Plots a 2D graph based on the user-entered expression.
 
-        Applies variable substitutions, resets the plot state,
+        Parses variable assignments, resets the plot state,
         and delegates numerical evaluation and rendering to the
-        MathEngine and PlotManager. 
+        MathEngine and PlotManager. Assigned values are passed as parameters
+        of an expression compiled once, so changing a constant re-runs the
+        cached callable instead of recompiling. Several expressions separated
+        by ';' are overlaid on one shared x grid; curves already evaluated
+        with the same values for an earlier graph are reused rather than
+        re-evaluated. Evaluation runs on the background worker and supersedes
+        any graph still being computed.
         
         Alex's section
         """
         expression = self.expression_entry.get()
         try:
             self._reset_before_new_graph()
+            expressions = [part.strip() for part in expression.split(";") if part.strip()]
+            if not expressions:
+                self.worker.cancel("graph")
+                return
             variable_vals = self._parse_variable_assignments()
-            pre = expression.strip().replace("^", "**")
-        
-            for var, value in variable_vals.items():
-                if var != 'x':
-                    pattern = r'\b' + re.escape(var) + r'\b'
-                    pre = re.sub(pattern, str(value), pre)
-
-            x_vals, y_vals = self.math_engine._evaluate_expression_for_graph(pre)
-            self.plot_manager.draw_graph(x_vals, y_vals, expression)
-        
         except ValueError as e:
             messagebox.showerror("Variable Error", str(e))
-        except Exception as e:
+            return
+
+        parameters = {var: value for var, value in variable_vals.items() if var != 'x'}
+        normalized = [part.replace("^", "**") for part in expressions]
+
+        grid_key = (GRAPH_X_RANGE[0], GRAPH_X_RANGE[1], GRAPH_POINT_BUDGET)
+        keys = [(part, tuple(sorted(parameters.items()))) for part in normalized]
+
+        if len(normalized) == 1:
+            # The curve is drawn from adaptive samples, but its row on the shared
+            # grid is kept too, so adding a second curve does not re-evaluate it
+            pre = normalized[0]
+            sampler = lambda x_min, x_max, max_points: self.math_engine._evaluate_expression_for_graph(
+                pre, (x_min, x_max), max_points, parameters=parameters)
+
+            def job():
+                graph = self.math_engine._evaluate_expression_for_graph(pre, parameters=parameters)
+                return graph, self._evaluate_curves(normalized, keys, grid_key, parameters)[1]
+
+            def on_result(result):
+                (x_vals, y_vals), y_rows = result
+                self.plot_manager.draw_graph(x_vals, y_vals, expressions[0], sampler=sampler)
+                self.plot_manager.remember_rows(grid_key, keys, y_rows)
+
+            self.worker.submit(job, on_result, self._show_graph_error, channel="graph")
+            return
+
+        sampler = lambda x_min, x_max, max_points: self._evaluate_curves(
+            normalized, keys, (x_min, x_max, max_points), parameters)
+        self.worker.submit(lambda: self._evaluate_curves(normalized, keys, grid_key, parameters),
+                           lambda result: self.plot_manager.draw_curves(
+                               *result, expressions, keys=keys, grid_key=grid_key, sampler=sampler),
+                           self._show_graph_error, channel="graph")
+
+    def _show_graph_error(self, e):
+        """Reports a failed 2D graph evaluation."""
+        if isinstance(e, ValueError):
+            messagebox.showerror("Variable Error", str(e))
+        else:
             messagebox.showerror("Error", f"Invalid expression or plotting issue: {e}")
 
+    def _evaluate_curves(self, expressions, keys, grid_key, parameters):
+        """
+        Evaluates overlaid curves on a shared grid, reusing rows already on the plot.
+
+        Args:
+            expressions (list[str]): Expressions in terms of x.
+            keys (list[tuple]): Row cache key of each expression: the expression
+                and its parameter values.
+            grid_key (tuple[float, float, int]): (x_min, x_max, number of points).
+            parameters (dict[str, float]): Values for symbols other than x.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The grid and an (N, len(x)) array of values.
+        """
+        x_vals = np.linspace(*grid_key)
+        cached = self.plot_manager.curve_rows if self.plot_manager.curve_grid == grid_key else {}
+        missing = {key: part for key, part in zip(keys, expressions) if key not in cached}
+
+        rows = dict(cached)
+        if missing:
+            rows.update(zip(missing, self.math_engine.evaluate_curves(list(missing.values()), x_vals,
+                                                                      parameters)))
+
+        y_rows = np.empty((len(expressions), x_vals.size))
+        for index, key in enumerate(keys):
+            y_rows[index] = rows[key]
+        return x_vals, y_rows
+
     def multi_variable_values(self):
         """
         Evaluates expressions with multiple variables using user-defined assignments.
 
-        Displays the result in a message box.
+        Assignments may give lists or ranges (see _parse_variable_grid); the
+        Cartesian product of their values is evaluated in one call through
+        MathEngine.evaluate_grid, which also handles plain scalar
+        assignments, on the background worker so a large grid does not
+        freeze the window. Grids are capped at GRID_POINTS_MAX points. A
+        single value is shown in a message box, a grid with two varying
+        variables as a heatmap, and any other grid as a table.
         Amrie's section
         """
         expression = self.expression_entry.get()
@@ -598,39 +4157,67 @@ class GraphingCalculatorApp:
 
         try:
             # Parse user variable assignments
-            variable_vals = self._parse_variable_assignments()
+            grid = self._parse_variable_grid()
         except ValueError as e:
             messagebox.showerror("Variable Error", str(e))
             return
 
-        try:
-            # Convert expression string to SymPy expression
-            expr = self.math_engine.to_sympy_expr(expression)
-
-            # Substitute user-provided variable values
-            if variable_vals:
-                subs_dict = {sym.Symbol(k): v for k, v in variable_vals.items()}
-                expr = expr.subs(subs_dict)
+        varying = [name for name, axis in grid.items() if axis.size > 1]
+        fixed = ', '.join(f'{name}={axis[0]}' for name, axis in grid.items() if axis.size == 1)
+        title = f"f = {expression.strip()}" + (f" at {fixed}" if fixed else "")
 
-            # Evaluate numerically
-            result = expr.evalf()
+        def job():
+            f, values = self.math_engine.evaluate_grid(expression, grid)
+            values = values.reshape([grid[name].size for name in varying])
+            columns = None
+            if len(varying) not in (0, 2):
+                mesh = np.meshgrid(*(grid[name] for name in varying), indexing="ij")
+                columns = [axis.ravel() for axis in mesh] + [values.ravel()]
+            return f, values, columns
 
-            # Prepare display string for assigned variables
-            if variable_vals:
-                display_vars = ', '.join([f'{k}={v}' for k, v in variable_vals.items()])
-                messagebox.showinfo("Result", f"f({display_vars}) = {result}")
+        def on_result(result):
+            f, values, columns = result
+            self._announce_defaults(f, "evaluation")
+            if not varying:
+                messagebox.showinfo("Result", f"f({fixed}) = {values.item()}" if fixed else f"f = {values.item()}")
+            elif columns is None:
+                self._show_heatmap(tuple(varying), (grid[varying[0]], grid[varying[1]]), values, title)
             else:
-                messagebox.showinfo("Result", f"f = {result}")
+                ResultTable(self.root, f"{title} ({values.size:,} values)", varying + ["f"], columns)
 
-        except Exception as e:
-            messagebox.showerror("Calculation Error", f"Cannot evaluate expression: {e}")
+        self.worker.submit(job, on_result,
+                           lambda e: messagebox.showerror("Calculation Error", f"Cannot evaluate expression: {e}"),
+                           channel="calc")
+
+    def _show_heatmap(self, names, axes, values, title):
+        """
+        Opens a window with a heatmap of f over two varying variables.
+
+        Args:
+            names (tuple[str, str]): The two variable names.
+            axes (tuple[np.ndarray, np.ndarray]): Their values.
+            values (np.ndarray): f on the grid.
+            title (str): Window and axes title.
+        """
+        Figure, FigureCanvasTkAgg, _ = _load_matplotlib()
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        figure = Figure(figsize=(6, 4.5), dpi=100)
+        draw_heatmap(figure, names, axes, values, title)
+        canvas = FigureCanvasTkAgg(figure, master=window)
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        canvas.draw_idle()
 
 
     def _on_calc_value(self):
         """
-        Evaluates the expression at a single x-value.
+        Evaluates the expression at the x values in the x box.
 
-        Displays the result in a message box. Handles invalid input. 
+        The box may hold one number, a list, a start:stop:step range or a file
+        path (see parse_x_values). All values are evaluated in one vectorized
+        call of the compiled expression on the background worker. A single
+        value is shown in a message box, several in a ResultTable. Handles
+        invalid input. 
         Amrie section
         """
         expr = self.expression_entry.get()
@@ -640,21 +4227,32 @@ class GraphingCalculatorApp:
             messagebox.showwarning("Warning", "Enter expression and x value.")
             return
 
-        try:
-            x = sym.Symbol("x")
+        def job():
             expr_proc = self._preprocess_expression(expr)
-            expr_sym = sym.sympify(expr_proc)
-            f = sym.lambdify(x, expr_sym, modules=["numpy"])
-            result = f(float(x_val_str))
-            messagebox.showinfo("Result", f"f({x_val_str}) = {result}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Cannot compute value:\n{e}")
+            f = self.math_engine.compile_expression(expr_proc, ("x",))
+            x = parse_x_values(x_val_str)
+            return x, f(x)
+
+        def on_result(result):
+            x, y = result
+            if x.size == 1:
+                messagebox.showinfo("Result", f"f({x_val_str.strip()}) = {y[0]}")
+            else:
+                ResultTable(self.root, f"f(x) = {expr.strip()} at {x.size:,} values", ("x", "f(x)"), (x, y))
+
+        self.worker.submit(job, on_result,
+                           lambda e: messagebox.showerror("Error", f"Cannot compute value:\n{e}"),
+                           channel="calc")
+
     def _3D_Render_Callback(self):
         """
         Handles the 3D Render button click.
 
-        Solves implicit equations if needed and renders the 3D surface plot.
-        Displays warnings if expression is missing or invalid. 
+        Renders explicit expressions as a 3D surface plot. Implicit equations
+        are meshed numerically by implicit_Render, or, when the symbolic
+        option is ticked, solved for z, with every real branch of the solution
+        drawn as its own surface. Displays warnings if expression is missing
+        or invalid. All of this runs on the background worker.
         
         Daniels section
         """
@@ -665,19 +4263,71 @@ class GraphingCalculatorApp:
         
         try:
             preprocessed_expression = self._preprocess_expression(expression)
-            if '=' in preprocessed_expression:
-                explicit_expression = self._solve_implicit_equation(preprocessed_expression, 'z')
-                messagebox.showinfo("Auto-Solved", f"Implicit equation solved for z.\nPlotting: z = {explicit_expression}")
-            else:
-                explicit_expression = preprocessed_expression
-
-            self._reset_before_new_graph()
-            self.three_dimension_Render(explicit_expression)
-            
-        except ValueError as e:
-            messagebox.showerror("Solve Error", str(e))
         except Exception as e:
             messagebox.showerror("3D Render Error", f"An unexpected error occurred: {e}")
+            return
+
+        self._reset_before_new_graph("3d")
+        if '=' not in preprocessed_expression:
+            self.three_dimension_Render(preprocessed_expression)
+            return
+        if not self.symbolic_solve_var.get():
+            self.implicit_Render(preprocessed_expression)
+            return
+
+        def job():
+            branches = self._solve_implicit_equation(preprocessed_expression, 'z')
+            if branches is None:
+                return None
+            return branches, self.math_engine.build_branch_surfaces(branches)
+
+        def on_solved(result):
+            if result is None:
+                messagebox.showinfo("Solve Timed Out",
+                                    f"Solving for z took longer than {self.math_engine.solve_timeout:g} s.\n"
+                                    "Meshing the equation numerically instead.")
+                self.implicit_Render(preprocessed_expression)
+                return
+            branches, surface = result
+            plotted = "\n".join(f"z = {branch}" for branch in branches)
+            messagebox.showinfo("Auto-Solved", f"Implicit equation solved for z.\nPlotting:\n{plotted}")
+            self._announce_defaults(surface.compiled, "rendering")
+            self._ensure_graph_area()
+            self.ax3d = draw_branch_scene(self.plot_area.figure, surface, f"3D Render: {expression}")
+            self._surface = self.ax3d.collections[0]
+            self.canvas.draw_idle()
+
+        def on_error(e):
+            if isinstance(e, ValueError):
+                messagebox.showerror("Solve Error", str(e))
+            else:
+                messagebox.showerror("3D Render Error", f"An unexpected error occurred: {e}")
+
+        self.worker.submit(job, on_solved, on_error, channel="graph")
+
+    def implicit_Render(self, equation):
+        """
+        Renders the implicit surface lhs = rhs without solving it symbolically.
+
+        The mesh comes from MathEngine.build_implicit_surface on the
+        background worker and is drawn as a triangle surface.
+
+        Args:
+            equation (str): Preprocessed equation in x, y and z.
+        """
+        def on_result(surface):
+            self._announce_defaults(surface.compiled, "rendering")
+            self._ensure_graph_area()
+            self.ax3d = draw_implicit_scene(self.plot_area.figure, surface, f"3D Implicit: {equation}")
+            self._surface = self.ax3d.collections[0]
+            self.canvas.draw_idle()
+
+        def on_error(error):
+            title = "Solve Error" if isinstance(error, ValueError) else "3D Render Error"
+            messagebox.showerror(title, str(error))
+
+        self.worker.submit(lambda: self.math_engine.build_implicit_surface(equation), on_result,
+                           on_error, channel="graph")
 
     def three_dimension_Render(self, expression):
         """
@@ -685,68 +4335,38 @@ class GraphingCalculatorApp:
 
         Automatically assigns default values to unassigned constants,
         evaluates the expression over a mesh grid, and displays the
-        result using a 3D matplotlib surface plot.
+        result using a 3D matplotlib surface plot. The surface comes from
+        MathEngine.build_surface on the background worker, shared with 3D
+        Animate; drawing happens once the result is back on the Tk thread.
 
         Args:
             expression (str): Expression in terms of x and y. 
         Daniels section
         """
-        x, y = sym.symbols("x y")
-        try:
-            expr = sym.sympify(expression.replace("^", "**"))
-        except Exception as e:
-            messagebox.showerror("3D Render Error", f"Invalid expression: {e}")
-            return
-
-        all_symbols = expr.free_symbols
-        constant_symbols = [s for s in all_symbols if str(s) not in ('x', 'y', 'z')]
-        default_substitutions = {s: 1.0 for s in constant_symbols}
-        
-        if default_substitutions:
-            const_info = ', '.join([f'{str(s)}=1.0' for s in default_substitutions])
-            messagebox.showinfo("Variable Defaults", f"Assigning default value of 1.0 to: {const_info} for rendering.")
-        
-        expr_with_constants = expr.subs(default_substitutions)
-        f = sym.lambdify((x, y), expr_with_constants, modules=["numpy"])
-        
-        X, Y = np.meshgrid(np.linspace(-5, 5, 150), np.linspace(-5, 5, 150))
-        with np.errstate(divide='ignore', invalid='ignore'):
-            Z = f(X, Y)
-             
-        if Z.ndim == 0:
-            Z = np.full_like(X, Z.item())
-        elif Z.ndim == 1 and X.shape[0] * X.shape[1] == Z.shape[0]:
-            Z = Z.reshape(X.shape)
-            
-        Z = np.nan_to_num(Z, nan=0.0, posinf=0.0, neginf=0.0)
-        Z = np.clip(Z, -50.0, 50.0)
-
-        self.plot_area.figure.clf() 
-        self.ax3d = self.plot_area.figure.add_subplot(111, projection="3d", facecolor="#000000")
-        self._surface = self.ax3d.plot_surface(X, Y, Z, cmap="cool", edgecolor="none") 
+        def on_result(surface):
+            self._announce_defaults(surface.compiled, "rendering")
+            self._ensure_graph_area()
+            self._show_surface(surface, f"3D Render: {expression}")
+            self.canvas.draw_idle()
+            self.surface_detail.schedule_idle()
 
-        try:
-            zmin, zmax = np.nanmin(Z), np.nanmax(Z)
-            if not np.isfinite(zmin) or not np.isfinite(zmax) or zmin == zmax:
-                zmin, zmax = -5, 5
-        except:
-            zmin, zmax = -5, 5
-            
-        self.ax3d.set_zlim(zmin, zmax)
-        self.ax3d.set_xlabel("x", color="#8FD4FA")
-        self.ax3d.set_ylabel("y", color="#8FD4FA")
-        self.ax3d.set_zlabel("z", color="#8FD4FA")
-        self.ax3d.tick_params(axis='x', colors="#8FD4FA")
-        self.ax3d.tick_params(axis='y', colors="#8FD4FA")
-        self.ax3d.tick_params(axis='z', colors="#B0BEC5")
-        self.ax3d.set_title(f"3D Render: {expression}", color="#8FD4FA")
-        self.canvas.draw_idle()
+        self.worker.submit(lambda: self.math_engine.build_surface(expression), on_result,
+                           lambda e: messagebox.showerror("3D Render Error", f"Invalid expression: {e}"),
+                           channel="graph")
 
     def three_dim_animate(self):
         """
         Animates a 3D surface plot by continuously rotating the view.
 
-        Only supports explicit 3D expressions in terms of x and y. 
+        Rotation is driven by a RotationAnimator. It renders the views of one
+        lap offscreen, plays them back as images, and blits views that are
+        not cached yet. Pause, Resume and the speed slider control playback
+        without discarding the cached frames. Expressions that use t are
+        animated over time instead: they are compiled with t as a third
+        variable, and frames are streamed from a TimeFrameStream, which
+        evaluates a chunk of time steps per call. The input is preprocessed
+        as in 3D Render, so both read it alike and share cached surfaces.
+        Only supports explicit 3D expressions in terms of x, y and t. 
         Daniels section
         """
         expr_str = self.expression_entry.get().strip()
@@ -758,81 +4378,117 @@ class GraphingCalculatorApp:
             messagebox.showwarning("Invalid Input", "3D Animation does not support implicit equations.")
             return
         
-        self._reset_before_new_graph()
-        x, y = sym.symbols("x y")
         try:
-            expr = sym.sympify(expr_str.replace("^", "**"))
+            preprocessed_expression = self._preprocess_expression(expr_str)
         except Exception as e:
             messagebox.showerror("Error", f"Invalid expression: {e}")
             return
 
-        all_symbols = expr.free_symbols
-        constant_symbols = [s for s in all_symbols if str(s) not in ('x', 'y', 'z')]
-        default_substitutions = {s: 1.0 for s in constant_symbols}
-        
-        if default_substitutions:
-            const_info = ', '.join([f'{str(s)}=1.0' for s in default_substitutions])
-            messagebox.showinfo("Variable Defaults", f"Assigning default value of 1.0 to: {const_info} for animation.")
-        
-        expr_with_constants = expr.subs(default_substitutions)
-        f = sym.lambdify((x, y), expr_with_constants, modules=["numpy"])
-        
-        X, Y = np.meshgrid(np.linspace(-5, 5, 100), np.linspace(-5, 5, 100))
-        with np.errstate(divide='ignore', invalid='ignore'):
-            Z = f(X, Y)
-        
-        if Z.ndim == 0:
-            Z = np.full_like(X, Z.item())
-        elif Z.ndim == 1 and X.shape[0] * X.shape[1] == Z.shape[0]:
-            Z = Z.reshape(X.shape)
-            
-        Z = np.nan_to_num(Z, nan=0.0, posinf=0.0, neginf=0.0)
-        Z = np.clip(Z, -50.0, 50.0)
+        self._reset_before_new_graph("3d")
 
-        try:
-            zmin, zmax = np.nanmin(Z), np.nanmax(Z)
-            if not np.isfinite(zmin) or not np.isfinite(zmax) or zmin == zmax:
-                zmin, zmax = -5, 5
-        except:
-            zmin, zmax = -5, 5
+        def job():
+            f = self.math_engine.compile_expression(preprocessed_expression, ("x", "y"))
+            if "t" not in f.defaults:
+                surface = self.math_engine.build_surface(preprocessed_expression)
+                return lambda: self._start_rotation(expr_str, surface)
+            f = self.math_engine.compile_expression(preprocessed_expression, ("x", "y", "t"))
+            X, Y = np.meshgrid(np.linspace(-5, 5, 100), np.linspace(-5, 5, 100))
+            stream = TimeFrameStream(f, X, Y)
+            t0, Z0 = stream.next_frame()
+            return lambda: self._start_time_animation(expr_str, f, X, Y, Z0, stream)
+
+        self.worker.submit(job, lambda start: start(),
+                           lambda e: messagebox.showerror("Error", f"Invalid expression: {e}"),
+                           channel="graph")
+
+    def _announce_defaults(self, f, purpose):
+        """
+        Tells the user which unassigned constants were given the default value 1.0.
+
+        Args:
+            f (CompiledExpression): Compiled expression.
+            purpose (str): What the expression is used for, e.g. 'rendering'.
+        """
+        if f.defaults:
+            const_info = ', '.join([f'{name}=1.0' for name in f.defaults])
+            messagebox.showinfo("Variable Defaults", f"Assigning default value of 1.0 to: {const_info} for {purpose}.")
 
-        self.plot_area.figure.clf() 
-        self.ax3d = self.plot_area.figure.add_subplot(111, projection="3d", facecolor="#000000")
-        self._surface = self.ax3d.plot_surface(X, Y, Z, cmap="cool", edgecolor="none")
-        self.ax3d.set_zlim(zmin, zmax)
-        self.ax3d.set_xlabel("x", color="#8FD4FA")
-        self.ax3d.set_ylabel("y", color="#8FD4FA")
-        self.ax3d.set_zlabel("z", color="#8FD4FA")
-        self.ax3d.tick_params(axis='x', colors="#8FD4FA")
-        self.ax3d.tick_params(axis='y', colors="#8FD4FA")
-        self.ax3d.tick_params(axis='z', colors="#B0BEC5")
-        self.ax3d.set_title(f"3D Rotation: {expr_str}", color="#8FD4FA")
+    def _start_rotation(self, expr_str, surface):
+        """
+        Draws a surface and starts rotating the camera around it.
+
+        Args:
+            expr_str (str): Expression as entered.
+            surface (SurfaceData): Surface from MathEngine.build_surface.
+        """
+        self._announce_defaults(surface.compiled, "animation")
+        self._ensure_graph_area()
+        title = f"3D Rotation: {expr_str}"
+        coarse_mesh = self._show_surface(surface, title)
+        self.surface_detail.locked = True
+        self.surface_detail.on_idle = lambda: self.animator.redraw()
+        scene = lambda figure: draw_surface_scene(figure, *coarse_mesh, surface.zlim, title)
 
         self.animating = True
-        angle = 0
-        
-        def update_frame():
-            """
-            Updates the 3D animation frame by rotating the camera view.
-
-            Reschedules itself using Tkinter's event loop to maintain smooth animation. 
-            Daniel's section
-            """
-            nonlocal angle
-            if not self.animating:
-                return
-            self.ax3d.view_init(elev=30, azim=angle) 
-            angle = (angle + 3) % 360 
-            self.canvas.draw_idle()
-            self.root.after(33, update_frame)
+        self.animator = RotationAnimator(self.root, self.canvas, self.ax3d, on_fps=self._show_fps,
+                                         scene=scene, on_error=self._on_animation_error)
+        self.animator.set_speed(self.speed_var.get())
+        self.animator.start()
+
+    def _start_time_animation(self, expr_str, f, X, Y, Z0, stream):
+        """
+        Draws the first time step of z(x, y, t) and starts the time animation.
+
+        Args:
+            expr_str (str): Expression as entered.
+            f (CompiledExpression): Expression compiled for ("x", "y", "t").
+            X, Y (np.ndarray): Mesh shared by every frame.
+            Z0 (np.ndarray): The first frame.
+            stream (TimeFrameStream): Source of the following frames.
+        """
+        self._announce_defaults(f, "animation")
+        self._ensure_graph_area()
+        title = f"3D Time: {expr_str}"
+        zlim = surface_limits(stream.chunk_range())
+        self.ax3d = draw_surface_scene(self.plot_area.figure, X, Y, Z0, zlim, title)
+        self._surface = self.ax3d.collections[0]
+
+        stream.prefetch_with(lambda job: self.worker.submit(job, lambda chunk: None,
+                                                           channel="time-chunk", quiet=True))
+
+        self.animating = True
+        self.animator = SurfaceTimeAnimator(self.root, self.canvas, self.ax3d, X, Y, stream, title,
+                                            zlim, on_fps=self._show_fps)
+        self.animator.set_speed(self.speed_var.get())
+        self.animator.start()
+
+    def _show_surface(self, surface, title):
+        """
+        Draws a surface at its coarse level of detail and sets up switching to the fine level.
+
+        Args:
+            surface (SurfaceData): Surface from MathEngine.build_surface.
+            title (str): Axes title.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: The coarse mesh that was drawn.
+        """
+        lod = surface.lod
+        coarse = lod.level_for(SurfaceDetailController.INTERACTIVE_MAX_GRID)
+        self.ax3d = draw_surface_scene(self.plot_area.figure, *lod.levels[coarse], surface.zlim, title)
+        self._surface = self.ax3d.collections[0]
+        self.surface_detail = SurfaceDetailController(self.canvas, self.ax3d, lod, surface.zlim,
+                                                      shown_level=coarse)
+        return lod.levels[coarse]
 
-        update_frame()
-        
     def _preprocess_expression(self, expr: str) -> str:
         """
         Preprocesses user input expression for evaluation and plotting.
 
-        Replaces '^' with '**' and inserts missing multiplication symbols.
+        Replaces '^' with '**' and inserts missing multiplication symbols,
+        leaving function names such as sin intact. Tokenizing is memoized by
+        MathEngine.tokenize, which also keeps the tokens for the returned
+        text, so parsing it later reads the tokens instead of the string.
 
         Args:
             expr (str): Raw expression string.
@@ -841,16 +4497,18 @@ class GraphingCalculatorApp:
             str: Preprocessed expression string.
         Amrie's section
         """
-        expr = expr.strip().replace("^", "**")
-        expr = re.sub(r"(?<=\d|\))(?=[a-zA-Z\(])", "*", expr) 
-        expr = re.sub(r"(?<=[a-zA-Z\)])(?=\d)", "*", expr)     
-        expr = re.sub(r"(?<=[a-zA-Z0-9\)])(?=[a-zA-Z\(])", "*", expr) 
-        return expr
+        return "".join(self.math_engine.tokenize(expr))
 
 
 # ------------------- RUN APP -------------------
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = GraphingCalculatorApp(root)
+    parser = argparse.ArgumentParser(description="Graphing Calculator 2D & 3D")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print a breakdown of import and widget-construction time once warm-up finishes")
+    args = parser.parse_args()
+
+    with STARTUP_PROFILE.section("tk root"):
+        root = tk.Tk()
+    app = GraphingCalculatorApp(root, profile_startup=args.profile_startup)
     root.mainloop()
 
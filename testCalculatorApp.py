@@ -1,16 +1,28 @@
+import json
 import numpy as np
 import pytest
+import os
+import subprocess
+import sys
 import tkinter as tk
-from unittest.mock import patch
-from calculatorApp import GraphingCalculatorApp
+import threading
+from unittest.mock import MagicMock, patch
+from calculatorApp import (EvaluationWorker, GraphingCalculatorApp, MathEngine, MeshEvaluationPool,
+                           ResizeCoordinator, RotationAnimator, RotationFrameCache, SurfaceDetailController,
+                           SurfaceLOD, SurfaceTimeAnimator, TimeFrameStream, adaptive_sample, draw_branch_scene,
+                           draw_heatmap, draw_surface_scene, gradient_ppm, insert_discontinuity_breaks,
+                           parse_x_values, surface_limits)
 
 
 @pytest.fixture
-def app():
+def app(tmp_path, monkeypatch):
+    # Keep the app's on-disk expression cache out of the real ~/.cache
+    monkeypatch.setenv("GRAPHING_CALC_CACHE_DIR", str(tmp_path / "cache"))
     root = tk.Tk()
     root.withdraw()
     app_instance = GraphingCalculatorApp(root)
     yield app_instance
+    app_instance.shutdown()
     root.destroy()
 
 
@@ -25,6 +37,9 @@ def test_evaluate_expression_valid(app):
          patch("tkinter.messagebox.showerror") as mock_error:
 
         app.multi_variable_values()
+        # Evaluation runs on the worker, not in the click handler
+        assert app.worker.busy
+        app.worker.flush(timeout=5)
 
     mock_info.assert_called_once()
     assert "10.0" in mock_info.call_args[0][1]
@@ -92,9 +107,11 @@ def test_graph_calc(app):
     ) as mock_eval, patch.object(app.plot_manager, "draw_graph") as mock_draw:
 
         app.graph_calculations()
+        app.worker.flush()
 
     mock_eval.assert_called_once()
-    assert mock_eval.call_args[0][0] == "2.0*cos(x)"
+    assert mock_eval.call_args[0][0] == "A*cos(x)"
+    assert mock_eval.call_args[1]["parameters"] == {"A": 2.0}
     mock_draw.assert_called_once()
 
 
@@ -111,8 +128,9 @@ def test_unassigned_calcs(app):
     ) as mock_eval, patch("tkinter.messagebox.showerror") as mock_error:
 
         app.graph_calculations()
+        app.worker.flush()
 
-    mock_eval.assert_called_once_with("x**2")
+    mock_eval.assert_called_once_with("x**2", parameters={})
     mock_error.assert_not_called()
 
 
@@ -123,6 +141,7 @@ def test_empty_expression(app):
 
     with patch("tkinter.messagebox.showerror") as mock_error:
         app.graph_calculations()
+        app.worker.flush()
 
     mock_error.assert_not_called()
 
@@ -135,7 +154,783 @@ def test_missing_variable_assignment(app):
 
     with patch("tkinter.messagebox.showerror") as mock_error:
         app.graph_calculations()
+        app.worker.flush()
 
     mock_error.assert_not_called()
 
 
+# --- 10. Compiled Expression Cache: Canonical Keys ---
+def test_compile_cache_shares_equivalent_expressions():
+    engine = MathEngine(disk_cache=False)
+
+    first = engine.compile_expression("x^2")
+    second = engine.compile_expression("x**2")
+    third = engine.compile_expression("x * x")
+
+    assert first is second is third
+    assert engine.cache_info()["misses"] == 1
+    assert engine.cache_info()["hits"] == 2
+    np.testing.assert_allclose(first(np.array([1.0, 2.0, 3.0])), [1.0, 4.0, 9.0])
+
+    # Rewrites that change the domain must not share an entry
+    x_vals = np.array([-4.0, -1.0, 0.0, 1.0, 4.0])
+    for simple, restricted in (("x", "x**0.5*x**0.5"), ("x", "(x**0.5)**2"), ("1", "x/x"), ("0", "x-x")):
+        assert engine.compile_expression(simple) is not engine.compile_expression(restricted)
+    assert np.isnan(engine.compile_expression("x**0.5*x**0.5")(x_vals)[:2]).all()
+    assert np.isnan(engine.compile_expression("(x**0.5)**2")(x_vals)[:2]).all()
+    assert np.isnan(engine.compile_expression("x/x")(x_vals)[2])
+
+
+# --- 11. Compiled Expression Cache: LRU Eviction ---
+def test_compile_cache_evicts_least_recently_used():
+    engine = MathEngine(cache_size=2, disk_cache=False)
+
+    engine.compile_expression("x + 1")
+    engine.compile_expression("x + 2")
+    engine.compile_expression("x + 1")
+    engine.compile_expression("x + 3")
+
+    assert engine.cache_info()["size"] == 2
+    engine.compile_expression("x + 1")
+    assert engine.cache_info()["misses"] == 3
+    engine.compile_expression("x + 2")
+    assert engine.cache_info()["misses"] == 4
+
+
+# --- 12. Disk Cache: Warm Start ---
+def test_disk_cache_warm_start(tmp_path):
+    MathEngine(cache_dir=str(tmp_path)).compile_expression("exp(x) + x^2")
+
+    engine = MathEngine(cache_dir=str(tmp_path))
+    with patch("calculatorApp.sym.lambdify") as mock_lambdify:
+        compiled = engine.compile_expression("exp(x) + x^2")
+
+    mock_lambdify.assert_not_called()
+    assert engine.cache_info()["disk_hits"] == 1
+    np.testing.assert_allclose(compiled(np.array([0.0, 2.0])), [1.0, np.exp(2.0) + 4.0])
+
+
+# --- 13. Disk Cache: Corrupt Entry Falls Back ---
+def test_disk_cache_corrupt_entry(tmp_path):
+    MathEngine(cache_dir=str(tmp_path)).compile_expression("exp(x) + 1")
+    for entry in tmp_path.rglob("*.json"):
+        entry.write_text("{not json")
+
+    engine = MathEngine(cache_dir=str(tmp_path))
+    compiled = engine.compile_expression("exp(x) + 1")
+
+    assert engine.cache_info()["disk_hits"] == 0
+    np.testing.assert_allclose(compiled(np.array([0.0])), [2.0])
+
+    # Entries whose source was changed after signing are never executed
+    entries = list(tmp_path.rglob("*.json"))
+    assert entries
+    for entry in entries:
+        data = json.loads(entry.read_text())
+        data["source"] = data["source"].replace("return", "import os; return", 1)
+        entry.write_text(json.dumps(data))
+    engine = MathEngine(cache_dir=str(tmp_path))
+    with patch("calculatorApp._function_from_source") as mock_load:
+        engine.compile_expression("exp(x) + 1")
+    mock_load.assert_not_called()
+    assert engine.cache_info()["disk_hits"] == 0
+
+
+# --- 14. Fast Path: Plain Arithmetic Skips SymPy ---
+def test_fast_path_skips_sympy():
+    engine = MathEngine(disk_cache=False)
+
+    with patch("calculatorApp.sym.sympify") as mock_sympify:
+        compiled = engine.compile_expression("2*sin(x) + sqrt(x)^2 - pi/e")
+
+    mock_sympify.assert_not_called()
+    assert engine.compile_expression("2*sin(x)+sqrt(x)**2-pi/e") is compiled
+    x_vals = np.array([0.5, 1.0, 4.0])
+    expected = 2 * np.sin(x_vals) + x_vals - np.pi / np.e
+    np.testing.assert_allclose(compiled(x_vals), expected)
+
+
+# --- 15. Fast Path: Unsupported Input Falls Back ---
+def test_fast_path_falls_back_to_sympy():
+    engine = MathEngine(disk_cache=False)
+
+    compiled = engine.compile_expression("A*exp(x)")
+
+    assert compiled.defaults == ("A",)
+    np.testing.assert_allclose(compiled(np.array([0.0, 1.0])), [1.0, np.e])
+
+
+# --- 16. Startup: Heavy Imports Are Deferred ---
+def test_heavy_imports_deferred():
+    code = (
+        "import sys, calculatorApp\n"
+        "heavy = ('sympy', 'matplotlib', 'numpy', 'mpl_toolkits.mplot3d')\n"
+        "print(','.join(m for m in heavy if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+
+# --- 17. Adaptive Sampling: Flat Curves Stay Coarse ---
+def test_adaptive_sampling_flat_curve():
+    evaluated = []
+
+    def line(x_vals):
+        evaluated.append(len(x_vals))
+        return 3 * x_vals + 1
+
+    x_vals, y_vals = adaptive_sample(line, -10, 10)
+
+    assert sum(evaluated) < 400
+    assert len(evaluated) == 1
+    np.testing.assert_allclose(y_vals, 3 * x_vals + 1)
+
+
+# --- 18. Adaptive Sampling: Oscillations Get Refined ---
+def test_adaptive_sampling_refines_oscillation():
+    x_vals, y_vals = adaptive_sample(lambda x: np.sin(1 / x), -10, 10, max_points=1500)
+
+    assert len(x_vals) <= 1500
+    assert np.all(np.diff(x_vals) > 0)
+    near_zero = np.sum(np.abs(x_vals) < 0.5)
+    far_away = np.sum(np.abs(x_vals) > 9.5)
+    assert near_zero > 10 * far_away
+
+
+# --- 19. Viewport: Zoom Re-evaluates Visible Range ---
+def test_viewport_refresh_resamples_visible_range(app):
+    app.expression_entry.delete(0, tk.END)
+    app.expression_entry.insert(0, "sin(1/x)")
+    app.variables_entry.delete(0, tk.END)
+
+    app.graph_calculations()
+    app.worker.flush()
+    app.plot_manager.plot_area.set_xlim(0.01, 0.1)
+    app.plot_manager._refresh_viewport()
+    app.worker.flush()
+
+    x_vals = app.plot_manager._lines[0].get_xdata()
+    assert x_vals.min() >= 0.01 and x_vals.max() <= 0.1
+    assert len(x_vals) > 100
+
+
+# --- 20. Discontinuities: Poles Get NaN Breaks ---
+def test_poles_are_broken_with_nan():
+    engine = MathEngine(disk_cache=False)
+
+    x_vals, y_vals = engine._evaluate_expression_for_graph("tan(x)")
+
+    assert np.all(np.diff(x_vals) >= 0)
+    for pole in (-np.pi / 2, np.pi / 2, 3 * np.pi / 2):
+        nearby = np.abs(x_vals - pole) < 0.05
+        assert np.isnan(y_vals[nearby]).any()
+    # No drawn segment may join the two sides of a pole
+    segment_crosses = np.isfinite(y_vals[:-1]) & np.isfinite(y_vals[1:]) & \
+        (np.sign(y_vals[:-1]) != np.sign(y_vals[1:])) & (np.abs(np.diff(y_vals)) > 50)
+    assert not segment_crosses.any()
+
+
+# --- 21. Discontinuities: Steep Continuous Curves Stay Joined ---
+def test_steep_continuous_curve_not_broken():
+    x_vals = np.linspace(-1, 1, 21)
+    y_vals = np.tanh(50 * x_vals)
+
+    new_x, new_y = insert_discontinuity_breaks(lambda x: np.tanh(50 * x), x_vals, y_vals)
+
+    assert not np.isnan(new_y).any()
+    assert len(new_x) > len(x_vals)
+    assert np.all(np.diff(new_x) >= 0)
+
+
+# --- 22. Multi-Curve: Batched Evaluation on a Shared Grid ---
+def test_evaluate_curves_shared_grid():
+    engine = MathEngine(disk_cache=False)
+    x_vals = np.linspace(-10, 10, 1001)
+
+    y_rows = engine.evaluate_curves(["sin(x)", "x^2", "1/x"], x_vals)
+
+    assert y_rows.shape == (3, 1001)
+    np.testing.assert_allclose(y_rows[0], np.sin(x_vals))
+    np.testing.assert_allclose(y_rows[1], x_vals ** 2)
+    assert np.isnan(y_rows[2][np.abs(x_vals) < 0.02]).any()
+
+
+# --- 23. Multi-Curve: Adding a Curve Reuses the Others ---
+def test_adding_curve_reuses_existing_rows(app):
+    app.variables_entry.delete(0, tk.END)
+    app.expression_entry.delete(0, tk.END)
+    app.expression_entry.insert(0, "sin(x); cos(x)")
+    app.graph_calculations()
+    app.worker.flush()
+
+    app.expression_entry.insert(tk.END, "; x^2")
+    with patch.object(app.math_engine, "evaluate_curves",
+                      wraps=app.math_engine.evaluate_curves) as mock_batch, \
+         patch("tkinter.messagebox.showerror") as mock_error:
+        app.graph_calculations()
+        app.worker.flush()
+
+    mock_error.assert_not_called()
+    mock_batch.assert_called_once()
+    assert mock_batch.call_args[0][0] == ["x**2"]
+    assert len(app.plot_manager._lines) == 3
+
+
+# --- 24. Incremental Redraw: Artists Persist Between 2D Graphs ---
+def test_incremental_redraw_reuses_line(app):
+    app.variables_entry.delete(0, tk.END)
+    app.expression_entry.delete(0, tk.END)
+    app.expression_entry.insert(0, "sin(x)")
+    app.graph_calculations()
+    app.worker.flush()
+    first_axes = app.plot_manager.plot_area
+    first_line = app.plot_manager._lines[0]
+
+    app.expression_entry.delete(0, tk.END)
+    app.expression_entry.insert(0, "x^2")
+    app.graph_calculations()
+    app.worker.flush()
+
+    assert app.plot_manager.plot_area is first_axes
+    assert app.plot_manager._lines[0] is first_line
+    assert first_line.get_label() == "f(x) = x^2"
+    assert first_axes.get_ylim()[1] >= 100
+
+
+# --- 25. 3D Animation: Rotation Blits and Reports Frame Rate ---
+def test_rotation_animation_blits(app):
+    app.expression_entry.delete(0, tk.END)
+    app.expression_entry.insert(0, "sin(x)*cos(y)")
+    app.three_dim_animate()
+    app.worker.flush()
+    animator = app.animator
+
+    assert animator.running
+    assert animator.axes.get_animated() == animator.blitting
+    for _ in range(animator.REPORT_EVERY + 1):
+        animator._tick()
+    assert animator.fps > 0
+    assert "fps" in app.status_var.get()
+
+    app._stop_all_animation()
+    assert not animator.running
+    assert not animator.axes.get_animated()
+
+
+# --- 26. 3D Animation: Offscreen Frame Cache Covers One Lap ---
+def test_rotation_frame_cache_renders_lap():
+    X, Y = np.meshgrid(np.linspace(-5, 5, 20), np.linspace(-5, 5, 20))
+    Z = np.sin(X) * np.cos(Y)
+    scene = lambda figure: draw_surface_scene(figure, X, Y, Z, (-1, 1), "test")
+    frame_bytes = 120 * 80 * 4
+
+    frames = RotationFrameCache(scene, (120, 80), 40, "#1C1C1C", step=30,
+                                max_bytes=12 * frame_bytes).start()
+    frames.join()
+    assert (frames.step, frames.views, frames.ready()) == (30, 12, 12)
+    assert frames.frame_data(frames.index_for(95)).startswith(b"P6 120 80 255\n")
+
+    bounded = RotationFrameCache(scene, (120, 80), 40, "#1C1C1C", step=3,
+                                 max_bytes=12 * frame_bytes)
+    assert bounded.views <= 12
+
+
+# --- 27. Time Animation: Frames Are Evaluated in Broadcast Chunks ---
+def test_time_frames_evaluated_in_chunks():
+    engine = MathEngine(disk_cache=False)
+    assert engine.compile_expression("sin(x - t)*cos(y)", ("x", "y")).defaults == ("t",)
+    f = engine.compile_expression("sin(x - t)*cos(y)", ("x", "y", "t"))
+    X, Y = np.meshgrid(np.linspace(-5, 5, 30), np.linspace(-5, 5, 20))
+
+    stream = TimeFrameStream(f, X, Y, dt=0.1, chunk_frames=8)
+    with patch.object(f, "func", wraps=f.func) as mock_func:
+        frames = [stream.next_frame() for _ in range(20)]
+
+    assert mock_func.call_count == 3
+    assert mock_func.call_args[0][2].shape == (8, 1, 1)
+    t, Z = frames[13]
+    assert t == pytest.approx(1.3)
+    np.testing.assert_allclose(Z, np.sin(X - 1.3) * np.cos(Y))
+
+    bounded = TimeFrameStream(f, X, Y, chunk_frames=1000, max_bytes=10 * X.nbytes)
+    assert bounded.chunk_frames == 10
+
+
+# --- 28. Background Worker: Newer Requests Supersede Older Ones ---
+def test_worker_supersedes_older_request():
+    busy_states = []
+    worker = EvaluationWorker(MagicMock(), on_busy=busy_states.append)
+    release = threading.Event()
+    results = []
+
+    worker.submit(lambda: release.wait(5) and "slow", results.append, channel="graph")
+    worker.submit(lambda: "queued", results.append, channel="graph")
+    worker.submit(lambda: "latest", results.append, channel="graph")
+    assert worker.busy
+    release.set()
+    worker.flush(timeout=5)
+
+    assert results == ["latest"]
+    assert not worker.busy
+    assert busy_states[0] is True and busy_states[-1] is False
+
+    errors = []
+    worker.submit(lambda: 1 / 0, results.append, errors.append)
+    worker.flush(timeout=5)
+    assert isinstance(errors[0], ZeroDivisionError)
+
+    blocked = threading.Event()
+    worker.submit(lambda: blocked.wait(5), results.append, channel="blocking")
+    with pytest.raises(TimeoutError):
+        worker.flush(timeout=0.1)
+    assert worker.busy
+    blocked.set()
+    worker.flush(timeout=5)
+    assert results[-1] is True
+    worker.shutdown()
+
+
+# --- 29. Parallel Mesh: Process Pool Matches In-Process Evaluation ---
+def test_mesh_pool_matches_serial_evaluation():
+    engine = MathEngine(disk_cache=False)
+    engine.mesh_pool = None
+    pool = MeshEvaluationPool(max_workers=2)
+    try:
+        for expression in ("sin(x)*cos(y) + exp(-x^2)", "y/x"):
+            f = engine.compile_expression(expression, ("x", "y"))
+            _, _, expected = engine.evaluate_surface(f, 41)
+            np.testing.assert_allclose(pool.evaluate(f, 41, 5.0), expected)
+    finally:
+        pool.shutdown()
+
+
+# --- 30. Level of Detail: Coarse While Interacting, Fine When Idle ---
+def test_surface_lod_switches_levels():
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    X, Y = np.meshgrid(np.linspace(-5, 5, 300), np.linspace(-5, 5, 300))
+    Z = np.sin(X) * np.cos(Y)
+    lod = SurfaceLOD(X, Y, Z)
+    assert lod.levels[0][2] is Z
+    for LX, LY, LZ in lod.levels[1:]:
+        assert LZ.shape[0] < Z.shape[0]
+        assert (LX.min(), LX.max(), LY.min(), LY.max()) == (-5, 5, -5, 5)
+        np.testing.assert_allclose(LZ, np.sin(LX) * np.cos(LY))
+
+    figure = Figure()
+    canvas = FigureCanvasAgg(figure)
+    coarse = lod.level_for(SurfaceDetailController.INTERACTIVE_MAX_GRID)
+    axes = draw_surface_scene(figure, *lod.levels[coarse], (-1, 1), "lod")
+    detail = SurfaceDetailController(canvas, axes, lod, (-1, 1), shown_level=coarse)
+    assert max(lod.levels[detail.fine][2].shape) <= SurfaceDetailController.IDLE_MAX_GRID
+    assert detail.fine < detail.coarse
+
+    detail.show(detail.fine)
+    assert len(axes.collections) == 2
+    assert [c.get_visible() for c in axes.collections] == [False, True]
+    detail.interactive()
+    assert detail.current == coarse and len(axes.collections) == 2
+    assert axes.collections[0].get_visible()
+    detail.disconnect()
+
+
+# --- 31. Surface Cache: Render and Animate Share One Surface ---
+def test_surface_cache_shared_and_bounded():
+    engine = MathEngine(disk_cache=False)
+    engine.mesh_pool = None
+
+    first = engine.build_surface("x^2 - y^2", resolution=200)
+    with patch.object(engine, "evaluate_surface") as mock_eval:
+        again = engine.build_surface("x**2 - y**2", resolution=200)
+    mock_eval.assert_not_called()
+    assert again is first
+    assert first.zlim == pytest.approx((-25, 25), abs=0.01)
+    assert engine.build_surface("x^2 - y^2", resolution=100) is not first
+
+    engine.surface_cache_bytes = first.nbytes * 2
+    for expression in ("x + y", "x - y", "x*y"):
+        engine.build_surface(expression, resolution=200)
+    info = engine.cache_info()
+    assert info["surface_bytes"] <= engine.surface_cache_bytes
+    assert info["surfaces"] == 2
+
+
+# --- 32. Background: Gradient Rendered as One Image ---
+def test_gradient_ppm_matches_row_colors():
+    width, height = 7, 50
+    data = gradient_ppm(width, height)
+    header = b"P6 7 50 255\n"
+    assert data.startswith(header)
+    pixels = np.frombuffer(data[len(header):], dtype=np.uint8).reshape(height, width, 3)
+
+    for i in (0, 1, 25, 49):
+        factor = i / height
+        expected = [int(c * (1 - factor)) for c in (26, 35, 126)]
+        assert (pixels[i] == expected).all()
+
+
+# --- 33. Resize: Root Size Changes Coalesce Into One Redraw ---
+def test_resize_events_coalesce():
+    root = MagicMock()
+    scheduled = []
+    root.after.side_effect = lambda ms, callback: scheduled.append(callback) or len(scheduled)
+    redraws = []
+    coordinator = ResizeCoordinator(root, lambda: redraws.append(root.winfo_width()))
+
+    child_event = MagicMock(widget=MagicMock(), width=50, height=20)
+    coordinator._on_root_configure(child_event)
+    assert scheduled == []
+
+    for width in range(900, 1000, 10):
+        coordinator._on_root_configure(MagicMock(widget=root, width=width, height=700))
+        coordinator._on_root_configure(MagicMock(widget=root, width=width, height=700))
+    assert len(scheduled) == 1
+
+    scheduled.pop()()
+    assert redraws == [] and len(scheduled) == 1
+    coordinator.flush()
+    assert len(redraws) == 1
+    coordinator.flush()
+    assert len(redraws) == 1
+
+
+# --- 34. Implicit surfaces are meshed numerically ---
+def test_implicit_surface_meshes_whole_sphere():
+    engine = MathEngine(disk_cache=False)
+    surface = engine.build_implicit_surface("x^2+y^2+z^2=9")
+    radii = np.linalg.norm(surface.vertices, axis=1)
+    assert len(surface.triangles) > 1000
+    assert radii == pytest.approx(3.0, abs=0.05)
+    assert surface.vertices[:, 2].max() > 2.5 and surface.vertices[:, 2].min() < -2.5
+    assert surface.triangles.max() < len(surface.vertices)
+
+    with pytest.raises(ValueError):
+        engine.build_implicit_surface("x^2+y^2+z^2=-1")
+
+
+# --- 35. Symbolic solves are cached and time-boxed ---
+def test_symbolic_solve_cached_and_time_boxed():
+    engine = MathEngine(disk_cache=False)
+    try:
+        solutions = engine.solve_equation("x^2+y^2+z^2=9")
+        assert sorted(solutions) == ['-sqrt(-x**2 - y**2 + 9)', 'sqrt(-x**2 - y**2 + 9)']
+        assert engine.solve_equation("9 = z**2 + x^2 + y^2") == solutions
+        assert engine.cache_info()["solve_hits"] == 1
+
+        with patch.object(engine.solver, "_connection", wraps=engine.solver._connection) as connection:
+            engine.solver._conn.poll = MagicMock(return_value=False)
+            assert engine.solve_equation("z^3 + z = x", timeout=0.5) is None
+            assert engine.solver._process is None
+            # The timeout is remembered, so the same budget does not solve again
+            assert engine.solve_equation("z^3 + z = x", timeout=0.5) is None
+            assert connection.call_count == 1
+        assert len(engine.solve_equation("z^3 + z = x", timeout=30)) == 3
+    finally:
+        engine.solver.shutdown()
+
+
+# --- 36. Every real branch of a solved equation is plotted ---
+def test_branch_surfaces_mask_non_real_points():
+    import sympy
+    from matplotlib.figure import Figure
+
+    engine = MathEngine(disk_cache=False)
+    surface = engine.build_branch_surfaces(["sqrt(9 - x**2 - y**2)", "-sqrt(9 - x**2 - y**2)"],
+                                           resolution=41)
+    assert surface.Zs.shape == (2, 41, 41)
+    outside = surface.X ** 2 + surface.Y ** 2 > 9
+    assert np.isnan(surface.Zs[:, outside]).all()
+    assert np.nanmin(surface.Zs[0]) >= 0 and np.nanmax(surface.Zs[1]) <= 0
+    assert surface.zlim == pytest.approx((-3.0, 3.0))
+
+    # Real roots of z^3 - 3z = x pass through complex intermediates in Cardano's formula
+    roots = sympy.solve(sympy.sympify("z**3 - 3*z - x"), sympy.Symbol("z"))
+    cubic = engine.build_branch_surfaces([str(root) for root in roots], resolution=21)
+    assert len(cubic.Zs) == 3
+    assert (~np.isnan(cubic.Zs[:, 10, 10])).all()
+
+    figure = Figure()
+    ax3d = draw_branch_scene(figure, surface, "sphere")
+    assert len(ax3d.collections) == 2
+
+    with pytest.raises(ValueError):
+        engine.build_branch_surfaces(["sqrt(-1 - x**2)"], resolution=11)
+
+
+# --- 37. Tokenizer keeps function names and inserts implicit multiplication ---
+def test_tokenizer_implicit_multiplication():
+    engine = MathEngine(disk_cache=False)
+    cases = {
+        "sin(x)": "sin(x)",
+        "2x^2": "2*x**2",
+        "xsin(y)cos(x)": "x*sin(y)*cos(x)",
+        "2pi x": "2*pi*x",
+        "3(x+1)(x-1)": "3*(x+1)*(x-1)",
+        "sinh(x) + exp(-x^2)": "sinh(x)+exp(-x**2)",
+        "x^2+y^2+z^2 = R^2": "x**2+y**2+z**2=R**2",
+        "1.5e-3x": "1.5e-3*x",
+    }
+    for raw, expected in cases.items():
+        assert "".join(engine.tokenize(raw)) == expected
+
+    tokens = engine.tokenize("2sin(x)")
+    assert tokens == ("2", "*", "sin", "(", "x", ")")
+    assert engine.tokenize("2sin(x)") is tokens
+    f = engine.compile_expression("".join(engine.tokenize("2sin(x)cos(x)")))
+    assert f(np.pi / 4) == pytest.approx(1.0)
+
+
+# --- 38. x values: lists, ranges and files ---
+def test_parse_x_values(tmp_path):
+    assert parse_x_values("2.5").tolist() == [2.5]
+    assert parse_x_values("1, 2, 3").tolist() == [1.0, 2.0, 3.0]
+    assert parse_x_values("0:1:0.25").tolist() == [0.0, 0.25, 0.5, 0.75, 1.0]
+    assert len(parse_x_values("0:10:0.01")) == 1001
+
+    data = tmp_path / "xs.csv"
+    data.write_text("1,2\n3; 4\n5")
+    assert parse_x_values(str(data)).tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+    for bad in ("abc", "0:1:-1", "1:2:3:4", "0:1:0"):
+        with pytest.raises(ValueError):
+            parse_x_values(bad)
+
+    engine = MathEngine(disk_cache=False)
+    f = engine.compile_expression("sin(x)*x**2", ("x",))
+    x = parse_x_values("0:999999:1")
+    assert x.size == 1_000_000
+    assert f(x)[-1] == pytest.approx(np.sin(999999.0) * 999999.0 ** 2)
+
+
+# --- 39. Multi-variable grids evaluate in one broadcast call ---
+def test_evaluate_grid_broadcasts():
+    from matplotlib.figure import Figure
+
+    engine = MathEngine(disk_cache=False)
+    grid = {"A": np.arange(0.0, 10.5, 0.5), "B": np.array([1.0, 2.0, 3.0]), "C": np.array([2.0])}
+    compiled, values = engine.evaluate_grid("A*B + C", grid)
+    assert compiled.variables == ("A", "B", "C")
+    assert values.shape == (21, 3, 1)
+    assert values[4, 2, 0] == pytest.approx(2.0 * 3.0 + 2.0)
+
+    compiled, value = engine.evaluate_grid("A*cos(B)", {"A": np.array([10.0]), "B": np.array([0.0])})
+    assert value.item() == pytest.approx(10.0)
+    with pytest.raises(ValueError):
+        engine.evaluate_grid("A*B", {"A": np.arange(2000.0), "B": np.arange(1000.0)})
+
+    figure = Figure()
+    ax = draw_heatmap(figure, ("A", "B"), (grid["A"], grid["B"]), values[..., 0], "A*B + 2")
+    assert ax.get_xlabel() == "B" and ax.get_ylabel() == "A"
+
+
+# --- 40. Changing a constant reuses the compiled callable ---
+def test_bind_parameters_never_recompiles():
+    engine = MathEngine(disk_cache=False)
+    expression = "A*exp(-x**2/B) + pi"
+    assert engine.parameter_names(expression) == ("A", "B")
+
+    first = engine.bind_parameters(expression, ("x",), {"A": 2.0, "B": 1.0})
+    misses = engine.cache_info()["misses"]
+    second = engine.bind_parameters(expression, ("x",), {"A": 3.0})
+
+    assert engine.cache_info()["misses"] == misses
+    assert second.compiled is first.compiled
+    assert second.defaults == ("B",)
+    assert first(0.0) == pytest.approx(2.0 + np.pi)
+    assert second(1.0) == pytest.approx(3.0 * np.exp(-1.0) + np.pi)
+
+    x_vals, y_vals = engine._evaluate_expression_for_graph("A*x", parameters={"A": 4.0})
+    assert np.allclose(y_vals, 4.0 * x_vals)
+
+
+# --- 41. Time Animation: Colour Scale and Z-Limits Follow New Chunks ---
+def test_time_animation_shares_colour_scale():
+    from matplotlib.figure import Figure
+    engine = MathEngine(disk_cache=False)
+    f = engine.compile_expression("t*sin(x)", ("x", "y", "t"))
+    X, Y = np.meshgrid(np.linspace(-5, 5, 20), np.linspace(-5, 5, 20))
+    stream = TimeFrameStream(f, X, Y, dt=0.5, chunk_frames=4)
+    t, Z = stream.next_frame()
+    zlim = surface_limits(stream.chunk_range())
+    axes = draw_surface_scene(Figure(), X, Y, Z, zlim, "test")
+    animator = SurfaceTimeAnimator(MagicMock(), MagicMock(), axes, X, Y, stream, "test", zlim)
+
+    for _ in range(3):
+        animator._render()
+        assert (animator.surface.norm.vmin, animator.surface.norm.vmax) == zlim
+    animator._render()
+    assert animator.zlim[1] > zlim[1]
+    assert axes.get_zlim() == pytest.approx(animator.zlim)
+    assert (animator.surface.norm.vmin, animator.surface.norm.vmax) == animator.zlim
+
+
+# --- 42. Parameters Shadow SymPy's Own Names ---
+def test_parameters_shadow_sympy_names():
+    engine = MathEngine(disk_cache=False)
+    x = np.array([0.0, 1.0])
+    cases = {
+        "E*exp(x)": ({"E": 5.0}, 5.0 * np.exp(x)),
+        "I*exp(x)": ({"I": 2.0}, 2.0 * np.exp(x)),
+        "N*exp(-x)": ({"N": 3.0}, 3.0 * np.exp(-x)),
+        "S*exp(x)": ({"S": 4.0}, 4.0 * np.exp(x)),
+        "beta*exp(x)": ({"beta": 0.5}, 0.5 * np.exp(x)),
+    }
+    for expression, (values, expected) in cases.items():
+        y = engine.bind_parameters(expression, ("x",), values)(x)
+        assert not np.iscomplexobj(y)
+        np.testing.assert_allclose(y, expected)
+
+
+# --- 43. Engine Lock: A Worker Compile Does Not Block the Tk Thread ---
+def test_compile_does_not_hold_engine_lock():
+    engine = MathEngine(disk_cache=False)
+    lambdify = __import__("sympy").lambdify
+    started, release = threading.Event(), threading.Event()
+
+    def slow_lambdify(*args, **kwargs):
+        started.set()
+        release.wait(5)
+        return lambdify(*args, **kwargs)
+
+    with patch("calculatorApp.sym.lambdify", side_effect=slow_lambdify):
+        worker = threading.Thread(target=engine.compile_expression, args=("A*exp(x)",))
+        worker.start()
+        assert started.wait(5)
+        try:
+            results = []
+            tk_thread = threading.Thread(target=lambda: results.extend([
+                engine.tokenize("2sin(x)"), engine.parameter_names("B*x"),
+                engine.compile_expression("x + 1")(1.0)]))
+            tk_thread.start()
+            tk_thread.join(2)
+            assert results == [("2", "*", "sin", "(", "x", ")"), ("B",), 2.0]
+        finally:
+            release.set()
+            worker.join()
+    assert engine.compile_expression("A*exp(x)").defaults == ("A",)
+
+
+# --- 44. Level of Detail: Idle Surface Is No Coarser Than Before ---
+def test_idle_surface_keeps_baseline_resolution():
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    engine = MathEngine(disk_cache=False)
+    engine.mesh_pool = None
+    surface = engine.build_surface("sin(x)*cos(y)")
+    canvas = FigureCanvasAgg(Figure())
+    coarse = surface.lod.level_for(SurfaceDetailController.INTERACTIVE_MAX_GRID)
+    axes = draw_surface_scene(canvas.figure, *surface.lod.levels[coarse], surface.zlim, "idle")
+    detail = SurfaceDetailController(canvas, axes, surface.lod, surface.zlim, shown_level=coarse)
+
+    # 3D Render drew a fixed 150x150 mesh before levels of detail
+    assert min(surface.lod.levels[detail.fine][2].shape) >= 150
+    assert max(surface.lod.levels[detail.coarse][2].shape) <= SurfaceDetailController.INTERACTIVE_MAX_GRID
+    detail.disconnect()
+
+
+# --- 45. Multi-Curve: A Single Curve Is Reused When a Second Is Added ---
+def test_single_curve_row_reused(app):
+    app.variables_entry.delete(0, tk.END)
+    app.expression_entry.delete(0, tk.END)
+    app.expression_entry.insert(0, "sin(x)")
+    app.graph_calculations()
+    app.worker.flush()
+    assert list(app.plot_manager.curve_rows) == [("sin(x)", ())]
+
+    app.expression_entry.insert(tk.END, "; x^2")
+    with patch.object(app.math_engine, "evaluate_curves",
+                      wraps=app.math_engine.evaluate_curves) as mock_batch, \
+         patch("tkinter.messagebox.showerror") as mock_error:
+        app.graph_calculations()
+        app.worker.flush()
+
+    mock_error.assert_not_called()
+    mock_batch.assert_called_once()
+    assert mock_batch.call_args[0][0] == ["x**2"]
+    assert len(app.plot_manager._lines) == 2
+
+
+# --- 46. Time Animation: Next Chunk Is Prefetched and the View Is Kept ---
+def test_time_animation_prefetches_and_keeps_view():
+    from concurrent.futures import ThreadPoolExecutor
+    from matplotlib.figure import Figure
+
+    engine = MathEngine(disk_cache=False)
+    f = engine.compile_expression("sin(x - t)*cos(y)", ("x", "y", "t"))
+    X, Y = np.meshgrid(np.linspace(-5, 5, 20), np.linspace(-5, 5, 20))
+    stream = TimeFrameStream(f, X, Y, dt=0.1, chunk_frames=4)
+    t, Z = stream.next_frame()
+    executor = ThreadPoolExecutor(max_workers=1)
+    stream.prefetch_with(executor.submit)
+    stream._prefetched.result(timeout=5)
+
+    threads = []
+    func = f.func
+    with patch.object(f, "func", side_effect=lambda *a: threads.append(threading.get_ident()) or func(*a)):
+        # Frames 1-3 come from the current chunk, frame 4 from the prefetched one
+        frames = [stream.next_frame() for _ in range(4)]
+        stream._prefetched.result(timeout=5)
+    assert threads and threading.get_ident() not in threads
+    assert frames[-1][0] == pytest.approx(0.4)
+    np.testing.assert_allclose(frames[-1][1], np.sin(X - 0.4) * np.cos(Y))
+
+    axes = draw_surface_scene(Figure(), X, Y, Z, (-1, 1), "test")
+    axes.view_init(elev=10, azim=45)
+    animator = SurfaceTimeAnimator(MagicMock(), MagicMock(), axes, X, Y, stream, "test", (-1, 1))
+    animator._render()
+    axes.view_init(elev=20, azim=100)
+    animator._render()
+    assert (axes.elev, axes.azim) == (20, 100)
+    animator.stop()
+    assert stream._prefetched is None
+    executor.shutdown()
+
+
+# --- 47. 3D Animation: Offscreen Render Errors Stop the Animation ---
+def test_frame_cache_error_stops_animation():
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    def broken_scene(figure):
+        raise ValueError("bad surface")
+
+    canvas = FigureCanvasAgg(Figure(figsize=(2, 2), dpi=40))
+    axes = canvas.figure.add_subplot(111, projection="3d")
+    errors = []
+    animator = RotationAnimator(MagicMock(), canvas, axes, scene=broken_scene, on_error=errors.append)
+    animator.start()
+    if animator.running:
+        # The render thread had not failed yet when the first frame was drawn
+        animator.frames.join(5)
+        animator._tick()
+    assert not animator.running and animator.frames is None
+    assert len(errors) == 1 and str(errors[0]) == "bad surface"
+
+
+# --- 48. Tokenizer: Parsing Reads the Token Stream ---
+def test_to_sympy_expr_reads_tokens(monkeypatch):
+    import sympy
+    from calculatorApp import sympy_token_pairs
+
+    engine = MathEngine(disk_cache=False)
+    texts = ["".join(engine.tokenize(raw))
+             for raw in ("2sin(x)cos(y)", "a x^2 + b x + c", "exp(-x^2/4)/2", "1.5e-3x - 4pi", "Ex+N")]
+    shadowed = {**engine.sympy_locals, "E": sympy.Symbol("E"), "N": sympy.Symbol("N")}
+    expected = [sympy.sympify(text, locals=engine.sympy_locals) for text in texts[:-1]]
+    expected.append(sympy.sympify(texts[-1], locals=shadowed))
+
+    def no_sympify(*args, **kwargs):
+        raise AssertionError("the text was tokenized again")
+
+    monkeypatch.setattr(sympy, "sympify", no_sympify)
+    parsed = [engine.to_sympy_expr(text) for text in texts[:-1]]
+    parsed.append(engine.to_sympy_expr(texts[-1], ("x", "E", "N")))
+    assert parsed == expected
+
+    # '* *' joins into '**', which Python's tokenizer would read differently
+    assert sympy_token_pairs(engine.tokenize("x * *2")) is None